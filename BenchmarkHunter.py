@@ -0,0 +1,561 @@
+"""
+BenchmarkHunter - Benchmark riproducibili di FileHunter. [FEATURE 18]
+
+Genera in una cartella temporanea un albero sintetico deterministico (stesso seed
+= stessi file, stessi nomi, stesse date) e misura separatamente i percorsi caldi:
+walk, fuzzy_match, calculate_file_hash, filtri dimensione/data, scansione
+completa (anche divisa tra processi o con più ricerche insieme), copia (anche
+con hash e copia nella stessa lettura), ordine di lettura per posizione sul
+disco, spostamento e scrittura del report. Il benchmark "memory" misura in un processo
+separato il picco di RSS dello stato che una scansione tiene per ogni file
+(deduplicazione e log), riportato per milione di file.
+Il risultato è un JSON confrontabile tra commit diversi; con --compare ogni
+benchmark più lento del baseline oltre la soglia fa fallire il comando (exit 1).
+
+Nota: i file appena generati sono nella page cache, quindi le misure sono "a
+caldo" e descrivono il costo CPU/syscall più che quello del disco.
+
+Uso:
+    python BenchmarkHunter.py                                  # preset "small", JSON su stdout
+    python BenchmarkHunter.py --preset medium --output base.json
+    python BenchmarkHunter.py --compare base.json --threshold 0.10
+    python BenchmarkHunter.py --only walk,hash --repeat 5
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+from FileHunter import (FileHunter, FileHasher, JsonlReportSink, ParallelWalker, DuplicateFinder, LogRecord, LocalityOrder,
+                        DEFAULT_HASH_ALGORITHM, DEFAULT_WALK_WORKERS)
+
+# --- CONFIGURAZIONE ALBERO SINTETICO ---
+DEFAULT_SEED = 1234
+# Epoca fissa per le date di modifica: i filtri data danno sempre lo stesso esito
+BASE_MTIME = datetime(2020, 1, 1).timestamp()
+NAME_WORDS = ["foto", "scansione", "documento", "contratto", "vacanze", "IMG", "report",
+              "bilancio", "preventivo", "lettera", "backup", "progetto", "ricevuta"]
+
+TREE_PRESETS: Dict[str, Dict[str, Any]] = {
+    "small": {
+        "depth": 3,
+        "fanout": 3,
+        "files_per_dir": 15,
+        # (dimensione massima, peso): dimensione uniforme tra il limite precedente e questo
+        "size_distribution": [[512, 0.40], [16 * 1024, 0.35], [256 * 1024, 0.20], [2 * 1024 * 1024, 0.05]],
+        "duplicate_ratio": 0.20,    # file con lo stesso contenuto di uno già generato
+        "collision_ratio": 0.15,    # file con lo stesso nome di uno già generato (altra cartella)
+        "match_ratio": 0.30,        # nomi che contengono la parola cercata
+        "extensions": [".jpg", ".pdf", ".docx", ".txt", ".png"],
+        "query": "fattura",
+        "mtime_span_days": 3650,
+        "memory_files": 100_000,    # file simulati dal benchmark "memory" (nessun file su disco)
+    },
+}
+TREE_PRESETS["medium"] = dict(TREE_PRESETS["small"], depth=4, fanout=4, files_per_dir=25, memory_files=300_000)
+TREE_PRESETS["large"] = dict(TREE_PRESETS["small"], depth=5, fanout=5, files_per_dir=30, memory_files=1_000_000)
+
+# Soglia di regressione di default: +10% sulla mediana
+DEFAULT_THRESHOLD = 0.10
+# Differenze assolute sotto questa soglia sono rumore di misura, non regressioni
+DEFAULT_MIN_DELTA = 0.002
+DEFAULT_REPEAT = 3
+
+
+def _pick_size(rng: random.Random, distribution) -> int:
+    limits = [limit for limit, _ in distribution]
+    weights = [weight for _, weight in distribution]
+    index = rng.choices(range(len(limits)), weights=weights)[0]
+    low = limits[index - 1] + 1 if index else 0
+    return rng.randint(low, limits[index])
+
+
+def generate_tree(root: str, spec: Dict[str, Any], seed: int = DEFAULT_SEED) -> Dict[str, Any]:
+    """
+    Crea l'albero sintetico sotto root. Restituisce i contatori di quanto generato.
+    Il contenuto di ogni file deriva da un seed proprio: i duplicati riusano quel seed.
+    """
+    rng = random.Random(seed)
+    contents: List[tuple] = []   # (seed del contenuto, dimensione)
+    names: List[str] = []
+    stats = {"dirs": 0, "files": 0, "bytes": 0, "duplicates": 0, "collisions": 0, "matching_names": 0}
+    level = [root]
+    os.makedirs(root, exist_ok=True)
+    for depth in range(spec["depth"] + 1):
+        next_level = []
+        for dir_index, directory in enumerate(level):
+            stats["dirs"] += 1
+            for file_index in range(spec["files_per_dir"]):
+                # Contenuto: nuovo o duplicato di uno precedente
+                if contents and rng.random() < spec["duplicate_ratio"]:
+                    content_seed, size = rng.choice(contents)
+                    stats["duplicates"] += 1
+                else:
+                    content_seed, size = rng.getrandbits(64), _pick_size(rng, spec["size_distribution"])
+                    contents.append((content_seed, size))
+                # Nome: ripetuto (collisione nella destinazione) o nuovo
+                if names and rng.random() < spec["collision_ratio"]:
+                    name = rng.choice(names)
+                    stats["collisions"] += 1
+                else:
+                    word = spec["query"] if rng.random() < spec["match_ratio"] else rng.choice(NAME_WORDS)
+                    name = f"{word}_{depth}_{dir_index}_{file_index:04d}{rng.choice(spec['extensions'])}"
+                    names.append(name)
+                if spec["query"] in name:
+                    stats["matching_names"] += 1
+                path = os.path.join(directory, name)
+                if os.path.exists(path):
+                    continue  # Collisione nella stessa cartella: il nome è già occupato
+                with open(path, "wb") as f:
+                    f.write(random.Random(content_seed).randbytes(size))
+                mtime = BASE_MTIME + rng.uniform(0, spec["mtime_span_days"] * 86400)
+                os.utime(path, (mtime, mtime))
+                stats["files"] += 1
+                stats["bytes"] += size
+            if depth < spec["depth"]:
+                for child in range(spec["fanout"]):
+                    child_path = os.path.join(directory, f"dir_{depth}_{child}")
+                    os.makedirs(child_path, exist_ok=True)
+                    next_level.append(child_path)
+        level = next_level
+    return stats
+
+
+@contextlib.contextmanager
+def _silenzioso():
+    # FileHunter stampa molto: durante le misure l'output va scartato
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+class BenchContext:
+    """Stato condiviso dai benchmark: albero, elenco file e cartelle di lavoro."""
+
+    def __init__(self, workdir: str, spec: Dict[str, Any], hash_algorithm: str):
+        self.workdir = workdir
+        self.tree = os.path.join(workdir, "tree")
+        self.spec = spec
+        self.hash_algorithm = hash_algorithm
+        self.paths: List[str] = []
+        self.names: List[str] = []
+        self.stats: List[os.stat_result] = []
+        self.total_bytes = 0
+        self.scan_log: List[Dict[str, Any]] = []
+        self.report: Optional[Dict[str, Any]] = None
+        self.scratch = os.path.join(workdir, "scratch")
+
+    def index(self):
+        for current, _dirs, files in os.walk(self.tree):
+            for name in sorted(files):
+                path = os.path.join(current, name)
+                self.paths.append(path)
+                self.names.append(name)
+                self.stats.append(os.stat(path))
+        self.total_bytes = sum(st.st_size for st in self.stats)
+
+    def reset_scratch(self):
+        shutil.rmtree(self.scratch, ignore_errors=True)
+        os.makedirs(self.scratch)
+
+    def scan(self, root: str, **kwargs) -> Dict[str, Any]:
+        hunter = FileHunter()
+        with _silenzioso():
+            report = hunter.scan_and_process(self.spec["extensions"], os.path.join(self.scratch, "dest"),
+                                             query_nome=self.spec["query"], show_progress=False,
+                                             hash_algorithm=self.hash_algorithm, root_dirs=[root], **kwargs)
+        self.scan_log = hunter.scan_log
+        return report
+
+
+# --- BENCHMARK ---
+# Ognuno è (preparazione non misurata, misura); la misura restituisce i contatori
+
+def bench_walk(ctx: BenchContext):
+    walker = ParallelWalker(workers=DEFAULT_WALK_WORKERS)
+    files = sum(len(files) for _, files in walker.walk(ctx.tree))
+    return {"items": walker.dirs_listed, "files": files}
+
+
+def bench_fuzzy(ctx: BenchContext):
+    hunter = FileHunter()
+    query = ctx.spec["query"]
+    matched = sum(1 for name in ctx.names if hunter.fuzzy_match(name, query))
+    return {"items": len(ctx.names), "matched": matched}
+
+
+def bench_hash(ctx: BenchContext):
+    hunter = FileHunter()
+    hunter.hasher = FileHasher(ctx.hash_algorithm)
+    for path, st in zip(ctx.paths, ctx.stats):
+        hunter.calculate_file_hash(path, file_stat=st)
+    return {"items": len(ctx.paths), "bytes": ctx.total_bytes}
+
+
+def bench_filters(ctx: BenchContext):
+    hunter = FileHunter()
+    date_from = datetime.fromtimestamp(BASE_MTIME + 365 * 86400)
+    date_to = datetime.fromtimestamp(BASE_MTIME + 5 * 365 * 86400)
+    passed = 0
+    for st in ctx.stats:
+        if hunter.check_size_filter(st.st_size, 1024, 1024 * 1024) and \
+                hunter.check_date_filter(st.st_mtime, date_from, date_to):
+            passed += 1
+    return {"items": len(ctx.stats), "passed": passed}
+
+
+def bench_scan_dry_run(ctx: BenchContext):
+    report = ctx.scan(ctx.tree, dry_run=True)
+    return {"items": report["summary"]["files_trovati"] + report["summary"]["files_duplicati"]}
+
+
+def bench_scan_processes(ctx: BenchContext):
+    # [FEATURE 22] Stessa scansione di scan_dry_run divisa tra processi (almeno 2)
+    report = ctx.scan(ctx.tree, dry_run=True, process_workers=max(2, os.cpu_count() or 1))
+    return {"items": report["summary"]["files_trovati"] + report["summary"]["files_duplicati"]}
+
+
+def bench_scan_batch(ctx: BenchContext):
+    # [FEATURE 25] Una ricerca in anteprima per estensione, tutte con una sola visita
+    jobs = [{"name": ext, "estensioni_target": [ext], "query_nome": ctx.spec["query"], "dry_run": True,
+             "cartella_destinazione": os.path.join(ctx.scratch, "dest", ext.strip("."))}
+            for ext in ctx.spec["extensions"]]
+    with _silenzioso():
+        result = FileHunter().scan_batch(jobs, root_dirs=[ctx.tree], show_progress=False)
+    return {"items": sum(r["summary"]["files_trovati"] + r["summary"]["files_duplicati"] for r in result["jobs"]),
+            "jobs": len(jobs)}
+
+
+def setup_copy(ctx: BenchContext):
+    ctx.reset_scratch()
+
+
+def bench_copy(ctx: BenchContext):
+    report = ctx.scan(ctx.tree, mode="copy")
+    return {"items": report["summary"]["files_trovati"], "bytes": report["summary"]["total_size"]}
+
+
+def bench_copy_fused(ctx: BenchContext):
+    # [FEATURE 28] Come copy, ma i file da hashare vengono copiati nella stessa lettura
+    report = ctx.scan(ctx.tree, mode="copy", fused_copy=True)
+    fused = report["summary"]["fused_copy"]
+    return {"items": report["summary"]["files_trovati"], "bytes": report["summary"]["total_size"],
+            "staged": fused["staged"], "discarded": fused["discarded"]}
+
+
+def bench_io_order(ctx: BenchContext):
+    # [FEATURE 30] Ordina per extent fisico i file di ogni cartella come le copie di una scansione;
+    # i contatori confrontano salti all'indietro e distanza percorsa prima e dopo
+    order = LocalityOrder("extent")
+    for folder, _, _ in os.walk(ctx.tree):
+        with os.scandir(folder) as it:
+            entries = [entry for entry in it if entry.is_file(follow_symlinks=False)]
+        order.order([(entry.path, entry.stat(follow_symlinks=False)) for entry in entries])
+    return dict(order.stats, items=order.stats["files_sorted"])
+
+
+def setup_move(ctx: BenchContext):
+    ctx.reset_scratch()
+    shutil.copytree(ctx.tree, os.path.join(ctx.scratch, "source"))
+
+
+def bench_move(ctx: BenchContext):
+    report = ctx.scan(os.path.join(ctx.scratch, "source"), mode="move")
+    return {"items": report["summary"]["files_trovati"], "bytes": report["summary"]["total_size"]}
+
+
+def setup_report(ctx: BenchContext):
+    if ctx.report is None:
+        ctx.reset_scratch()
+        ctx.report = ctx.scan(ctx.tree, dry_run=True)
+        ctx.report["log"] = list(ctx.scan_log)
+    ctx.reset_scratch()
+
+
+def bench_report_json(ctx: BenchContext):
+    with open(os.path.join(ctx.scratch, "report.json"), "w", encoding="utf-8") as f:
+        json.dump(ctx.report, f, indent=2, ensure_ascii=False)
+    return {"items": len(ctx.report["log"])}
+
+
+def bench_report_stream(ctx: BenchContext):
+    sink = JsonlReportSink(os.path.join(ctx.scratch, "report.jsonl"), header={"benchmark": True})
+    for record in ctx.report["log"]:
+        sink.append(record)
+    sink.close(ctx.report["summary"])
+    return {"items": len(ctx.report["log"])}
+
+
+def _peak_rss() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows: nessun ru_maxrss
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux riporta KB, macOS byte
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def memory_probe(files: int, spec: Dict[str, Any], seed: int = DEFAULT_SEED) -> Dict[str, Any]:
+    """
+    [FEATURE 27] Stato per file di una scansione (deduplicazione, processed_hashes,
+    scan_log) per `files` file sintetici, senza disco: stessi oggetti e stessi record
+    di scan_and_process. Va eseguito in un processo nuovo (--memory-probe), perché
+    il picco di RSS è quello dell'intero processo.
+    """
+    import hashlib
+    hunter = FileHunter()
+    rng = random.Random(seed)
+
+    def digest(path, st=None):
+        # Contenuto sintetico: il digest dipende solo dalla dimensione (i duplicati la riusano)
+        return hashlib.md5(str(st.st_size if st is not None else path).encode()).hexdigest()
+
+    dedup = DuplicateFinder(digest, lambda path, size, sample, st=None: digest(path, st),
+                            digests=hunter.processed_hashes)
+    log = hunter.scan_log
+    sizes: List[int] = []
+    inizio = _peak_rss()
+    start = time.perf_counter()
+    for index in range(files):
+        if sizes and rng.random() < spec["duplicate_ratio"]:
+            size = rng.choice(sizes)
+        else:
+            size = _pick_size(rng, spec["size_distribution"]) + index * 4096
+            sizes.append(size)
+        mtime_ns = int(BASE_MTIME * 1e9) + index
+        st = os.stat_result((0o100644, 1_000_000 + index, 2049, 1, 1000, 1000, size,
+                             mtime_ns // 10**9, mtime_ns // 10**9, mtime_ns // 10**9,
+                             mtime_ns / 1e9, mtime_ns / 1e9, mtime_ns / 1e9, mtime_ns, mtime_ns, mtime_ns))
+        folder = os.path.join(os.sep, "home", "utente", "archivio", f"dir_{index // spec['files_per_dir']}")
+        name = f"{rng.choice(NAME_WORDS)}_{index:07d}{rng.choice(spec['extensions'])}"
+        source = os.path.join(folder, name)
+        is_duplicate, record = dedup.check(source, size, st)
+        if is_duplicate:
+            log.append({"file": source, "status": "duplicate", "hash": record.digest})
+        else:
+            dest = os.path.join(os.sep, "destinazione", name.rsplit(".", 1)[1].upper(), name)
+            log.append(LogRecord.success(source, dest, size, st.st_mtime, record.digest, "copy"))
+    seconds = time.perf_counter() - start
+    picco = _peak_rss()
+    result = {"files": files, "seconds": round(seconds, 3), "log_records": len(log),
+              "digests": len(hunter.processed_hashes)}
+    if inizio is not None and picco is not None:
+        result["peak_rss_bytes"] = picco
+        result["rss_bytes_per_million_files"] = int((picco - inizio) * 1_000_000 / max(1, files))
+    return result
+
+
+def bench_memory(ctx: BenchContext):
+    # Processo nuovo: il picco di RSS non deve includere albero, indice e benchmark precedenti
+    files = ctx.spec.get("memory_files", TREE_PRESETS["small"]["memory_files"])
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--memory-probe", str(files),
+                                "--spec-json", json.dumps(ctx.spec)],
+                               capture_output=True, text=True, check=True)
+    probe = json.loads(completed.stdout)
+    counters = {"items": probe["files"]}
+    for key in ("peak_rss_bytes", "rss_bytes_per_million_files"):
+        if key in probe:
+            counters[key] = probe[key]
+    return counters
+
+
+BENCHMARKS = {
+    "walk": (None, bench_walk),
+    "fuzzy_match": (None, bench_fuzzy),
+    "hash": (None, bench_hash),
+    "filters": (None, bench_filters),
+    "scan_dry_run": (setup_copy, bench_scan_dry_run),
+    "scan_processes": (setup_copy, bench_scan_processes),
+    "scan_batch": (setup_copy, bench_scan_batch),
+    "copy": (setup_copy, bench_copy),
+    "copy_fused": (setup_copy, bench_copy_fused),
+    "io_order": (None, bench_io_order),
+    "move": (setup_move, bench_move),
+    "report_json": (setup_report, bench_report_json),
+    "report_stream": (setup_report, bench_report_stream),
+    "memory": (None, bench_memory),
+}
+
+
+def run_benchmark(ctx: BenchContext, name: str, repeat: int) -> Dict[str, Any]:
+    setup, measure = BENCHMARKS[name]
+    runs = []
+    counters: Dict[str, Any] = {}
+    for _ in range(max(1, repeat)):
+        if setup is not None:
+            setup(ctx)
+        start = time.perf_counter()
+        counters = measure(ctx)
+        runs.append(time.perf_counter() - start)
+    median = statistics.median(runs)
+    result = {
+        "seconds_median": round(median, 6),
+        "seconds_min": round(min(runs), 6),
+        "runs": [round(r, 6) for r in runs],
+    }
+    result.update(counters)
+    if median > 0:
+        result["items_per_second"] = round(counters.get("items", 0) / median, 1)
+        if "bytes" in counters:
+            result["bytes_per_second"] = int(counters["bytes"] / median)
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(spec: Dict[str, Any], seed: int = DEFAULT_SEED, only: Optional[List[str]] = None,
+              repeat: int = DEFAULT_REPEAT, workdir: Optional[str] = None, keep: bool = False,
+              hash_algorithm: str = DEFAULT_HASH_ALGORITHM) -> Dict[str, Any]:
+    """Genera l'albero, esegue i benchmark richiesti e restituisce il risultato (JSON-serializzabile)."""
+    names = only or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Benchmark sconosciuti: {unknown} (disponibili: {list(BENCHMARKS)})")
+    if workdir:
+        # Una cartella di lavoro indicata ma non ancora esistente viene creata
+        os.makedirs(workdir, exist_ok=True)
+    base = tempfile.mkdtemp(prefix="filehunter-bench-", dir=workdir)
+    try:
+        ctx = BenchContext(base, spec, hash_algorithm)
+        start = time.perf_counter()
+        tree_stats = generate_tree(ctx.tree, spec, seed)
+        tree_stats["generation_seconds"] = round(time.perf_counter() - start, 3)
+        ctx.index()
+        print(f"🌳 Albero sintetico: {tree_stats['files']} file in {tree_stats['dirs']} cartelle "
+              f"({tree_stats['bytes'] / 1024 / 1024:.1f} MB) in {base}", file=sys.stderr)
+        results = {}
+        for name in names:
+            results[name] = run_benchmark(ctx, name, repeat)
+            print(f"⏱️  {name}: {results[name]['seconds_median']:.4f}s", file=sys.stderr)
+    finally:
+        if not keep:
+            shutil.rmtree(base, ignore_errors=True)
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": seed,
+            "repeat": repeat,
+            "hash_algorithm": hash_algorithm,
+            "spec": spec,
+            "tree": tree_stats,
+        },
+        "results": results,
+    }
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any],
+                    threshold: float = DEFAULT_THRESHOLD, min_delta: float = DEFAULT_MIN_DELTA) -> Dict[str, Any]:
+    """
+    Confronta le mediane con un baseline. Un benchmark è una regressione se
+    impiega più di (1 + threshold) volte il tempo del baseline e almeno
+    min_delta secondi in più.
+    """
+    comparison = {}
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("seconds_median"):
+            continue
+        ratio = result["seconds_median"] / base["seconds_median"]
+        regression = ratio > 1 + threshold and result["seconds_median"] - base["seconds_median"] > min_delta
+        comparison[name] = {
+            "baseline_seconds": base["seconds_median"],
+            "current_seconds": result["seconds_median"],
+            "ratio": round(ratio, 3),
+            "regression": regression,
+        }
+        if regression:
+            regressions.append(name)
+    return {
+        "threshold": threshold,
+        "min_delta": min_delta,
+        "baseline_commit": baseline.get("meta", {}).get("commit"),
+        "same_tree": baseline.get("meta", {}).get("spec") == current["meta"]["spec"]
+                     and baseline.get("meta", {}).get("seed") == current["meta"]["seed"],
+        "benchmarks": comparison,
+        "regressions": regressions,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark riproducibili di FileHunter")
+    parser.add_argument("--preset", choices=sorted(TREE_PRESETS), default="small",
+                        help="Dimensione dell'albero sintetico")
+    parser.add_argument("--spec", help="File JSON con parametri dell'albero (sovrascrivono il preset)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Ripetizioni per benchmark (mediana)")
+    parser.add_argument("--only", help=f"Benchmark separati da virgola ({','.join(BENCHMARKS)})")
+    parser.add_argument("--hash-algorithm", default=DEFAULT_HASH_ALGORITHM)
+    parser.add_argument("--workdir", help="Cartella in cui creare l'albero (default: temp di sistema)")
+    parser.add_argument("--keep", action="store_true", help="Non cancellare l'albero generato")
+    parser.add_argument("--output", help="Salva il risultato JSON su file (default: stdout)")
+    parser.add_argument("--compare", help="JSON di un'esecuzione precedente da usare come baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Rallentamento massimo tollerato (0.10 = +10%%)")
+    parser.add_argument("--min-delta", type=float, default=DEFAULT_MIN_DELTA,
+                        help="Secondi in più sotto cui una differenza è considerata rumore")
+    parser.add_argument("--memory-probe", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--spec-json", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    spec = dict(TREE_PRESETS[args.preset])
+    if args.spec:
+        with open(args.spec, encoding="utf-8") as f:
+            spec.update(json.load(f))
+    if args.spec_json:
+        spec.update(json.loads(args.spec_json))
+    if args.memory_probe:
+        # Processo figlio del benchmark "memory"
+        print(json.dumps(memory_probe(args.memory_probe, spec, args.seed)))
+        return 0
+    only = [name.strip() for name in args.only.split(",")] if args.only else None
+
+    result = run_suite(spec, seed=args.seed, only=only, repeat=args.repeat, workdir=args.workdir,
+                       keep=args.keep, hash_algorithm=args.hash_algorithm)
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        result["comparison"] = compare_results(result, baseline, args.threshold, args.min_delta)
+        if not result["comparison"]["same_tree"]:
+            print("⚠️  Il baseline usa un albero diverso: il confronto è indicativo", file=sys.stderr)
+        for name, row in result["comparison"]["benchmarks"].items():
+            flag = "❌ REGRESSIONE" if row["regression"] else "✅"
+            print(f"{flag} {name}: {row['baseline_seconds']:.4f}s -> {row['current_seconds']:.4f}s "
+                  f"(x{row['ratio']})", file=sys.stderr)
+        if result["comparison"]["regressions"]:
+            exit_code = 1
+
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"📄 Risultati salvati in: {args.output}", file=sys.stderr)
+    else:
+        print(output)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,37 @@
 import os
 import shutil
 import platform
+import asyncio
+import bisect
 import difflib
+import errno
+import gzip
 import hashlib
+import heapq
 import json
+import multiprocessing
+import queue
+import select
+import sqlite3
+import stat
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 
+try:
+    import fcntl  # Solo POSIX: serve per il reflink (FICLONE)
+except ImportError:
+    fcntl = None
+
 # --- CONFIGURAZIONE SICUREZZA ---
 # Cartelle da ignorare TASSATIVAMENTE per evitare di rompere il PC o loop infiniti
 SKIP_DIRS = {
@@ -17,14 +41,5495 @@ SKIP_DIRS = {
     'proc', 'sys', 'dev', 'run', 'boot', 'bin', 'sbin', 'lib', 'usr', 'Applications'
 }
 
+# --- CONFIGURAZIONE WALKER ---
+# scandir rilascia il GIL durante la syscall, quindi più thread tengono occupati
+# NVMe e mount di rete (dove la latenza per cartella domina).
+DEFAULT_WALK_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# Una cartella modificata entro questa finestra dal suo listing viene sempre riletta:
+# molti FS (FAT, SMB, HFS+) hanno mtime con risoluzione di 1-2 secondi
+RACY_WINDOW_NS = 2_000_000_000
+
+
+class DirSnapshot:
+    """[FEATURE 10] Stato di una cartella alla scansione precedente (per il rescan incrementale)."""
+    __slots__ = ('mtime_ns', 'ino', 'nlink', 'listed_ns', 'entries', 'children')
+
+    def __init__(self, mtime_ns: int, ino: int, nlink: int, listed_ns: int, entries: int, children: List[str]):
+        self.mtime_ns = mtime_ns
+        self.ino = ino
+        self.nlink = nlink
+        self.listed_ns = listed_ns
+        self.entries = entries
+        self.children = children
+
+    def unchanged(self, st) -> bool:
+        """
+        Una cartella cambia mtime quando si aggiungono, rimuovono o rinominano voci;
+        nlink segue il numero di sottocartelle e ino rileva una cartella sostituita.
+        """
+        return (st.st_mtime_ns == self.mtime_ns
+                and st.st_ino == self.ino
+                and st.st_nlink == self.nlink
+                and st.st_mtime_ns < self.listed_ns - RACY_WINDOW_NS)
+
+
+class DirVisit:
+    """Risultato della visita di una cartella da parte del walker."""
+    __slots__ = ('path', 'real', 'stat', 'files', 'children', 'entries', 'listed_ns', 'skipped')
+
+    def __init__(self, path: str, real: str):
+        self.path = path
+        self.real = real
+        self.stat = None
+        self.files = None       # Lista di os.DirEntry (None se la cartella non è stata riletta)
+        self.children = []      # Nomi delle sottocartelle da visitare
+        self.entries = 0        # Voci totali lette dal listing
+        self.listed_ns = 0
+        self.skipped = False    # True: invariata dalla scansione precedente
+
+
+class ParallelWalker:
+    """
+    [FEATURE 6] Walker basato su os.scandir con listing parallelo delle cartelle.
+
+    Le cartelle vengono restituite nello stesso ordine di os.walk(topdown=True),
+    ma il listing dei figli parte in anticipo su un pool di thread limitato.
+    Applica le stesse regole di sicurezza dello scan: SKIP_DIRS, cartelle nascoste,
+    symlink non seguiti e path esclusi (Anti-Ouroboros), senza chiamare resolve().
+
+    [FEATURE 10] Con uno stato precedente (path -> DirSnapshot) le cartelle invariate
+    costano una sola stat: non vengono rilette e i figli noti vengono visitati.
+
+    [FEATURE 17] exclude_ids riconosce la destinazione per (st_dev, st_ino) anche se
+    raggiunta da un altro percorso (bind mount, maiuscole diverse); prune_paths sono
+    mount point da non attraversare (esclusi o visitati a parte dal RootPlanner).
+    """
+
+    def __init__(self,
+                 workers: int = DEFAULT_WALK_WORKERS,
+                 skip_dirs=SKIP_DIRS,
+                 exclude_paths=(),
+                 prefetch: Optional[int] = None,
+                 on_excluded=None,
+                 previous_state: Optional[Dict[str, DirSnapshot]] = None,
+                 track_dirs: bool = False,
+                 exclude_ids=(),
+                 prune_paths=(),
+                 on_listed=None,
+                 before_list=None):
+        self.workers = max(1, workers)
+        self.skip_dirs = frozenset(skip_dirs)
+        # Path esclusi normalizzati una sola volta (realpath + normcase)
+        self.exclude_paths = {os.path.normcase(os.path.realpath(p)) for p in exclude_paths}
+        self.exclude_ids = set(exclude_ids)
+        # inode() di DirEntry non costa syscall su POSIX: la stat serve solo se l'inode coincide
+        self._exclude_inodes = {ino for _dev, ino in self.exclude_ids}
+        self.prune_paths = {os.path.normcase(p) for p in prune_paths}
+        # [FEATURE 19] (path, secondi, voci) dopo ogni listing; None = nessuna misura
+        self.on_listed = on_listed
+        # [FEATURE 26] (path) subito prima del listing, sul thread del pool (es. watch inotify)
+        self.before_list = before_list
+        # Quante cartelle possono essere in listing/attesa contemporaneamente
+        self.prefetch = max(self.workers, prefetch or self.workers * 16)
+        self.on_excluded = on_excluded
+        self.previous_state = previous_state
+        # Serve la stat di ogni cartella (per salvarne lo stato) anche senza stato precedente
+        self.track_dirs = track_dirs or previous_state is not None
+        # Statistiche
+        self.dirs_listed = 0
+        self.dirs_skipped = 0
+        self.dirs_errors = 0
+        self.excluded_hits = 0
+
+    def use_previous_state(self, previous_state: Dict[str, DirSnapshot]):
+        """Attiva il rescan incrementale (stato vuoto = rilegge tutto ma registra le stat)."""
+        self.previous_state = previous_state
+        self.track_dirs = True
+
+    def list_dir(self, path: str):
+        """Legge una cartella con scandir. Restituisce (sottocartelle, file) o None se illeggibile."""
+        dirs, files = [], []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        # is_dir() usa d_type: nessuna stat aggiuntiva sulla maggior parte dei FS
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        dirs.append(entry)
+                    else:
+                        files.append(entry)
+        except OSError:
+            # Come os.walk senza onerror: cartella saltata in silenzio
+            return None
+        return dirs, files
+
+    def _visit(self, visit: DirVisit):
+        """Eseguito nel pool: stat (se richiesta), confronto con lo stato precedente e listing."""
+        if self.track_dirs:
+            try:
+                visit.stat = os.stat(visit.path, follow_symlinks=False)
+            except OSError:
+                return None
+            previous = self.previous_state.get(visit.path) if self.previous_state else None
+            if previous is not None and previous.unchanged(visit.stat):
+                visit.skipped = True
+                visit.children = previous.children
+                visit.entries = previous.entries
+                visit.listed_ns = previous.listed_ns
+                return visit
+        if self.before_list:
+            self.before_list(visit.path)
+        visit.listed_ns = time.time_ns()
+        inizio = time.perf_counter() if self.on_listed else 0.0
+        listing = self.list_dir(visit.path)
+        if listing is None:
+            return None
+        dirs, visit.files = listing
+        visit.entries = len(dirs) + len(visit.files)
+        if self.on_listed:
+            self.on_listed(visit.path, time.perf_counter() - inizio, visit.entries)
+        visit.children = self._children(dirs, visit.real)
+        return visit
+
+    def visit(self, path: str, real: Optional[str] = None) -> Optional[DirVisit]:
+        """Visita una sola cartella con le regole del walk (DirVisit.children già filtrati), None se illeggibile."""
+        return self._visit(DirVisit(path, real or os.path.realpath(path)))
+
+    def list_children(self, path: str):
+        """
+        Listing di una sola cartella senza stat né callback: (sottocartelle da visitare, file)
+        o None se illeggibile. Per chi segue l'albero da sé (watch, polling).
+        """
+        listing = self.list_dir(path)
+        if listing is None:
+            return None
+        dirs, files = listing
+        return self._children(dirs, os.path.realpath(path)), files
+
+    def should_visit(self, parent: str, name: str) -> bool:
+        """La sottocartella name di parent rispetta le regole di esclusione del walker."""
+        return not self._excluded(name, os.path.join(os.path.realpath(parent), name))
+
+    def _is_excluded_target(self, real_child: str, entry=None) -> bool:
+        if entry is not None and self.exclude_ids:
+            try:
+                if entry.inode() in self._exclude_inodes:
+                    st = entry.stat(follow_symlinks=False)
+                    if (st.st_dev, st.st_ino) in self.exclude_ids:
+                        return True
+            except OSError:
+                pass
+        return bool(self.exclude_paths) and os.path.normcase(real_child) in self.exclude_paths
+
+    def _excluded(self, name: str, real_child: str, entry=None) -> bool:
+        if self._is_excluded_target(real_child, entry):
+            self.excluded_hits += 1
+            if self.on_excluded:
+                self.on_excluded(real_child)
+            return True
+        if self.prune_paths and os.path.normcase(real_child) in self.prune_paths:
+            return True
+        return name in self.skip_dirs or name.startswith('.')
+
+    def _children(self, dirs, real_parent: str) -> List[str]:
+        """Filtra le sottocartelle da visitare (sicurezza + Anti-Ouroboros)."""
+        children = []
+        for entry in dirs:
+            name = entry.name
+            if self._excluded(name, os.path.join(real_parent, name), entry):
+                continue
+            try:
+                # followlinks=False: i symlink a cartelle non vengono attraversati
+                if entry.is_symlink():
+                    continue
+            except OSError:
+                continue
+            children.append(name)
+        return children
+
+    def walk_dirs(self, root: str):
+        """
+        Generatore di DirVisit in ordine os.walk(topdown=True).
+        Interrompere l'iterazione annulla i listing ancora in coda.
+        """
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hunter-walk")
+        pending = 0
+
+        def refill(stack):
+            # Avvia in anticipo il listing delle prossime cartelle (in ordine di visita)
+            nonlocal pending
+            scanned = 0
+            for node in reversed(stack):
+                if pending >= self.prefetch or scanned >= self.prefetch * 2:
+                    break
+                scanned += 1
+                if node[1] is None:
+                    node[1] = pool.submit(self._visit, node[0])
+                    pending += 1
+
+        try:
+            stack = [[DirVisit(root, os.path.realpath(root)), None]]
+            refill(stack)
+            while stack:
+                visit, future = stack.pop()
+                if future is not None:
+                    result = future.result()
+                    pending -= 1
+                else:
+                    result = self._visit(visit)
+                if result is None:
+                    self.dirs_errors += 1
+                    refill(stack)
+                    continue
+                if visit.skipped:
+                    self.dirs_skipped += 1
+                    # I figli noti vengono ricontrollati: le regole di esclusione possono cambiare
+                    children = [name for name in visit.children
+                                if not self._excluded(name, os.path.join(visit.real, name))]
+                else:
+                    self.dirs_listed += 1
+                    children = visit.children
+                # Figli in ordine inverso: il primo figlio viene visitato per primo (come os.walk)
+                stack.extend([DirVisit(os.path.join(visit.path, name), os.path.join(visit.real, name)), None]
+                             for name in reversed(children))
+                refill(stack)
+                yield visit
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def walk(self, root: str):
+        """Generatore: restituisce (cartella, lista di os.DirEntry dei file) per ogni cartella riletta."""
+        for visit in self.walk_dirs(root):
+            if visit.files is not None:
+                yield visit.path, visit.files
+
+
+# --- CONFIGURAZIONE MOUNT ---
+MOUNTINFO_PATH = "/proc/self/mountinfo"
+# Filesystem virtuali o volatili: non contengono file dell'utente da recuperare
+PSEUDO_FS_TYPES = frozenset({
+    "proc", "sysfs", "devtmpfs", "devpts", "tmpfs", "ramfs", "cgroup", "cgroup2", "securityfs",
+    "pstore", "debugfs", "tracefs", "configfs", "fusectl", "mqueue", "hugetlbfs", "bpf", "autofs",
+    "binfmt_misc", "efivarfs", "rpc_pipefs", "nsfs", "overlay", "squashfs", "selinuxfs",
+    "fuse.gvfsd-fuse", "fuse.portal", "fuse.lxcfs", "fuse.snapfuse",
+})
+# Filesystem di rete: esclusi solo con skip_network_fs=True
+NETWORK_FS_TYPES = frozenset({
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "afs", "ceph", "glusterfs", "lustre", "davfs",
+    "fuse.sshfs", "fuse.rclone", "fuse.s3fs", "fuse.glusterfs", "fuse.davfs2",
+})
+
+
+class MountPoint:
+    """Una riga di /proc/self/mountinfo."""
+    __slots__ = ('mount_id', 'parent_id', 'major', 'minor', 'root', 'path', 'fstype', 'source')
+
+    def __init__(self, mount_id, parent_id, major, minor, root, path, fstype, source):
+        self.mount_id = mount_id
+        self.parent_id = parent_id
+        self.major = major
+        self.minor = minor
+        self.root = root
+        self.path = path
+        self.fstype = fstype
+        self.source = source
+
+    @property
+    def dev(self) -> int:
+        return os.makedev(self.major, self.minor)
+
+
+def _unescape_mount_field(field: str) -> str:
+    # mountinfo codifica spazi, tab, newline e backslash in ottale (\040 ...)
+    if "\\" not in field:
+        return field
+    out, i = [], 0
+    while i < len(field):
+        if field[i] == "\\" and field[i + 1:i + 4].isdigit():
+            out.append(chr(int(field[i + 1:i + 4], 8)))
+            i += 4
+        else:
+            out.append(field[i])
+            i += 1
+    return "".join(out)
+
+
+def read_mountinfo(path: str = MOUNTINFO_PATH) -> List[MountPoint]:
+    """[FEATURE 17] Tabella dei mount (vuota dove /proc/self/mountinfo non esiste)."""
+    mounts = []
+    try:
+        with open(path, encoding="utf-8", errors="surrogateescape") as f:
+            lines = f.readlines()
+    except OSError:
+        return mounts
+    for line in lines:
+        fields = line.split()
+        try:
+            sep = fields.index("-", 6)
+            major, minor = fields[2].split(":")
+            mounts.append(MountPoint(int(fields[0]), int(fields[1]), int(major), int(minor),
+                                     _unescape_mount_field(fields[3]), _unescape_mount_field(fields[4]),
+                                     fields[sep + 1], _unescape_mount_field(fields[sep + 2])))
+        except (ValueError, IndexError):
+            continue
+    return mounts
+
+
+def physical_device(major: int, minor: int) -> str:
+    """
+    Nome del disco fisico di un block device (sda1 -> sda, nvme0n1p2 -> nvme0n1).
+    Per i filesystem senza disco (rete, virtuali) restituisce "major:minor".
+    """
+    try:
+        sys_path = os.path.realpath(f"/sys/dev/block/{major}:{minor}")
+        if os.path.exists(os.path.join(sys_path, "partition")):
+            sys_path = os.path.dirname(sys_path)
+        if os.path.isdir(sys_path):
+            return os.path.basename(sys_path)
+    except OSError:
+        pass
+    return f"{major}:{minor}"
+
+
+def is_rotational(device: str) -> Optional[bool]:
+    """
+    [FEATURE 30] Disco a piatti secondo /sys/block/<disco>/queue/rotational (device è il
+    nome dato da physical_device). None se il valore non è disponibile (rete, non Linux).
+    """
+    try:
+        with open(f"/sys/block/{device}/queue/rotational") as f:
+            return f.read().strip() == "1"
+    except OSError:
+        return None
+
+
+def _is_under(path: str, parent: str) -> bool:
+    return path == parent or path.startswith(parent.rstrip(os.sep) + os.sep)
+
+
+class ScanUnit:
+    """Una porzione di albero da visitare: una root (o un mount sotto una root) e i mount da potare."""
+    __slots__ = ('path', 'device', 'fstype', 'prune')
+
+    def __init__(self, path: str, device: str, fstype: Optional[str], prune: set):
+        self.path = path
+        self.device = device
+        self.fstype = fstype
+        self.prune = prune
+
+
+class RootPlanner:
+    """
+    [FEATURE 17] Pianifica la scansione in base ai mount reali (Linux).
+
+    Legge /proc/self/mountinfo e, per ogni root richiesta, decide quali mount
+    annidati visitare: quelli di tipo virtuale (proc, tmpfs, overlay, FUSE di
+    sistema...) sono esclusi, quelli di rete solo con skip_network; con
+    one_filesystem si resta sul filesystem della root. Un bind mount di una
+    porzione già inclusa viene saltato (stessi file due volte).
+    Ogni mount incluso diventa una ScanUnit raggruppata per disco fisico: la
+    scansione assegna a ogni disco il proprio budget di thread, così un disco
+    USB lento non rallenta quello NVMe. Le root stesse non sono mai escluse.
+    Dove mountinfo non esiste (Windows, macOS) il piano è una unità per root.
+    """
+
+    def __init__(self, skip_pseudo: bool = True, skip_network: bool = False,
+                 one_filesystem: bool = False, mounts: Optional[List[MountPoint]] = None):
+        self.skip_pseudo = skip_pseudo
+        self.skip_network = skip_network
+        self.one_filesystem = one_filesystem
+        self.mounts = read_mountinfo() if mounts is None else mounts
+        self.excluded: List[Dict[str, str]] = []
+
+    def _mount_of(self, path: str) -> Optional[MountPoint]:
+        # Il mount più profondo che contiene path (l'ultimo in caso di mount sovrapposti)
+        best = None
+        for mount in self.mounts:
+            if _is_under(path, mount.path) and (best is None or len(mount.path) >= len(best.path)):
+                best = mount
+        return best
+
+    def _exclusion_reason(self, mount: MountPoint, root_mount: Optional[MountPoint]) -> Optional[str]:
+        if self.skip_pseudo and mount.fstype in PSEUDO_FS_TYPES:
+            return "pseudo"
+        if self.skip_network and mount.fstype in NETWORK_FS_TYPES:
+            return "network"
+        if self.one_filesystem and root_mount is not None and mount.dev != root_mount.dev:
+            return "other_filesystem"
+        return None
+
+    def plan(self, roots: List[str]) -> List[ScanUnit]:
+        self.excluded = []
+        units: List[ScanUnit] = []
+        seen_paths = set()
+        for root in roots:
+            real_root = os.path.realpath(root)
+            root_mount = self._mount_of(real_root)
+            if root_mount is None:
+                units.append(ScanUnit(root, "unknown", None, set()))
+                continue
+            root_unit = ScanUnit(root, physical_device(root_mount.major, root_mount.minor),
+                                 root_mount.fstype, set())
+            units.append(root_unit)
+            # (dev, radice nel filesystem) già coperti: servono a riconoscere i bind mount
+            covered = [(root_mount.dev,
+                        os.path.normpath(os.path.join(root_mount.root, os.path.relpath(real_root, root_mount.path))))]
+            # Mount sovrapposti sullo stesso path: è visibile l'ultimo montato
+            by_path = {m.path: m for m in self.mounts
+                       if m.path != root_mount.path and _is_under(m.path, real_root)}
+            skipped = []
+            for path in sorted(by_path):
+                mount = by_path[path]
+                if path in seen_paths:
+                    continue
+                seen_paths.add(path)
+                # I mount sotto un mount escluso non sono raggiungibili
+                if any(_is_under(path, p) for p in skipped):
+                    continue
+                root_unit.prune.add(path)
+                reason = self._exclusion_reason(mount, root_mount)
+                if reason is None and any(dev == mount.dev and _is_under(mount.root, r) for dev, r in covered):
+                    reason = "bind_mount"
+                if reason is not None:
+                    skipped.append(path)
+                    self.excluded.append({"path": path, "fstype": mount.fstype, "reason": reason})
+                    continue
+                covered.append((mount.dev, mount.root))
+                units.append(ScanUnit(mount.path, physical_device(mount.major, mount.minor),
+                                      mount.fstype, set()))
+        # Ogni unità pota tutti i mount che sono visitati (o esclusi) separatamente
+        prune_all = set().union(*(u.prune for u in units)) if units else set()
+        for unit in units:
+            unit.prune = {p for p in prune_all if p != unit.path and _is_under(p, os.path.realpath(unit.path))}
+        return units
+
+    @staticmethod
+    def group_by_device(units: List[ScanUnit]) -> Dict[str, List[ScanUnit]]:
+        groups: Dict[str, List[ScanUnit]] = {}
+        for unit in units:
+            groups.setdefault(unit.device, []).append(unit)
+        return groups
+
+
+# --- CONFIGURAZIONE FUZZY MATCH ---
+# Soglia storica di fuzzy_match: il nome è accettato se ratio() > 0.65
+FUZZY_THRESHOLD = 0.65
+
+
+class FuzzyMatcher:
+    """
+    [FEATURE 11] Matcher fuzzy compilato una volta per query.
+
+    Decisioni identiche a fuzzy_match (substring, poi SequenceMatcher.ratio() > soglia)
+    ma prima del calcolo costoso applica due limiti superiori del ratio:
+    - lunghezze: 2*min(la, lb) / (la + lb)       (come real_quick_ratio)
+    - istogramma: caratteri in comune / (la + lb) (come quick_ratio)
+    Se uno dei due non supera la soglia il ratio vero non può farlo.
+    La query resta la prima sequenza (a), quindi il ratio è esattamente quello storico.
+    """
+
+    def __init__(self, query: Optional[str], threshold: float = FUZZY_THRESHOLD):
+        self.query = query
+        self.threshold = threshold
+        self.match_all = not query
+        self.query_clean = query.lower() if query else ""
+        self.query_len = len(self.query_clean)
+        # Istogramma della query: (carattere, occorrenze)
+        self.query_counts = tuple(Counter(self.query_clean).items())
+        # Un SequenceMatcher per thread con la query già impostata come sequenza "a"
+        self._local = threading.local()
+        # Statistiche: quanti nomi sono stati decisi da ciascun controllo
+        self.stats = {"substring": 0, "length_bound": 0, "histogram_bound": 0, "full_ratio": 0}
+
+    def _sequence_matcher(self) -> difflib.SequenceMatcher:
+        matcher = getattr(self._local, "matcher", None)
+        if matcher is None:
+            matcher = difflib.SequenceMatcher(None, self.query_clean, "")
+            self._local.matcher = matcher
+        return matcher
+
+    def _match_clean(self, name_clean: str) -> bool:
+        query = self.query_clean
+        # 1. Match Esatto o Parziale (Contiene la stringa)
+        if query in name_clean:
+            self.stats["substring"] += 1
+            return True
+        total = self.query_len + len(name_clean)
+        # 2. Limite sulle lunghezze: i caratteri in comune non superano la stringa più corta
+        if 2.0 * min(self.query_len, len(name_clean)) / total <= self.threshold:
+            self.stats["length_bound"] += 1
+            return False
+        # 3. Limite sull'istogramma: conteggio dei caratteri in comune (str.count è in C)
+        common = 0
+        for char, count in self.query_counts:
+            found = name_clean.count(char)
+            common += count if found > count else found
+        if 2.0 * common / total <= self.threshold:
+            self.stats["histogram_bound"] += 1
+            return False
+        # 4. Ratio completo, solo per i candidati rimasti
+        self.stats["full_ratio"] += 1
+        matcher = self._sequence_matcher()
+        matcher.set_seq2(name_clean)
+        return matcher.ratio() > self.threshold
+
+    def match(self, name: str) -> bool:
+        """Restituisce True se il nome file assomiglia alla query."""
+        if self.match_all:
+            return True
+        return self._match_clean(name.lower())
+
+    def match_many(self, names: List[str]) -> List[bool]:
+        """Valuta in blocco i nomi di una cartella (stesso risultato di match() per ciascuno)."""
+        if self.match_all:
+            return [True] * len(names)
+        match_clean = self._match_clean
+        return [match_clean(name.lower()) for name in names]
+
+
+# --- CONFIGURAZIONE FILTRI ---
+# Vicino ai limiti di data (secondi) si decide con datetime come check_date_filter:
+# copre l'arrotondamento ai microsecondi e l'ora ripetuta del cambio d'ora legale
+DATE_BOUND_MARGIN = 3601.0
+
+
+class FilePredicate:
+    """
+    [FEATURE 23] Filtri della ricerca compilati una volta sola.
+
+    Estensioni in un frozenset, query nel FuzzyMatcher, limiti di data come epoch
+    invece di datetime. I controlli vanno dal più economico: estensione e nome
+    usano solo DirEntry.name, dimensione e data la stat già in cache del DirEntry.
+    Path e record di log si costruiscono solo per i file che passano o che vanno
+    registrati come filtrati. Gli esiti sono quelli di check_size_filter,
+    check_date_filter e fuzzy_match.
+    """
+
+    def __init__(self, extensions: List[str], query: Optional[str] = None,
+                 min_size: Optional[int] = None, max_size: Optional[int] = None,
+                 date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+        self.extensions = frozenset(e.lower().strip() for e in extensions)
+        self.matcher = FuzzyMatcher(query)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.date_from = date_from
+        self.date_to = date_to
+        self.ts_from = date_from.timestamp() if date_from is not None else None
+        self.ts_to = date_to.timestamp() if date_to is not None else None
+
+    @staticmethod
+    def extension(name: str) -> str:
+        """Come os.path.splitext(name)[1].lower() per un nome senza separatori."""
+        i = name.rfind('.')
+        if i <= 0:
+            return ""
+        # I punti iniziali non separano un'estensione (".jpg" e "..jpg" non ne hanno)
+        if name[i - 1] == '.' and not name[:i].strip('.'):
+            return ""
+        return name[i:].lower()
+
+    def match(self, files, metrics: Optional["ScanMetrics"] = None) -> list:
+        """Estensione e poi nome (fuzzy, in blocco): solo DirEntry.name, nessuna syscall."""
+        extension, extensions = self.extension, self.extensions
+        candidati = [entry for entry in files if extension(entry.name) in extensions]
+        if not candidati:
+            return candidati
+        if metrics is not None:
+            inizio = time.perf_counter()
+            esiti = self.matcher.match_many([entry.name for entry in candidati])
+            metrics.observe("match", time.perf_counter() - inizio, calls=len(candidati))
+        elif self.matcher.match_all:
+            return candidati
+        else:
+            esiti = self.matcher.match_many([entry.name for entry in candidati])
+        return [entry for entry, nome_ok in zip(candidati, esiti) if nome_ok]
+
+    def date_ok(self, mtime: float) -> bool:
+        ts_from, ts_to = self.ts_from, self.ts_to
+        if ts_from is not None and mtime < ts_from + DATE_BOUND_MARGIN:
+            if mtime <= ts_from - DATE_BOUND_MARGIN:
+                return False
+            return self._date_ok_exact(mtime)
+        if ts_to is not None and mtime > ts_to - DATE_BOUND_MARGIN:
+            if mtime >= ts_to + DATE_BOUND_MARGIN:
+                return False
+            return self._date_ok_exact(mtime)
+        return True
+
+    def _date_ok_exact(self, mtime: float) -> bool:
+        file_datetime = datetime.fromtimestamp(mtime)
+        if self.date_from is not None and file_datetime < self.date_from:
+            return False
+        if self.date_to is not None and file_datetime > self.date_to:
+            return False
+        return True
+
+    def filter(self, current_root: str, candidati, metrics: Optional["ScanMetrics"] = None,
+               governor: Optional["IOGovernor"] = None) -> list:
+        """
+        Dimensione e data sulle voci di una cartella. Restituisce gli esiti in ordine:
+        ("file", voce, stat), ("filtered", record) oppure ("error", record).
+        [FEATURE 29] Con governor ogni stat passa dai suoi limiti.
+        """
+        min_size, max_size = self.min_size, self.max_size
+        check_date = self.ts_from is not None or self.ts_to is not None
+        base = None
+        esiti = []
+        for entry in candidati:
+            try:
+                # DirEntry riusa la stat in cache
+                if metrics is not None:
+                    inizio = time.perf_counter()
+                    file_stat = entry.stat() if governor is None else governor.run("stat", None, 0, entry.stat)
+                    metrics.observe("stat", time.perf_counter() - inizio)
+                elif governor is not None:
+                    file_stat = governor.run("stat", None, 0, entry.stat)
+                else:
+                    file_stat = entry.stat()
+                file_size = file_stat.st_size
+                if (min_size is None or file_size >= min_size) and (max_size is None or file_size <= max_size):
+                    if not check_date or self.date_ok(file_stat.st_mtime):
+                        esiti.append(("file", entry, file_stat))
+                        continue
+                    status = "filtered_date"
+                else:
+                    status = "filtered_size"
+                record = {"file": None, "status": status}
+                if status == "filtered_size":
+                    record["size"] = file_size
+                else:
+                    record["mtime"] = datetime.fromtimestamp(file_stat.st_mtime).isoformat()
+                esiti.append(("filtered", record))
+            except Exception as e:
+                record = {"file": None, "status": "error", "error": str(e)}
+                esiti.append(("error", record))
+            # Stesso testo di str(Path(entry.path)) con un solo Path per cartella
+            if base is None:
+                base = str(Path(current_root))
+            record["file"] = os.path.join(base, entry.name) if base != "." else entry.name
+        return esiti
+
+
+# --- CONFIGURAZIONE HASHING ---
+# "md5" resta il default per compatibilità con cache, cataloghi e report esistenti;
+# "blake2b" è il più veloce in puro software sulle CPU a 64 bit
+HASH_ALGORITHMS = ("md5", "sha1", "sha256", "blake2b")
+DEFAULT_HASH_ALGORITHM = "md5"
+# Buffer riusato da readinto: pochi giri dell'interprete per file
+HASH_BUFFER_SIZE = 1024 * 1024
+# hashlib rilascia il GIL: più file possono essere hashati insieme su thread diversi
+DEFAULT_HASH_WORKERS = 4
+
+
+class FileHasher:
+    """
+    [FEATURE 15] Calcolo degli hash con algoritmo selezionabile.
+
+    Legge con readinto in un buffer per thread (nessun bytes nuovo per blocco), a
+    qualsiasi dimensione: niente mmap, che su un file troncato durante la lettura
+    chiude il processo con SIGBUS invece di sollevare un'eccezione. Il nome dell'algoritmo è anche il "tipo" di digest
+    nella cache hash, così digest di algoritmi diversi non si mescolano mai.
+    """
+
+    def __init__(self, algorithm: str = DEFAULT_HASH_ALGORITHM, buffer_size: int = HASH_BUFFER_SIZE):
+        algorithm = algorithm.lower()
+        if algorithm not in HASH_ALGORITHMS:
+            raise ValueError(f"Algoritmo di hash non supportato: {algorithm} (disponibili: {HASH_ALGORITHMS})")
+        self.algorithm = algorithm
+        self.buffer_size = buffer_size
+        self._local = threading.local()
+
+    def _buffer(self) -> memoryview:
+        view = getattr(self._local, "view", None)
+        if view is None:
+            view = self._local.view = memoryview(bytearray(self.buffer_size))
+        return view
+
+    def sample_kind(self, sample_size: int) -> str:
+        return f"{self.algorithm}-sample-{sample_size}"
+
+    def hash_file(self, filepath) -> str:
+        """Digest esadecimale dell'intero file."""
+        h = hashlib.new(self.algorithm)
+        with open(filepath, "rb", buffering=0) as f:
+            view = self._buffer()
+            while True:
+                n = f.readinto(view)
+                if not n:
+                    break
+                h.update(view[:n])
+        return h.hexdigest()
+
+    def hash_copy(self, src, dst) -> str:
+        """[FEATURE 28] Copia src in dst e restituisce il digest completo: ogni blocco è letto una volta sola."""
+        h = hashlib.new(self.algorithm)
+        view = self._buffer()
+        with open(src, "rb", buffering=0) as fsrc, open(dst, "wb", buffering=0) as fdst:
+            while True:
+                n = fsrc.readinto(view)
+                if not n:
+                    break
+                chunk = view[:n]
+                h.update(chunk)
+                while chunk:
+                    chunk = chunk[fdst.write(chunk):]
+        return h.hexdigest()
+
+    def hash_sample(self, filepath, file_size: int, sample_size: int) -> str:
+        """Digest di testa e coda del file (sample_size byte ciascuna)."""
+        h = hashlib.new(self.algorithm)
+        view = self._buffer()
+        with open(filepath, "rb", buffering=0) as f:
+            for offset in (0, max(sample_size, file_size - sample_size)):
+                if offset and file_size <= sample_size:
+                    break
+                f.seek(offset)
+                remaining = sample_size
+                while remaining:
+                    n = f.readinto(view[:min(remaining, len(view))])
+                    if not n:
+                        break
+                    h.update(view[:n])
+                    remaining -= n
+        return h.hexdigest()
+
+
+# --- CONFIGURAZIONE MEMORIA COMPATTA ---
+# Digest nuovi tenuti in un set prima di fonderli nella tabella ordinata (minimo)
+DIGEST_TABLE_MERGE = 4096
+# Segnaposto della destinazione nei record di anteprima
+DRY_RUN_DESTINATION = "N/A (dry-run)"
+
+
+def _digest_bytes(digest):
+    """Digest esadecimale -> bytes grezzi (metà dello spazio); altri valori (es. "error_...") invariati."""
+    if digest is None or type(digest) is bytes:
+        return digest
+    try:
+        raw = bytes.fromhex(digest)
+    except (TypeError, ValueError):
+        return digest
+    # Solo se la conversione è reversibile (minuscole, nessuno spazio)
+    return raw if raw.hex() == digest else digest
+
+
+def _digest_hex(value):
+    return value.hex() if type(value) is bytes else value
+
+
+def _format_size(size_bytes) -> str:
+    """Bytes in formato leggibile (KB, MB, GB): usato da FileHunter.format_size e dai report."""
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+        if size_bytes < 1024.0:
+            return f"{size_bytes:.2f} {unit}"
+        size_bytes /= 1024.0
+    return f"{size_bytes:.2f} PB"
+
+
+def _format_mtime(stamp) -> Optional[str]:
+    # I record compatti tengono l'mtime numerico; quelli letti da un journal la stringa già pronta
+    if stamp is None or type(stamp) is str:
+        return stamp
+    return datetime.fromtimestamp(stamp).isoformat()
+
+
+class _DigestTable:
+    """Vista ordinata su un bytearray di digest di larghezza fissa (per bisect)."""
+    __slots__ = ('data', 'width')
+
+    def __init__(self, width: int):
+        self.data = bytearray()
+        self.width = width
+
+    def __len__(self):
+        return len(self.data) // self.width
+
+    def __getitem__(self, index: int):
+        start = index * self.width
+        return self.data[start:start + self.width]
+
+    def __contains__(self, raw: bytes) -> bool:
+        index = bisect.bisect_left(self, raw)
+        return index < len(self) and self[index] == raw
+
+    def merge(self, new_digests: List[bytes]):
+        """Inserisce digest (ordinati, non presenti) copiando la tabella una volta sola."""
+        merged = bytearray()
+        start = 0
+        for raw in new_digests:
+            index = bisect.bisect_left(self, raw, lo=start // self.width) * self.width
+            merged += self.data[start:index]
+            merged += raw
+            start = index
+        merged += self.data[start:]
+        self.data = merged
+
+
+class DigestSet:
+    """
+    [FEATURE 27] Insieme di digest compatto, al posto del set di stringhe esadecimali
+    (processed_hashes e DuplicateFinder.digests).
+
+    I digest sono bytes grezzi in tabelle ordinate per larghezza (un bytearray con
+    ricerca binaria): 16 byte per un MD5 invece di ~130 tra stringa e slot del set.
+    Gli ultimi arrivati restano in un piccolo set finché non vengono fusi nella
+    tabella. Riceve e restituisce stringhe esadecimali come prima; i valori non
+    esadecimali ("error_<path>") restano in un set a parte.
+    """
+
+    def __init__(self, digests=()):
+        self._tables: Dict[int, _DigestTable] = {}
+        self._recent: set = set()
+        self._other: set = set()
+        self._size = 0
+        for digest in digests:
+            self.add(digest)
+
+    def _known(self, raw: bytes) -> bool:
+        table = self._tables.get(len(raw))
+        return raw in self._recent or (table is not None and raw in table)
+
+    def add(self, digest):
+        raw = _digest_bytes(digest)
+        if type(raw) is not bytes:
+            self._other.add(raw)
+            return
+        if self._known(raw):
+            return
+        self._recent.add(raw)
+        # Fusione ogni 1/32 della tabella: costo di copia ammortizzato e set recente piccolo
+        if len(self._recent) >= max(DIGEST_TABLE_MERGE, self._size // 32):
+            self._merge()
+
+    def _merge(self):
+        per_width: Dict[int, List[bytes]] = {}
+        for raw in self._recent:
+            per_width.setdefault(len(raw), []).append(raw)
+        for width, new_digests in per_width.items():
+            self._tables.setdefault(width, _DigestTable(width)).merge(sorted(new_digests))
+        self._size += len(self._recent)
+        self._recent = set()
+
+    def __contains__(self, digest) -> bool:
+        raw = _digest_bytes(digest)
+        if type(raw) is not bytes:
+            return raw in self._other
+        return self._known(raw)
+
+    def __len__(self) -> int:
+        return self._size + len(self._recent) + len(self._other)
+
+    def __iter__(self):
+        for table in self._tables.values():
+            for index in range(len(table)):
+                yield table[index].hex()
+        for raw in list(self._recent):
+            yield raw.hex()
+        yield from list(self._other)
+
+    def clear(self):
+        self._tables.clear()
+        self._recent = set()
+        self._other = set()
+        self._size = 0
+
+
+class _CompactStat:
+    """La parte di una stat che serve ancora dopo il filtro: dimensione e chiave della cache hash."""
+    __slots__ = ('st_size', 'st_mtime_ns', 'st_dev', 'st_ino')
+
+    def __init__(self, size: int, mtime_ns: int, dev: int, ino: int):
+        self.st_size = size
+        self.st_mtime_ns = mtime_ns
+        self.st_dev = dev
+        self.st_ino = ino
+
+    @property
+    def st_mtime(self) -> float:
+        return self.st_mtime_ns / 1e9
+
+    @classmethod
+    def of(cls, st):
+        # Le stat già compatte (catalogo, questa classe) restano come sono
+        if st is None or type(st) is not os.stat_result:
+            return st
+        return cls(st.st_size, st.st_mtime_ns, st.st_dev, st.st_ino)
+
+
+# Chiavi (nell'ordine del JSON) dei record di log che LogRecord sa rappresentare
+_LOG_SHAPES = (
+    ("file", "destination", "status", "size", "size_formatted", "modified", "hash", "mode"),
+    ("file", "status", "hash"),
+    ("file", "status", "error"),
+    ("file", "status", "size"),
+    ("file", "status", "mtime"),
+)
+_LOG_SHAPE_INDEX = {keys: index for index, keys in enumerate(_LOG_SHAPES)}
+_LOG_FIELDS = {
+    "file": lambda r: r.folder + r.name,
+    "destination": lambda r: r.dest_name if r.dest_folder is None else r.dest_folder + r.dest_name,
+    "status": lambda r: r.status,
+    "size": lambda r: r.size,
+    "size_formatted": lambda r: _format_size(r.size),
+    "modified": lambda r: _format_mtime(r.stamp),
+    "mtime": lambda r: _format_mtime(r.stamp),
+    "hash": lambda r: _digest_hex(r.digest),
+    "mode": lambda r: r.mode,
+    "error": lambda r: r.error,
+}
+
+
+def _split_path(path: Optional[str]):
+    # (cartella con separatore finale, nome): la cartella viene condivisa da CompactLog
+    if path is None:
+        return None, None
+    index = path.rfind(os.sep) + 1
+    return path[:index], path[index:]
+
+
+class LogRecord(Mapping):
+    """
+    [FEATURE 27] Record di log compatto (slots) con la stessa interfaccia in lettura
+    del dizionario che rappresenta. Dimensione formattata, data ISO ed hash
+    esadecimale vengono prodotti solo quando il record viene letto o scritto.
+    """
+    __slots__ = ('shape', 'folder', 'name', 'status', 'size', 'stamp', 'digest',
+                 'dest_folder', 'dest_name', 'mode', 'error')
+
+    def __init__(self, shape: int, file: Optional[str], status: str, size=None, stamp=None, digest=None,
+                 destination: Optional[str] = None, mode: Optional[str] = None, error=None):
+        self.shape = shape
+        self.folder, self.name = _split_path(file)
+        self.status = sys.intern(status) if type(status) is str else status
+        self.size = size
+        self.stamp = stamp
+        self.digest = _digest_bytes(digest)
+        if destination is None or destination == DRY_RUN_DESTINATION:
+            self.dest_folder, self.dest_name = None, destination
+        else:
+            self.dest_folder, self.dest_name = _split_path(destination)
+            if self.dest_name == self.name:
+                self.dest_name = self.name
+        self.mode = sys.intern(mode) if type(mode) is str else mode
+        self.error = error
+
+    @classmethod
+    def success(cls, source_path, dest_path, size: int, mtime: float, digest, mode: str):
+        """Record di un file trasferito (dest_path None = anteprima)."""
+        return cls(0, str(source_path), "success", size, mtime, digest,
+                   str(dest_path) if dest_path is not None else DRY_RUN_DESTINATION, mode)
+
+    @classmethod
+    def from_dict(cls, record: Dict[str, Any]):
+        """Versione compatta di un record dizionario, o None se la forma non è nota."""
+        shape = _LOG_SHAPE_INDEX.get(tuple(record))
+        if shape is None or not isinstance(record.get("file"), str):
+            return None
+        get = record.get
+        return cls(shape, record["file"], record["status"], get("size"), get("modified", get("mtime")),
+                   get("hash"), get("destination"), get("mode"), get("error"))
+
+    def __getitem__(self, key):
+        if key not in _LOG_SHAPES[self.shape]:
+            raise KeyError(key)
+        return _LOG_FIELDS[key](self)
+
+    def __iter__(self):
+        return iter(_LOG_SHAPES[self.shape])
+
+    def __len__(self):
+        return len(_LOG_SHAPES[self.shape])
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {key: _LOG_FIELDS[key](self) for key in _LOG_SHAPES[self.shape]}
+
+
+def _plain_record(record) -> Dict[str, Any]:
+    """Dizionario JSON-serializzabile di un record di log (compatto o no)."""
+    return record.as_dict() if type(record) is LogRecord else record
+
+
+class CompactLog:
+    """
+    [FEATURE 27] Log in memoria compatto (scan_log): i record vengono tenuti come
+    LogRecord con le cartelle condivise e tornano dizionari quando si leggono
+    (iterazione, indice, to_list). I record di forma sconosciuta restano dizionari.
+    """
+
+    def __init__(self, records=()):
+        self._records: list = []
+        self._folders: Dict[str, str] = {}
+        for record in records:
+            self.append(record)
+
+    def append(self, record):
+        if type(record) is not LogRecord:
+            compatto = LogRecord.from_dict(record)
+            if compatto is None:
+                self._records.append(record)
+                return
+            record = compatto
+        folders = self._folders
+        record.folder = folders.setdefault(record.folder, record.folder)
+        if record.dest_folder is not None:
+            record.dest_folder = folders.setdefault(record.dest_folder, record.dest_folder)
+        self._records.append(record)
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def clear(self):
+        self._records.clear()
+        self._folders.clear()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [_plain_record(record) for record in self._records[index]]
+        return _plain_record(self._records[index])
+
+    def __iter__(self):
+        for record in self._records:
+            yield _plain_record(record)
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Il log come lista di dizionari (per il report JSON)."""
+        return [_plain_record(record) for record in self._records]
+
+
+# --- CONFIGURAZIONE DEDUPLICAZIONE ---
+# Byte letti all'inizio e alla fine del file per il confronto "campione"
+SAMPLE_SIZE = 64 * 1024
+
+
+class _ContentRecord:
+    """
+    Un contenuto già accettato: dove leggerlo e quali digest sono stati calcolati.
+    [FEATURE 27] Percorso come stringa, stat ridotta a _CompactStat e digest come
+    bytes grezzi (digest e sample restituiscono comunque stringhe esadecimali).
+    """
+    __slots__ = ('path', 'size', 'stat', '_sample', '_digest', 'charged', 'pending', 'rid')
+
+    def __init__(self, path, size: int, stat=None, digest: Optional[str] = None):
+        self.path = os.fspath(path)
+        self.size = size
+        self.stat = _CompactStat.of(stat)
+        self._sample = None
+        # Digest già noto (es. dal catalogo): non costa letture
+        self._digest = _digest_bytes(digest)
+        # Stadio fino a cui il contenuto è stato letto: 0 nulla, 1 campione, 2 tutto
+        self.charged = 0
+        # Trasferimento in corso (Future): il contenuto va letto solo a spostamento concluso
+        self.pending = None
+        # [FEATURE 20] Identificativo nel journal del job (assegnato al primo checkpoint)
+        self.rid = None
+
+    @property
+    def digest(self) -> Optional[str]:
+        return _digest_hex(self._digest)
+
+    @digest.setter
+    def digest(self, value: Optional[str]):
+        self._digest = _digest_bytes(value)
+
+    @property
+    def sample(self) -> Optional[str]:
+        return _digest_hex(self._sample)
+
+    @sample.setter
+    def sample(self, value: Optional[str]):
+        self._sample = _digest_bytes(value)
+
+
+class DuplicateFinder:
+    """
+    [FEATURE 7] Deduplicazione a stadi: dimensione -> campione testa/coda -> hash completo.
+
+    Un file con dimensione mai vista non può essere un duplicato e non viene letto.
+    Se la dimensione collide si confronta un digest del campione (testa + coda) e
+    solo se anche quello collide si calcola l'hash completo. I digest dei file già
+    accettati vengono calcolati in modo lazy, solo quando arriva un concorrente.
+    Il primo file incontrato vince, come nella deduplicazione classica.
+    [FEATURE 15] Con un executor i digest che servono insieme (il nuovo file e i
+    concorrenti) vengono calcolati in parallelo; l'esito non cambia.
+    [FEATURE 20] Con dirty impostato a {} registra i contenuti accettati o
+    aggiornati, che il job salva nel journal e restore() ricarica.
+    """
+
+    def __init__(self, full_hasher, sample_hasher, sample_size: int = SAMPLE_SIZE, digests=None,
+                 executor=None):
+        self.full_hasher = full_hasher      # (path, stat) -> digest completo
+        self.sample_hasher = sample_hasher  # (path, size, sample_size, stat) -> digest campione
+        self.sample_size = sample_size
+        self.executor = executor
+        # Insieme di tutti gli hash completi calcolati (compatibile con processed_hashes)
+        self.digests = digests if digests is not None else DigestSet()
+        # size -> contenuti accettati; (size, campione) -> contenuti con quel campione
+        # [FEATURE 27] Una dimensione con un solo contenuto punta al record, senza lista
+        self.by_size: Dict[int, Any] = {}
+        self.by_sample: Dict[tuple, List[_ContentRecord]] = {}
+        # Contatori: byte letti e byte risparmiati da ciascuno stadio
+        self.stats = {
+            "bytes_avoided_size": 0,
+            "bytes_avoided_sample": 0,
+            "bytes_read_sample": 0,
+            "bytes_read_full": 0,
+            "sample_hashes": 0,
+            "full_hashes": 0,
+        }
+        # [FEATURE 20] Contenuti modificati dall'ultimo checkpoint (dict usato come insieme ordinato)
+        self.dirty: Optional[Dict[_ContentRecord, None]] = None
+
+    def _touch(self, record: _ContentRecord):
+        if self.dirty is not None:
+            self.dirty[record] = None
+
+    def _sample_len(self, size: int) -> int:
+        return min(size, 2 * self.sample_size)
+
+    def _is_small(self, size: int) -> bool:
+        # Se testa + coda coprono tutto il file il campione coincide con il file intero
+        return size <= 2 * self.sample_size
+
+    @staticmethod
+    def _wait_pending(record: _ContentRecord):
+        # Uno spostamento in corso cambia record.path: si aspetta che finisca
+        if record.pending is not None:
+            try:
+                record.pending.result()
+            except Exception:
+                pass
+            record.pending = None
+
+    @staticmethod
+    def records(bucket) -> list:
+        """I contenuti di una voce di by_size (record singolo o lista)."""
+        return [bucket] if type(bucket) is _ContentRecord else bucket
+
+    def _ensure_sample(self, record: _ContentRecord, sample: Optional[str] = None):
+        if record._sample is not None:
+            return
+        if self._is_small(record.size):
+            # Per i file piccoli il "campione" è direttamente l'hash completo
+            self._ensure_digest(record)
+            record._sample = record._digest
+            return
+        if sample is None:
+            self._wait_pending(record)
+            sample = self.sample_hasher(record.path, record.size, self.sample_size, record.stat)
+        record.sample = sample
+        self._touch(record)
+        sample_len = self._sample_len(record.size)
+        self.stats["sample_hashes"] += 1
+        self.stats["bytes_read_sample"] += sample_len
+        if record.charged == 0:
+            self.stats["bytes_avoided_size"] -= record.size
+            self.stats["bytes_avoided_sample"] += record.size - sample_len
+            record.charged = 1
+
+    def full_digest(self, record: _ContentRecord) -> str:
+        """[FEATURE 24] Hash completo di un contenuto restituito da check(), calcolato solo se manca."""
+        self._ensure_digest(record)
+        return record.digest
+
+    def _ensure_digest(self, record: _ContentRecord, digest: Optional[str] = None):
+        if record._digest is not None:
+            return
+        if digest is None:
+            self._wait_pending(record)
+            digest = self.full_hasher(record.path, record.stat)
+        record.digest = digest
+        self._touch(record)
+        self.digests.add(record.digest)
+        self.stats["full_hashes"] += 1
+        self.stats["bytes_read_full"] += record.size
+        if record.charged == 0:
+            self.stats["bytes_avoided_size"] -= record.size
+        elif record.charged == 1:
+            self.stats["bytes_avoided_sample"] -= record.size - self._sample_len(record.size)
+        record.charged = 2
+
+    def _prefetch(self, records: List[_ContentRecord], full: bool):
+        """[FEATURE 15] Calcola in parallelo i digest mancanti (campioni o hash completi)."""
+        if self.executor is None:
+            return
+        # Per i file piccoli il campione è l'hash completo
+        todo = [r for r in records
+                if r._digest is None and (full or r._sample is None or self._is_small(r.size))]
+        if len(todo) < 2:
+            return
+        for record in todo:
+            self._wait_pending(record)
+
+        def lavoro(record):
+            if full or self._is_small(record.size):
+                return self.full_hasher(record.path, record.stat)
+            return self.sample_hasher(record.path, record.size, self.sample_size, record.stat)
+
+        for record, value in zip(todo, self.executor.map(lavoro, todo)):
+            if full or self._is_small(record.size):
+                self._ensure_digest(record, value)
+            else:
+                self._ensure_sample(record, value)
+
+    def _index_sample(self, record: _ContentRecord):
+        self._ensure_sample(record)
+        self.by_sample.setdefault((record.size, record._sample), []).append(record)
+
+    def check(self, path, size: int, stat=None, digest: Optional[str] = None):
+        """
+        Restituisce (is_duplicate, record). Se non è un duplicato il record viene
+        registrato come nuovo contenuto e può essere aggiornato con relocate().
+        La stat (opzionale) permette di consultare la cache hash senza altre syscall;
+        digest (opzionale) è un hash completo già noto che evita la lettura.
+        """
+        record = _ContentRecord(path, size, stat, digest)
+        if digest is not None:
+            self.digests.add(digest)
+        self.stats["bytes_avoided_size"] += size
+        bucket = self.by_size.get(size)
+        if bucket is None:
+            # Stadio 1: dimensione unica -> nessuna lettura
+            self.by_size[size] = record
+            self._touch(record)
+            return False, record
+        if type(bucket) is _ContentRecord:
+            # Il primo contenuto di questa dimensione ha ora un concorrente
+            first = bucket
+            bucket = self.by_size[size] = [first]
+            self._prefetch([first, record], full=False)
+            self._index_sample(first)
+
+        # Stadio 2: campione testa/coda (o hash completo per i file piccoli)
+        self._ensure_sample(record)
+        group = self.by_sample.get((size, record._sample))
+
+        # Stadio 3: hash completo solo se anche il campione collide
+        if group:
+            self._prefetch([record, *group], full=True)
+            self._ensure_digest(record)
+            for other in group:
+                self._ensure_digest(other)
+                if other._digest == record._digest:
+                    if self.dirty is not None:
+                        # Un duplicato non entra nello stato da salvare
+                        self.dirty.pop(record, None)
+                    return True, record
+
+        bucket.append(record)
+        self.by_sample.setdefault((size, record._sample), []).append(record)
+        self._touch(record)
+        return False, record
+
+    def restore(self, rows, stats: Optional[Dict[str, int]] = None):
+        """
+        [FEATURE 20] Ricarica i contenuti salvati nel journal: righe
+        (rid, path, size, sample, digest, charged) nell'ordine di accettazione.
+        """
+        for rid, path, size, sample, digest, charged in rows:
+            record = _ContentRecord(Path(path), size, None, digest)
+            record.sample = sample
+            record.charged = charged
+            record.rid = rid
+            if digest is not None:
+                self.digests.add(digest)
+            bucket = self.by_size.get(size)
+            if bucket is None:
+                self.by_size[size] = record
+            elif type(bucket) is _ContentRecord:
+                self.by_size[size] = [bucket, record]
+            else:
+                bucket.append(record)
+        for bucket in self.by_size.values():
+            # Un gruppo con più contenuti ha sempre i campioni calcolati
+            if type(bucket) is not _ContentRecord:
+                for record in bucket:
+                    self.by_sample.setdefault((record.size, record._sample), []).append(record)
+        if stats:
+            self.stats.update(stats)
+
+    def relocate(self, record: _ContentRecord, new_path):
+        """Aggiorna la posizione del contenuto (es. dopo uno spostamento)."""
+        record.path = os.fspath(new_path)
+        # La stat vecchia non descrive più il file: verrà riletta se serve
+        record.stat = None
+
+
+# --- CONFIGURAZIONE CACHE HASH ---
+DEFAULT_DATA_DIR = os.path.join(os.path.expanduser("~"), ".filehunter")
+DEFAULT_HASH_CACHE_PATH = os.path.join(DEFAULT_DATA_DIR, "hash_cache.sqlite")
+# Limite di righe oltre il quale si eliminano le meno usate (~100 byte l'una)
+DEFAULT_HASH_CACHE_MAX_ENTRIES = 5_000_000
+
+
+class HashCache:
+    """
+    [FEATURE 8] Cache persistente degli hash su SQLite.
+
+    La chiave è (st_dev, st_ino, st_size, st_mtime_ns, tipo di digest): se il file
+    non è cambiato dall'ultima scansione il digest viene restituito senza leggere
+    il contenuto. Le scritture e gli aggiornamenti LRU sono accumulati in memoria
+    e salvati a blocchi; flush()/close() applicano anche il limite di dimensione.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_HASH_CACHE_PATH,
+                 max_entries: int = DEFAULT_HASH_CACHE_MAX_ENTRIES,
+                 batch_size: int = 1000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        parent = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(parent, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS hashes (
+                dev INTEGER NOT NULL,
+                ino INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                path TEXT,
+                last_used INTEGER NOT NULL,
+                PRIMARY KEY (dev, ino, size, mtime_ns, kind)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_hashes_lru ON hashes(last_used)")
+        self._conn.commit()
+        # Timestamp della sessione: usato come "ultimo utilizzo" per l'eviction LRU
+        self._run_stamp = int(datetime.now().timestamp())
+        self._pending_puts = []
+        self._pending_touch = []
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(filepath, file_stat=None):
+        """Costruisce la chiave (dev, ino, size, mtime_ns) o None se il FS non fornisce l'inode."""
+        try:
+            if file_stat is None or not file_stat.st_ino:
+                # Su Windows DirEntry.stat() non riporta l'inode: serve una stat vera
+                file_stat = os.stat(filepath)
+        except OSError:
+            return None
+        if not file_stat.st_ino:
+            return None
+        return (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+
+    def get(self, key, kind: str) -> Optional[str]:
+        if key is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest FROM hashes WHERE dev=? AND ino=? AND size=? AND mtime_ns=? AND kind=?",
+                (*key, kind)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._pending_touch.append((self._run_stamp, *key, kind))
+            if len(self._pending_touch) >= self.batch_size:
+                self._flush_locked()
+            return row[0]
+
+    def put(self, key, kind: str, digest: str, path=None):
+        if key is None or digest.startswith("error_"):
+            return
+        with self._lock:
+            self._pending_puts.append((*key, kind, digest, str(path) if path is not None else None,
+                                       self._run_stamp))
+            if len(self._pending_puts) >= self.batch_size:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if self._pending_puts:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO hashes (dev, ino, size, mtime_ns, kind, digest, path, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self._pending_puts)
+            self._pending_puts = []
+        if self._pending_touch:
+            self._conn.executemany(
+                "UPDATE hashes SET last_used=? WHERE dev=? AND ino=? AND size=? AND mtime_ns=? AND kind=?",
+                self._pending_touch)
+            self._pending_touch = []
+        self._conn.commit()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+
+    def evict(self, max_entries: Optional[int] = None) -> int:
+        """Elimina le righe usate meno di recente finché la cache rientra nel limite."""
+        limit = self.max_entries if max_entries is None else max_entries
+        with self._lock:
+            self._flush_locked()
+            total = self._conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+            excess = total - limit
+            if excess <= 0:
+                return 0
+            # Si scende al 90% del limite per non ripetere l'eviction a ogni scansione
+            excess += limit // 10
+            self._conn.execute(
+                "DELETE FROM hashes WHERE (dev, ino, size, mtime_ns, kind) IN "
+                "(SELECT dev, ino, size, mtime_ns, kind FROM hashes ORDER BY last_used LIMIT ?)",
+                (excess,))
+            self._conn.commit()
+            return min(excess, total)
+
+    def vacuum(self, prune_stale: bool = True) -> Dict[str, int]:
+        """
+        Manutenzione: rimuove le righe di file spariti o modificati (se prune_stale),
+        applica il limite di dimensione e compatta il database con VACUUM.
+        """
+        removed_stale = 0
+        if prune_stale:
+            with self._lock:
+                self._flush_locked()
+                rows = self._conn.execute(
+                    "SELECT dev, ino, size, mtime_ns, kind, path FROM hashes").fetchall()
+            stale = []
+            for dev, ino, size, mtime_ns, kind, path in rows:
+                key = self.key_for(path) if path else None
+                if key != (dev, ino, size, mtime_ns):
+                    stale.append((dev, ino, size, mtime_ns, kind))
+            with self._lock:
+                self._conn.executemany(
+                    "DELETE FROM hashes WHERE dev=? AND ino=? AND size=? AND mtime_ns=? AND kind=?",
+                    stale)
+                self._conn.commit()
+            removed_stale = len(stale)
+        removed_lru = self.evict()
+        with self._lock:
+            self._conn.execute("VACUUM")
+            remaining = self._conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+        return {"removed_stale": removed_stale, "removed_lru": removed_lru, "entries": remaining}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.db_path, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self.evict()
+        with self._lock:
+            self._conn.close()
+
+
+# --- CONFIGURAZIONE I/O ADATTIVO ---
+# La latenza viene normalizzata per blocco da 1 MB: hash e copie di file diversi restano confrontabili
+IO_LATENCY_UNIT = 1024 * 1024
+# AIMD: un worker in più finché la latenza resta entro TOLERANCE volte la base, x BACKOFF quando la supera
+ADAPTIVE_TOLERANCE = 2.0
+ADAPTIVE_BACKOFF = 0.7
+ADAPTIVE_INITIAL = 2
+# Operazioni per finestra di misura (minimo: cresce con la concorrenza)
+ADAPTIVE_WINDOW = 16
+# La base (miglior latenza media) risale di questa frazione a ogni finestra: segue i cambi di carico
+ADAPTIVE_BASELINE_DRIFT = 0.05
+# "low": nice 10 e ioprio best-effort al livello 7; "idle": nice 19 e classe idle (solo disco libero)
+IO_PRIORITIES = {"low": 10, "idle": 19}
+# ioprio_set(2): numero della syscall per architettura e costanti di <linux/ioprio.h>
+_IOPRIO_SYSCALLS = {"x86_64": 251, "amd64": 251, "i386": 289, "i686": 289, "aarch64": 30, "arm64": 30,
+                    "armv7l": 314, "ppc64le": 273, "riscv64": 30, "s390x": 282}
+IOPRIO_CLASS_BE = 2
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_WHO_PROCESS = 1
+
+
+def _set_io_priority(priority: str) -> bool:
+    """ioprio_set(2) sul thread chiamante. False se non supportato (non Linux, architettura sconosciuta)."""
+    numero = _IOPRIO_SYSCALLS.get(platform.machine().lower())
+    if not sys.platform.startswith("linux") or numero is None:
+        return False
+    import ctypes
+    if priority == "idle":
+        valore = IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT
+    else:
+        valore = (IOPRIO_CLASS_BE << IOPRIO_CLASS_SHIFT) | 7
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.syscall(numero, IOPRIO_WHO_PROCESS, 0, valore) == 0
+    except (OSError, AttributeError):
+        return False
+
+
+class _TokenBucket:
+    """Limite di velocità (unità al secondo) con un secondo di credito."""
+
+    def __init__(self, rate: float):
+        self.rate = float(rate)
+        self.tokens = self.rate
+        self.stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """Preleva amount unità e restituisce i secondi da attendere (0 se c'è credito)."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            self.tokens -= amount
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class AdaptiveLimiter:
+    """
+    [FEATURE 29] Concorrenza AIMD per un tipo di lavoro (stat, hash, copy) su un disco.
+
+    Le operazioni in corso non superano limit. A ogni finestra la latenza media
+    (per MB) viene confrontata con la base, la migliore media osservata: se resta
+    entro ADAPTIVE_TOLERANCE volte la base e il limite è stato raggiunto, un worker
+    in più (aumento additivo); se la supera il limite scende a ADAPTIVE_BACKOFF
+    volte (riduzione moltiplicativa). Il limite si assesta dove un worker in più
+    allungherebbe solo la coda del disco.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, initial: int = ADAPTIVE_INITIAL):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = max(self.min_limit, min(initial, self.max_limit))
+        self.peak = self.limit
+        self.in_use = 0
+        self._cond = threading.Condition()
+        self._window_sum = 0.0
+        self._window_n = 0
+        self._saturated = False
+        self.baseline: Optional[float] = None
+        self.ops = 0
+        self.bytes = 0
+        self.latency_sum = 0.0
+        self.wait_seconds = 0.0
+        self.increases = 0
+        self.decreases = 0
+
+    def acquire(self):
+        with self._cond:
+            if self.in_use >= self.limit:
+                inizio = time.perf_counter()
+                while self.in_use >= self.limit:
+                    self._cond.wait()
+                self.wait_seconds += time.perf_counter() - inizio
+            self.in_use += 1
+            if self.in_use >= self.limit:
+                self._saturated = True
+
+    def release(self, seconds: float, nbytes: int = 0):
+        latency = seconds / max(1.0, nbytes / IO_LATENCY_UNIT)
+        with self._cond:
+            self.in_use -= 1
+            self.ops += 1
+            self.bytes += nbytes
+            self.latency_sum += latency
+            self._window_sum += latency
+            self._window_n += 1
+            if self._window_n >= max(ADAPTIVE_WINDOW, 2 * self.limit):
+                self._adjust(self._window_sum / self._window_n)
+            self._cond.notify_all()
+
+    def _adjust(self, media: float):
+        if self.baseline is None or media < self.baseline:
+            self.baseline = media
+        else:
+            self.baseline = min(media, self.baseline * (1 + ADAPTIVE_BASELINE_DRIFT))
+        if media > self.baseline * ADAPTIVE_TOLERANCE:
+            nuovo = max(self.min_limit, int(self.limit * ADAPTIVE_BACKOFF))
+            if nuovo < self.limit:
+                self.limit = nuovo
+                self.decreases += 1
+        elif self._saturated and self.limit < self.max_limit:
+            self.limit += 1
+            self.increases += 1
+            self.peak = max(self.peak, self.limit)
+        self._window_sum = 0.0
+        self._window_n = 0
+        self._saturated = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "concurrency": self.limit,
+                "peak_concurrency": self.peak,
+                "max_concurrency": self.max_limit,
+                "ops": self.ops,
+                "bytes": self.bytes,
+                "avg_latency_ms": round(self.latency_sum / self.ops * 1000, 3) if self.ops else 0.0,
+                "baseline_latency_ms": round(self.baseline * 1000, 3) if self.baseline is not None else None,
+                "increases": self.increases,
+                "decreases": self.decreases,
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
+
+
+class IOGovernor:
+    """
+    [FEATURE 29] Regola l'I/O di stat, hash e copie per convivere con altri servizi.
+
+    - adaptive: un AdaptiveLimiter per lavoro e disco; i pool restano dimensionati
+      sul massimo (max_workers) ma solo limit thread alla volta fanno I/O
+    - max_bytes_per_second / max_iops: limiti rigidi condivisi da tutti i thread
+      (token bucket); il costo di un'operazione è prelevato prima di eseguirla
+    - priority: "low" o "idle" (IO_PRIORITIES), applicata con nice e ioprio_set
+      a ogni thread della libreria ("hunter-*") la prima volta che fa I/O qui
+      (ioprio conta solo con gli scheduler che lo rispettano, es. BFQ). Il thread
+      del chiamante, dove scan_batch e watch fanno stat e hash, resta com'è: senza
+      privilegi nice non si potrebbe più riportare al valore di partenza
+    Il tempo passato ad aspettare i limiti finisce in throttle_seconds.
+    """
+
+    def __init__(self, adaptive: bool = False, max_workers: Optional[Dict[str, int]] = None,
+                 max_bytes_per_second: Optional[int] = None, max_iops: Optional[int] = None,
+                 priority: Optional[str] = None):
+        if priority is not None and priority not in IO_PRIORITIES:
+            raise ValueError(f"Priorità I/O non supportata: {priority} (disponibili: {tuple(IO_PRIORITIES)})")
+        self.adaptive = adaptive
+        self.max_workers = dict(max_workers or {})
+        self.max_bytes_per_second = max_bytes_per_second
+        self.max_iops = max_iops
+        self.priority = priority
+        self._bytes = _TokenBucket(max_bytes_per_second) if max_bytes_per_second else None
+        self._ops = _TokenBucket(max_iops) if max_iops else None
+        self._limiters: Dict[tuple, AdaptiveLimiter] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.throttle_seconds = 0.0
+        self.threads_prioritized = 0
+        self.priority_failures = 0
+
+    @staticmethod
+    def source(path):
+        """(device, dimensione) del file da leggere; (None, 0) se la stat fallisce."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None, 0
+        return st.st_dev, st.st_size
+
+    def _limiter(self, kind: str, device) -> AdaptiveLimiter:
+        key = (kind, device)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(key)
+                if limiter is None:
+                    limiter = self._limiters[key] = AdaptiveLimiter(self.max_workers.get(kind, DEFAULT_HASH_WORKERS))
+        return limiter
+
+    def _apply_priority(self):
+        self._local.priority = True
+        if not threading.current_thread().name.startswith("hunter-"):
+            return
+        ok = _set_io_priority(self.priority)
+        try:
+            tid = threading.get_native_id()
+            os.setpriority(os.PRIO_PROCESS, tid, max(os.getpriority(os.PRIO_PROCESS, tid),
+                                                     IO_PRIORITIES[self.priority]))
+        except (AttributeError, OSError):
+            ok = False
+        with self._lock:
+            if ok:
+                self.threads_prioritized += 1
+            else:
+                self.priority_failures += 1
+
+    def _throttle(self, nbytes: int, ops: int):
+        attesa = 0.0
+        if self._bytes is not None and nbytes:
+            attesa = self._bytes.reserve(nbytes)
+        if self._ops is not None and ops:
+            attesa = max(attesa, self._ops.reserve(ops))
+        if attesa > 0:
+            time.sleep(attesa)
+            with self._lock:
+                self.throttle_seconds += attesa
+
+    def run(self, kind: str, device, nbytes: int, fn, *args):
+        """Esegue fn(*args) come operazione di I/O di tipo kind sul disco device."""
+        if self.priority is not None and not getattr(self._local, "priority", False):
+            self._apply_priority()
+        # Prima i limiti rigidi: chi aspetta il credito non occupa un posto del limiter
+        self._throttle(nbytes, 1)
+        if not self.adaptive:
+            return fn(*args)
+        limiter = self._limiter(kind, device)
+        limiter.acquire()
+        inizio = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            limiter.release(time.perf_counter() - inizio, nbytes)
+
+    def dir_listed(self, path: str, seconds: float, entries: int):
+        """Callback del walker: il listing conta per max_iops e prende la priorità del thread."""
+        if self.priority is not None and not getattr(self._local, "priority", False):
+            self._apply_priority()
+        self._throttle(0, 1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            limiters = list(self._limiters.items())
+        return {
+            "adaptive": self.adaptive,
+            "max_bytes_per_second": self.max_bytes_per_second,
+            "max_iops": self.max_iops,
+            "priority": self.priority,
+            "threads_prioritized": self.threads_prioritized,
+            "priority_failures": self.priority_failures,
+            "throttle_seconds": round(self.throttle_seconds, 3),
+            # Concorrenza scelta per ogni lavoro e disco ("major:minor")
+            "limiters": [dict(limiter.stats(), kind=kind,
+                              device=f"{os.major(device)}:{os.minor(device)}" if device is not None else None)
+                         for (kind, device), limiter in limiters],
+        }
+
+
+# --- CONFIGURAZIONE ORDINE I/O ---
+# "walk" (default): copie nell'ordine del listing; "auto": ordine per posizione solo sui
+# dischi rotazionali. Gli originali scelti e i nomi nella destinazione non cambiano mai
+IO_ORDER_MODES = ("auto", "walk", "inode", "extent")
+DEFAULT_IO_ORDER = "walk"
+# ioctl FS_IOC_FIEMAP (_IOWR('f', 11, struct fiemap)) e strutture di <linux/fiemap.h>
+FS_IOC_FIEMAP = 0xC020660B
+FIEMAP_MAX_OFFSET = 0xFFFFFFFFFFFFFFFF
+_FIEMAP_HEADER = struct.Struct("QQIIII")        # fm_start, fm_length, fm_flags, fm_mapped_extents, fm_extent_count
+_FIEMAP_EXTENT = struct.Struct("QQQQQIIII")     # fe_logical, fe_physical, fe_length, ..., fe_flags
+# Extent senza posizione fisica affidabile (UNKNOWN, DELALLOC): si usa l'inode
+FIEMAP_EXTENT_NO_POSITION = 0x00000002 | 0x00000004
+
+
+def first_extent(path) -> Optional[int]:
+    """[FEATURE 30] Offset fisico (byte) del primo extent del file; None se il file non ne ha."""
+    buf = bytearray(_FIEMAP_HEADER.size + _FIEMAP_EXTENT.size)
+    _FIEMAP_HEADER.pack_into(buf, 0, 0, FIEMAP_MAX_OFFSET, 0, 0, 1, 0)
+    # O_NONBLOCK: una FIFO con un nome da documento non blocca l'apertura
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_NONBLOCK", 0))
+    try:
+        fcntl.ioctl(fd, FS_IOC_FIEMAP, buf)
+    finally:
+        os.close(fd)
+    if not _FIEMAP_HEADER.unpack_from(buf)[3]:
+        return None
+    extent = _FIEMAP_EXTENT.unpack_from(buf, _FIEMAP_HEADER.size)
+    return None if extent[5] & FIEMAP_EXTENT_NO_POSITION else extent[1]
+
+
+class LocalityOrder:
+    """
+    [FEATURE 30] Riordina le copie di un lotto (una cartella) per posizione sul disco,
+    così la testina di un disco a piatti avanza invece di saltare.
+
+    - "extent": primo extent fisico (FIEMAP); i file senza extent noto o su filesystem
+      senza FIEMAP vanno dopo, per inode
+    - "inode": numero di inode (nessuna syscall in più: viene dalla stat del filtro)
+    - "auto": "extent" solo per i file su dischi rotazionali (is_rotational), altrove nulla
+    La deduplicazione resta nell'ordine del listing: originali, nomi nella destinazione e
+    log non cambiano; si riordina solo l'avvio dei trasferimenti che leggono dati.
+    Le statistiche confrontano l'ordine del listing con quello scelto sugli stessi file:
+    salti all'indietro e distanza percorsa tra gli extent noti, in ordine di lettura.
+    """
+
+    def __init__(self, mode: str = DEFAULT_IO_ORDER):
+        if mode not in IO_ORDER_MODES:
+            raise ValueError(f"Ordine I/O non supportato: {mode} (disponibili: {IO_ORDER_MODES})")
+        self.mode = mode
+        self._rotational: Dict[int, bool] = {}
+        self._no_fiemap: set = set()
+        self._lock = threading.Lock()
+        self.stats = {
+            "batches_sorted": 0,
+            "files_sorted": 0,
+            "extent_keys": 0,
+            "inode_keys": 0,
+            "backward_jumps_before": 0,
+            "backward_jumps_after": 0,
+            "seek_bytes_before": 0,
+            "seek_bytes_after": 0,
+        }
+
+    def applies(self, st_dev: int) -> bool:
+        if self.mode in ("inode", "extent"):
+            return True
+        if self.mode == "walk":
+            return False
+        rotational = self._rotational.get(st_dev)
+        if rotational is None:
+            rotational = self._rotational[st_dev] = \
+                bool(is_rotational(physical_device(os.major(st_dev), os.minor(st_dev))))
+        return rotational
+
+    def key(self, path, st) -> tuple:
+        """(0, offset fisico) se FIEMAP lo fornisce, altrimenti (1, inode)."""
+        if self.mode != "inode" and fcntl is not None and st.st_dev not in self._no_fiemap \
+                and stat.S_ISREG(getattr(st, "st_mode", stat.S_IFREG)):
+            try:
+                physical = first_extent(path)
+                if physical is not None:
+                    return (0, physical)
+            except OSError as e:
+                if e.errno in _UNSUPPORTED_ERRNOS:
+                    self._no_fiemap.add(st.st_dev)  # Filesystem senza FIEMAP: non si riprova
+        return (1, st.st_ino)
+
+    @staticmethod
+    def _distance(keys: List[tuple]):
+        # Salti all'indietro su tutte le chiavi; distanza solo tra gli extent noti, nell'ordine
+        # in cui vengono letti: prima e dopo misurano sempre lo stesso insieme di file
+        indietro = sum(1 for prima, dopo in zip(keys, keys[1:]) if dopo < prima)
+        offset = [k[1] for k in keys if k[0] == 0]
+        return indietro, sum(abs(dopo - prima) for prima, dopo in zip(offset, offset[1:]))
+
+    def order(self, items: list) -> list:
+        """
+        Gli elementi (percorso, stat, ...) di un lotto in ordine di posizione sul disco.
+        Le chiavi si calcolano solo qui: passare solo i file che verranno davvero letti.
+        """
+        if len(items) < 2 or not self.applies(items[0][1].st_dev):
+            return items
+        keys = [self.key(item[0], item[1]) for item in items]
+        ordine = sorted(range(len(items)), key=keys.__getitem__)
+        prima = self._distance(keys)
+        dopo = self._distance([keys[i] for i in ordine])
+        estesi = sum(1 for k in keys if k[0] == 0)
+        with self._lock:
+            stats = self.stats
+            stats["batches_sorted"] += 1
+            stats["files_sorted"] += len(items)
+            stats["extent_keys"] += estesi
+            stats["inode_keys"] += len(items) - estesi
+            stats["backward_jumps_before"] += prima[0]
+            stats["backward_jumps_after"] += dopo[0]
+            stats["seek_bytes_before"] += prima[1]
+            stats["seek_bytes_after"] += dopo[1]
+        return [items[i] for i in ordine]
+
+
+# --- CONFIGURAZIONE TRASFERIMENTI ---
+DEFAULT_TRANSFER_WORKERS = 4
+# Blocco per copy_file_range/sendfile e per la copia in user space
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+# ioctl FICLONE di Linux (_IOW(0x94, 9, int)): clona i blocchi su btrfs/XFS/bcachefs
+FICLONE = 0x40049409
+# Errori che significano "metodo non supportato qui": si passa al successivo
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                       errno.ENOTTY, errno.EBADF, errno.EPERM, errno.ENOTSUP}
+# [FEATURE 28] Suffisso dei file temporanei scritti nella destinazione (nascosti e senza estensione cercata)
+STAGING_SUFFIX = ".hunter-tmp"
+
+
+def _staging_path(folder: Path, name: str) -> Path:
+    """[FEATURE 28] Nome temporaneo unico (processo + thread + contatore) in folder."""
+    global _staging_counter
+    with _staging_lock:
+        _staging_counter += 1
+        numero = _staging_counter
+    return Path(folder) / f".{name}.{os.getpid()}.{threading.get_ident()}.{numero}{STAGING_SUFFIX}"
+
+
+_staging_lock = threading.Lock()
+_staging_counter = 0
+
+
+class TransferEngine:
+    """
+    [FEATURE 12] Motore di copia/spostamento parallelo.
+
+    I trasferimenti girano su un pool di thread così la scansione continua a
+    cercare file mentre le copie lente procedono. Per ogni copia prova in ordine:
+    reflink (FICLONE, nessun byte copiato), copy_file_range e sendfile (copia nel
+    kernel), infine shutil.copyfile. I metadati sono copiati con copystat, come copy2.
+    Gli spostamenti sullo stesso device usano os.rename (atomico); tra device
+    diversi si copia e poi si elimina l'originale, come shutil.move.
+    """
+
+    def __init__(self, workers: int = DEFAULT_TRANSFER_WORKERS, max_pending: Optional[int] = None,
+                 governor: Optional[IOGovernor] = None):
+        self.workers = max(1, workers)
+        # [FEATURE 29] Concorrenza, limiti e priorità delle copie (None = a piena velocità)
+        self.governor = governor
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hunter-copy")
+        # Backpressure: limita i trasferimenti in coda per non accumulare memoria
+        self._slots = threading.BoundedSemaphore(max_pending or self.workers * 4)
+        self._lock = threading.Lock()
+        self.by_method: Counter = Counter()
+        self.bytes_transferred = 0
+        self._started = None
+        self._finished = None
+        # [FEATURE 14] Statistiche dello stadio "copy" della pipeline
+        self.pending = 0
+        self.max_queue_depth = 0
+        self.blocked_seconds = 0.0
+        self.busy_seconds = 0.0
+        self.max_latency = 0.0
+        # [FEATURE 28] Copie confrontate con il digest della sorgente
+        self.verified = 0
+        self.verify_failed = 0
+
+    # --- Percorsi veloci per la copia dei dati ---
+
+    @staticmethod
+    def _try_reflink(src_fd: int, dst_fd: int) -> bool:
+        if fcntl is None or not sys.platform.startswith("linux"):
+            return False
+        try:
+            fcntl.ioctl(dst_fd, FICLONE, src_fd)
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def _kernel_copy(func, src_fd: int, dst_fd: int, size: int) -> bool:
+        """Copia con copy_file_range/sendfile. False se il metodo non è supportato."""
+        copied = 0
+        try:
+            while True:
+                if func is os.sendfile:
+                    sent = os.sendfile(dst_fd, src_fd, copied, COPY_CHUNK_SIZE)
+                else:
+                    sent = os.copy_file_range(src_fd, dst_fd, COPY_CHUNK_SIZE, copied, copied)
+                if sent == 0:
+                    break
+                copied += sent
+        except OSError as e:
+            if copied == 0 and e.errno in _UNSUPPORTED_ERRNOS:
+                return False
+            raise
+        # Il file può essere cresciuto o ridotto durante la copia: conta quanto copiato
+        return copied > 0 or size == 0
+
+    def copy_file(self, src: str, dst: str) -> str:
+        """Copia contenuto e metadati (come shutil.copy2). Restituisce il metodo usato."""
+        if self.governor is not None:
+            # [FEATURE 29] Regolata sul disco della sorgente
+            device, size = IOGovernor.source(src)
+            return self.governor.run("copy", device, size, self._copy_file, src, dst)
+        return self._copy_file(src, dst)
+
+    def _copy_file(self, src: str, dst: str) -> str:
+        method = None
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+                size = os.fstat(src_fd).st_size
+                if self._try_reflink(src_fd, dst_fd):
+                    method = "reflink"
+                elif hasattr(os, "copy_file_range") and self._kernel_copy(os.copy_file_range, src_fd, dst_fd, size):
+                    method = "copy_file_range"
+                elif (sys.platform.startswith("linux") and hasattr(os, "sendfile")
+                      and self._kernel_copy(os.sendfile, src_fd, dst_fd, size)):
+                    method = "sendfile"
+            if method is None:
+                # Fallback: shutil usa comunque l'API migliore della piattaforma (es. fcopyfile su macOS)
+                shutil.copyfile(src, dst)
+                method = "copyfile"
+            shutil.copystat(src, dst)
+        except BaseException:
+            # Nessun file parziale nella destinazione
+            try:
+                os.unlink(dst)
+            except OSError:
+                pass
+            raise
+        return method
+
+    def copy_file_hashed(self, src: str, dst: str, hasher: FileHasher) -> str:
+        """
+        [FEATURE 28] Copia contenuto e metadati calcolando nello stesso passaggio
+        l'hash completo (restituito). Rinuncia a reflink e copia nel kernel, che non
+        passano dallo spazio utente, ma evita una seconda lettura della sorgente.
+        """
+        if self.governor is not None:
+            device, size = IOGovernor.source(src)
+            return self.governor.run("copy", device, size, self._copy_file_hashed, src, dst, hasher)
+        return self._copy_file_hashed(src, dst, hasher)
+
+    def _copy_file_hashed(self, src: str, dst: str, hasher: FileHasher) -> str:
+        try:
+            digest = hasher.hash_copy(src, dst)
+            shutil.copystat(src, dst)
+        except BaseException:
+            try:
+                os.unlink(dst)
+            except OSError:
+                pass
+            raise
+        return digest
+
+    def verify_file(self, path, digest: str, hasher: FileHasher, target=None):
+        """
+        [FEATURE 28] Confronta il digest della copia con quello della sorgente.
+        La copia viene prima scritta su disco e tolta dalla page cache, così si
+        rilegge ciò che è stato davvero scritto. OSError se i digest differiscono
+        (target è il nome definitivo della copia, per il messaggio).
+        """
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+        if self.governor is not None:
+            device, size = IOGovernor.source(path)
+            ok = self.governor.run("hash", device, size, hasher.hash_file, path) == digest
+        else:
+            ok = hasher.hash_file(path) == digest
+        with self._lock:
+            if ok:
+                self.verified += 1
+            else:
+                self.verify_failed += 1
+        if not ok:
+            raise OSError(errno.EIO, f"Verifica fallita: {target or path} è diverso dalla sorgente")
+
+    def transfer_verified(self, src: str, dst: str, mode: str, hasher: FileHasher,
+                          digest: Optional[str] = None) -> str:
+        """
+        [FEATURE 28] Trasferimento verificato: la copia nasce in un temporaneo accanto
+        a dst e viene rinominata (atomico) solo se il suo digest è quello della sorgente;
+        uno spostamento elimina l'originale solo dopo la verifica. Senza un digest
+        già noto la copia lo calcola mentre legge: due letture in tutto, non tre.
+        """
+        if mode == "move":
+            try:
+                os.rename(src, dst)
+                return "rename"  # Stessi blocchi: niente da verificare
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+        tmp = _staging_path(Path(dst).parent, Path(dst).name)
+        try:
+            if digest is None:
+                digest = self.copy_file_hashed(src, str(tmp), hasher)
+                method = "fused"
+            else:
+                method = self.copy_file(src, str(tmp))
+            self.verify_file(tmp, digest, hasher, dst)
+            os.replace(tmp, dst)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        if mode == "move":
+            os.unlink(src)
+            method = f"move_{method}"
+        return f"{method}_verified"
+
+    def commit_staged(self, tmp, dst, digest: str, size: int = 0, seconds: float = 0.0,
+                      verify: Optional[FileHasher] = None) -> str:
+        """[FEATURE 28] Rende definitiva (rename atomico) una copia fatta durante l'hash."""
+        inizio = time.perf_counter()
+        try:
+            if verify is not None:
+                self.verify_file(tmp, digest, verify, dst)
+            os.replace(tmp, dst)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        method = "fused_verified" if verify is not None else "fused"
+        self.record(method, size, seconds + time.perf_counter() - inizio)
+        return method
+
+    def move_file(self, src: str, dst: str) -> str:
+        """Sposta il file: rename atomico sullo stesso device, altrimenti copia + rimozione."""
+        try:
+            os.rename(src, dst)
+            return "rename"
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        method = self.copy_file(src, dst)
+        os.unlink(src)
+        return f"move_{method}"
+
+    def transfer(self, src: str, dst: str, mode: str, size: int = 0, verify: Optional[FileHasher] = None,
+                 digest: Optional[str] = None) -> str:
+        """
+        Esegue il trasferimento in modo sincrono e aggiorna le statistiche.
+        [FEATURE 28] Con verify (un FileHasher) passa da transfer_verified; digest è
+        l'hash della sorgente se già noto.
+        """
+        if self._started is None:
+            self._started = time.monotonic()
+        inizio = time.perf_counter()
+        if verify is not None:
+            method = self.transfer_verified(src, dst, mode, verify, digest)
+        else:
+            method = self.move_file(src, dst) if mode == "move" else self.copy_file(src, dst)
+        self.record(method, size, time.perf_counter() - inizio)
+        return method
+
+    def record(self, method: str, size: int, durata: float):
+        """Aggiorna le statistiche per un trasferimento eseguito (anche fuori da transfer())."""
+        if self._started is None:
+            self._started = time.monotonic()
+        with self._lock:
+            self.by_method[method] += 1
+            self.bytes_transferred += size
+            self.busy_seconds += durata
+            self.max_latency = max(self.max_latency, durata)
+            self._finished = time.monotonic()
+
+    def submit(self, job, *args):
+        """
+        Accoda job(*args) sul pool (di solito un wrapper attorno a transfer()).
+        Blocca se ci sono già troppi trasferimenti in attesa (backpressure).
+        """
+        inizio = time.perf_counter()
+        self._slots.acquire()
+        attesa = time.perf_counter() - inizio
+        if self._started is None:
+            self._started = time.monotonic()
+        try:
+            future = self._pool.submit(job, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.blocked_seconds += attesa
+            self.pending += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.pending)
+        future.add_done_callback(self._job_done)
+        return future
+
+    def _job_done(self, _future):
+        with self._lock:
+            self.pending -= 1
+        self._slots.release()
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = 0.0
+        if self._started is not None and self._finished is not None:
+            elapsed = max(self._finished - self._started, 1e-9)
+        return {
+            "workers": self.workers,
+            "by_method": dict(self.by_method),
+            "bytes": self.bytes_transferred,
+            "seconds": round(elapsed, 3),
+            "bytes_per_second": int(self.bytes_transferred / elapsed) if elapsed else 0,
+            "verified": self.verified,            # [FEATURE 28]
+            "verify_failed": self.verify_failed,  # [FEATURE 28]
+        }
+
+    def stage_stats(self) -> Dict[str, Any]:
+        """[FEATURE 14] Statistiche nel formato degli stadi della pipeline."""
+        items = sum(self.by_method.values())
+        return {
+            "workers": self.workers,
+            "items": items,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "avg_latency_ms": round(self.busy_seconds / items * 1000, 3) if items else 0.0,
+            "max_latency_ms": round(self.max_latency * 1000, 3),
+            "max_queue_depth": self.max_queue_depth,
+            "blocked_seconds": round(self.blocked_seconds, 3),
+        }
+
+
+class LogSequencer:
+    """
+    [FEATURE 12] Record di log in ordine di scansione anche con i trasferimenti in parallelo.
+
+    Chi accoda un trasferimento riserva prima il suo posto (reserve); il thread del
+    pool lo riempie a trasferimento concluso (fill). emit(*item) viene chiamata
+    nell'ordine dei posti: un record arrivato prima del suo turno aspetta in memoria.
+    append() riserva e riempie subito (duplicati, filtrati, anteprima); skip() libera
+    un posto che non avrà record (trasferimento mai partito).
+    """
+
+    def __init__(self, emit):
+        self._emit = emit
+        self._lock = threading.Lock()
+        self._next_slot = 0
+        self._next_emit = 0
+        self._waiting: Dict[int, tuple] = {}
+
+    def reserve(self) -> int:
+        with self._lock:
+            slot = self._next_slot
+            self._next_slot += 1
+            return slot
+
+    def fill(self, slot: int, *item):
+        # emit gira con il lock acquisito: i record escono uno alla volta e in ordine
+        with self._lock:
+            self._waiting[slot] = item
+            while self._next_emit in self._waiting:
+                ready = self._waiting.pop(self._next_emit)
+                self._next_emit += 1
+                if ready:
+                    self._emit(*ready)
+
+    def skip(self, slot: int):
+        self.fill(slot)
+
+    def append(self, *item):
+        self.fill(self.reserve(), *item)
+
+
+class StagedCopies:
+    """
+    [FEATURE 28] Copie fatte mentre si calcola l'hash completo per la deduplicazione.
+
+    In copia un file in collisione verrebbe letto due volte: dall'hash e poi dal
+    trasferimento. Qui la stessa lettura alimenta il digest e un file temporaneo
+    nella destinazione; se il contenuto è nuovo il temporaneo viene rinominato nel
+    nome definitivo (commit atomico), se è un duplicato viene eliminato.
+    """
+
+    def __init__(self, transfers: TransferEngine, hasher: FileHasher):
+        self.transfers = transfers
+        self.hasher = hasher
+        self._lock = threading.Lock()
+        # sorgente -> (temporaneo, digest, dimensione, secondi di copia)
+        self._staged: Dict[str, tuple] = {}
+        self.staged = 0
+        self.committed = 0
+        self.discarded = 0
+        self.bytes_discarded = 0
+
+    def stage(self, src: str, folder: Path, size: int) -> str:
+        """Copia src in un temporaneo di folder e restituisce il digest."""
+        folder.mkdir(parents=True, exist_ok=True)
+        tmp = _staging_path(folder, os.path.basename(src))
+        inizio = time.perf_counter()
+        digest = self.transfers.copy_file_hashed(src, str(tmp), self.hasher)
+        with self._lock:
+            self._staged[src] = (tmp, digest, size, time.perf_counter() - inizio)
+            self.staged += 1
+        return digest
+
+    def __contains__(self, src: str) -> bool:
+        with self._lock:
+            return src in self._staged
+
+    def take(self, src: str) -> Optional[tuple]:
+        """La copia preparata per src (se c'è), che passa al chiamante."""
+        with self._lock:
+            return self._staged.pop(src, None)
+
+    def commit(self, staged: tuple, dst, verify: Optional[FileHasher] = None) -> str:
+        tmp, digest, size, seconds = staged
+        method = self.transfers.commit_staged(tmp, dst, digest, size, seconds, verify)
+        with self._lock:
+            self.committed += 1
+        return method
+
+    def discard(self, src: str) -> bool:
+        """Elimina la copia preparata per src (contenuto duplicato o trasferimento annullato)."""
+        staged = self.take(src)
+        if staged is None:
+            return False
+        try:
+            os.unlink(staged[0])
+        except OSError:
+            pass
+        with self._lock:
+            self.discarded += 1
+            self.bytes_discarded += staged[2]
+        return True
+
+    def cleanup(self):
+        """Nessun temporaneo lasciato nella destinazione (errori, scansione interrotta)."""
+        with self._lock:
+            sorgenti = list(self._staged)
+        for src in sorgenti:
+            self.discard(src)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "staged": self.staged,
+            "committed": self.committed,
+            "discarded": self.discarded,
+            "bytes_discarded": self.bytes_discarded,
+        }
+
+
+# --- CONFIGURAZIONE DESTINAZIONE ---
+# Cartella (nascosta, quindi mai scansionata) con gli oggetti dello store per contenuto
+CONTENT_STORE_DIR = ".objects"
+
+
+class DestinationIndex:
+    """
+    [FEATURE 16] Indice in memoria dei nomi presenti nella destinazione.
+
+    Ogni sottocartella (JPG, PDF, ...) viene letta una sola volta con scandir;
+    da lì in poi le collisioni di nome si risolvono nel set, senza una stat per
+    ogni tentativo "nome_1", "nome_2", ... Per ogni nome si ricorda anche l'ultimo
+    suffisso assegnato, così cartelle con migliaia di IMG_0001 non ripartono da 1.
+    """
+
+    def __init__(self):
+        self._folders: Dict[str, set] = {}
+        self._next_suffix: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str) -> str:
+        # Windows e macOS (di default) non distinguono maiuscole e minuscole
+        return name.lower() if sys.platform in ("win32", "darwin") else name
+
+    def _names(self, folder: Path) -> set:
+        names = self._folders.get(str(folder))
+        if names is None:
+            folder.mkdir(parents=True, exist_ok=True)
+            with os.scandir(folder) as it:
+                names = {self._key(entry.name) for entry in it}
+            self._folders[str(folder)] = names
+        return names
+
+    def reserve(self, folder: Path, filename: str) -> Path:
+        """Restituisce un percorso libero in folder (rinominando come nome_1, nome_2...) e lo occupa."""
+        with self._lock:
+            names = self._names(folder)
+            key = self._key(filename)
+            if key not in names:
+                names.add(key)
+                return folder / filename
+            stem, suffix = os.path.splitext(filename)
+            hint = (str(folder), key)
+            counter = self._next_suffix.get(hint, 1)
+            while True:
+                candidate = f"{stem}_{counter}{suffix}"
+                counter += 1
+                if self._key(candidate) not in names:
+                    break
+            names.add(self._key(candidate))
+            self._next_suffix[hint] = counter
+            return folder / candidate
+
+    def release(self, path: Path):
+        """Libera un nome riservato ma mai scritto (trasferimento fallito)."""
+        with self._lock:
+            names = self._folders.get(str(path.parent))
+            if names is not None:
+                names.discard(self._key(path.name))
+            # Il buco va riusato come farebbe la ricerca da 1
+            for hint in [h for h in self._next_suffix if h[0] == str(path.parent)]:
+                del self._next_suffix[hint]
+
+
+class ContentStore:
+    """
+    [FEATURE 16] Destinazione "content-addressed".
+
+    Ogni contenuto è salvato una sola volta in <dest>/.objects/<aa>/<digest>;
+    le viste per estensione (<dest>/JPG/nome.jpg) sono hardlink all'oggetto, o
+    reflink/copie se il filesystem non supporta gli hardlink. Lo stesso
+    contenuto acquisito due volte (anche in scansioni diverse) non occupa altro
+    spazio e non viene ricopiato.
+    [FEATURE 28] Con fused (e un hasher) un contenuto senza digest noto viene
+    copiato in un temporaneo dello store mentre se ne calcola l'hash: una sola
+    lettura, poi rename nell'oggetto se è nuovo o eliminazione se c'era già.
+    cached_fn ((path, stat) -> digest o None) evita la copia se la cache conosce
+    già il digest. Con verify ogni oggetto scritto viene confrontato con la sorgente.
+    """
+
+    def __init__(self, dest_root: Path, transfers: "TransferEngine", digest_fn,
+                 hasher: Optional[FileHasher] = None, fused: bool = False, verify: bool = False,
+                 cached_fn=None):
+        self.root = Path(dest_root) / CONTENT_STORE_DIR
+        self.transfers = transfers
+        self.digest_fn = digest_fn  # (path, stat) -> digest completo
+        self.hasher = hasher
+        self.fused = fused and hasher is not None
+        self.verify = hasher if verify else None
+        self.cached_fn = cached_fn
+        self.objects_fused = 0
+        self._lock = threading.Lock()
+        self._digest_locks: Dict[str, threading.Lock] = {}
+        self.objects_written = 0
+        self.objects_reused = 0
+        self.bytes_saved = 0
+        self.views: Counter = Counter()
+
+    def object_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def _digest_lock(self, digest: str) -> threading.Lock:
+        with self._lock:
+            lock = self._digest_locks.get(digest)
+            if lock is None:
+                lock = self._digest_locks[digest] = threading.Lock()
+            return lock
+
+    def _link_view(self, obj: Path, view: Path) -> str:
+        try:
+            os.link(obj, view)
+            return "hardlink"
+        except OSError as e:
+            if e.errno not in (errno.EPERM, errno.EMLINK, errno.EXDEV, errno.ENOTSUP, errno.EOPNOTSUPP):
+                raise
+        # FS senza hardlink (es. FAT/exFAT) o limite di link raggiunto: reflink o copia
+        return self.transfers.copy_file(str(obj), str(view))
+
+    def ingest(self, src: Path, view: Path, mode: str, size: int, digest: Optional[str] = None,
+               file_stat=None, staged: Optional[tuple] = None) -> str:
+        """
+        Salva il contenuto (se nuovo) e crea la vista. Restituisce il metodo usato.
+        [FEATURE 28] staged è una copia già fatta durante l'hash (StagedCopies.take).
+        """
+        inizio = time.perf_counter()
+        fused = None  # Temporaneo copiato mentre si calcolava il digest
+        if staged is not None:
+            fused, digest = staged[0], staged[1]
+        elif digest is None and self.fused and mode == "copy":
+            digest = self.cached_fn(src, file_stat) if self.cached_fn is not None else None
+            if digest is None:
+                self.root.mkdir(parents=True, exist_ok=True)
+                fused = _staging_path(self.root, "object")
+                digest = self.transfers.copy_file_hashed(str(src), str(fused), self.hasher)
+        copia_con_hash = fused is not None
+        if digest is None:
+            digest = self.digest_fn(src, file_stat)
+        if digest.startswith("error_"):
+            raise OSError(errno.EIO, f"Impossibile calcolare l'hash di {src}")
+        obj = self.object_path(digest)
+        try:
+            with self._digest_lock(digest):
+                if obj.exists():
+                    reused = True
+                    if mode == "move":
+                        os.unlink(src)
+                else:
+                    reused = False
+                    obj.parent.mkdir(parents=True, exist_ok=True)
+                    if fused is not None:
+                        if self.verify is not None:
+                            self.transfers.verify_file(fused, digest, self.verify, obj)
+                        os.replace(fused, obj)
+                        fused = None
+                    elif self.verify is not None:
+                        # [FEATURE 28] Temporaneo, confronto con il digest e poi rename
+                        self.transfers.transfer_verified(str(src), str(obj), mode, self.verify, digest)
+                    else:
+                        # Scrittura su file temporaneo + rename: mai oggetti parziali nello store
+                        tmp = obj.with_name(f".{digest}.{threading.get_ident()}.tmp")
+                        if mode == "move":
+                            self.transfers.move_file(str(src), str(tmp))
+                        else:
+                            self.transfers.copy_file(str(src), str(tmp))
+                        os.replace(tmp, obj)
+                view_method = self._link_view(obj, view)
+        finally:
+            if fused is not None:
+                # Contenuto già nello store (o errore): la copia fatta durante l'hash non serve
+                try:
+                    os.unlink(fused)
+                except OSError:
+                    pass
+        with self._lock:
+            if reused:
+                self.objects_reused += 1
+                self.bytes_saved += size
+            else:
+                self.objects_written += 1
+                self.objects_fused += copia_con_hash
+            self.views[view_method] += 1
+        method = f"store_{'reused' if reused else 'new'}_{view_method}"
+        self.transfers.record(method, 0 if reused else size, time.perf_counter() - inizio)
+        return method
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.root),
+            "objects_written": self.objects_written,
+            "objects_reused": self.objects_reused,
+            "bytes_saved": self.bytes_saved,
+            "objects_fused": self.objects_fused,  # [FEATURE 28] Scritti nella stessa lettura dell'hash
+            "views": dict(self.views),
+        }
+
+
+# --- CONFIGURAZIONE PIPELINE ---
+# Lotti (una cartella ciascuno) in attesa tra due stadi: limita la memoria
+# e rallenta il walker quando hashing e copie restano indietro
+PIPELINE_QUEUE_SIZE = 64
+DEFAULT_STAGE_WORKERS = {"match": 1, "filter": 1}
+
+_FINE_STADIO = object()
+
+
+class PipelineStage:
+    """
+    [FEATURE 14] Stadio della pipeline di scansione.
+
+    Ha una coda limitata in ingresso e `workers` thread che applicano func a ogni
+    lotto e passano il risultato allo stadio successivo. Con ordered=True (un solo
+    thread) i lotti vengono elaborati nell'ordine in cui il walker li ha prodotti,
+    anche se gli stadi precedenti lavorano in parallelo.
+    """
+
+    def __init__(self, name: str, func, workers: int = 1,
+                 queue_size: int = PIPELINE_QUEUE_SIZE, ordered: bool = False):
+        self.name = name
+        self.func = func
+        self.ordered = ordered
+        self.workers = 1 if ordered else max(1, workers)
+        self.queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self.downstream: Optional["PipelineStage"] = None
+        self._lock = threading.Lock()
+        self._alive = self.workers
+        self.pipeline = None
+        # Statistiche
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.max_latency = 0.0
+        self.max_queue_depth = 0
+        self._depth_sum = 0
+        self._puts = 0
+        self.blocked_seconds = 0.0
+
+    def put(self, seq: int, item):
+        """Accoda un lotto (chiamato dallo stadio a monte). Blocca se la coda è piena."""
+        depth = self.queue.qsize()
+        inizio = time.perf_counter()
+        self.queue.put((seq, item))
+        attesa = time.perf_counter() - inizio
+        with self._lock:
+            self._puts += 1
+            self._depth_sum += depth
+            self.max_queue_depth = max(self.max_queue_depth, min(depth + 1, self.queue.maxsize))
+            self.blocked_seconds += attesa
+
+    def close_input(self):
+        for _ in range(self.workers):
+            self.queue.put((None, _FINE_STADIO))
+
+    def _process(self, seq: int, item):
+        if self.pipeline.error is not None or self.pipeline.cancelled:
+            # Dopo un errore (o un annullamento) si svuotano le code senza lavorare,
+            # per non bloccare il walker
+            return
+        inizio = time.perf_counter()
+        result = self.func(item)
+        durata = time.perf_counter() - inizio
+        with self._lock:
+            self.items += 1
+            self.busy_seconds += durata
+            self.max_latency = max(self.max_latency, durata)
+        if self.downstream is not None:
+            self.downstream.put(seq, result)
+
+    def _run(self):
+        try:
+            if self.ordered:
+                in_attesa = {}
+                prossimo = 0
+                while True:
+                    seq, item = self.queue.get()
+                    if item is _FINE_STADIO:
+                        break
+                    in_attesa[seq] = item
+                    while prossimo in in_attesa:
+                        self._process(prossimo, in_attesa.pop(prossimo))
+                        prossimo += 1
+            else:
+                while True:
+                    seq, item = self.queue.get()
+                    if item is _FINE_STADIO:
+                        break
+                    self._process(seq, item)
+        except BaseException as e:
+            self.pipeline.fail(e)
+            # Continua a svuotare la coda così lo stadio a monte non resta bloccato
+            while self.queue.get()[1] is not _FINE_STADIO:
+                pass
+        finally:
+            with self._lock:
+                self._alive -= 1
+                ultimo = self._alive == 0
+            if ultimo and self.downstream is not None:
+                self.downstream.close_input()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "avg_latency_ms": round(self.busy_seconds / self.items * 1000, 3) if self.items else 0.0,
+            "max_latency_ms": round(self.max_latency * 1000, 3),
+            "max_queue_depth": self.max_queue_depth,
+            "avg_queue_depth": round(self._depth_sum / self._puts, 2) if self._puts else 0.0,
+            "blocked_seconds": round(self.blocked_seconds, 3),
+        }
+
+
+def prefetch_sources(sources: list, queue_size: int = PIPELINE_QUEUE_SIZE):
+    """
+    [FEATURE 17] Itera più sorgenti (es. un walker per disco) leggendole in parallelo,
+    ciascuna con la sua coda limitata, e ne restituisce gli elementi nell'ordine del
+    piano: tutta la prima sorgente, poi la seconda e così via. Le sorgenti successive
+    intanto si portano avanti fino a riempire la loro coda, quindi la concorrenza resta
+    quella del budget di ogni disco e gli esiti (originali, suffissi, log) non dipendono
+    da quale disco risponde prima. Chiudere il generatore ferma i produttori.
+    """
+    if len(sources) == 1:
+        yield from sources[0]
+        return
+    code = [queue.Queue(maxsize=queue_size) for _ in sources]
+    stop = threading.Event()
+
+    def consegna(out: queue.Queue, message) -> bool:
+        while not stop.is_set():
+            try:
+                out.put(message, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produci(source, out: queue.Queue):
+        try:
+            for item in source:
+                if not consegna(out, ("item", item)):
+                    return
+        except BaseException as e:
+            consegna(out, ("error", e))
+        finally:
+            # [FEATURE 24] Un consumatore che si ferma chiude subito anche i walker
+            if hasattr(source, "close"):
+                source.close()
+            consegna(out, ("done", None))
+
+    threads = [threading.Thread(target=produci, args=(source, out), name=f"hunter-source-{i}", daemon=True)
+               for i, (source, out) in enumerate(zip(sources, code))]
+    for t in threads:
+        t.start()
+    try:
+        for out in code:
+            while True:
+                kind, payload = out.get()
+                if kind == "item":
+                    yield payload
+                elif kind == "error":
+                    raise payload
+                else:
+                    break
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+
+
+class ScanPipeline:
+    """
+    [FEATURE 14] Catena di stadi collegati da code limitate (backpressure).
+
+    Il thread chiamante fa da stadio "walk": itera la sorgente e numera i lotti.
+    Gli altri stadi girano sui propri thread, quindi il listing di una cartella
+    si sovrappone a hashing e copie dei file delle cartelle precedenti.
+    Solo l'ordine di elaborazione dei lotti intermedi non è definito: con l'ultimo
+    stadio ordered=True i risultati (e il log, tramite LogSequencer per i record
+    dei trasferimenti) seguono l'ordine di scansione come nella versione seriale.
+    [FEATURE 20] Se cancel_event viene impostato la sorgente smette di essere letta
+    e i lotti ancora in coda vengono scartati; quello in lavorazione si conclude.
+    """
+
+    def __init__(self, stages: List[PipelineStage], cancel_event: Optional[threading.Event] = None):
+        self.stages = stages
+        for upstream, downstream in zip(stages, stages[1:]):
+            upstream.downstream = downstream
+        for stage in stages:
+            stage.pipeline = self
+        self.error: Optional[BaseException] = None
+        self._error_lock = threading.Lock()
+        self.cancel_event = cancel_event
+        self.walk_items = 0
+        self.walk_seconds = 0.0
+
+    def fail(self, error: BaseException):
+        with self._error_lock:
+            if self.error is None:
+                self.error = error
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def run(self, source):
+        """Esegue la pipeline fino all'esaurimento della sorgente. Rilancia il primo errore."""
+        threads = []
+        for stage in self.stages:
+            for i in range(stage.workers):
+                t = threading.Thread(target=stage._run, name=f"hunter-{stage.name}-{i}", daemon=True)
+                t.start()
+                threads.append(t)
+        first = self.stages[0]
+        iteratore = None
+        try:
+            iteratore = iter(source)
+            while self.error is None and not self.cancelled:
+                inizio = time.perf_counter()
+                try:
+                    item = next(iteratore)
+                except StopIteration:
+                    break
+                finally:
+                    self.walk_seconds += time.perf_counter() - inizio
+                first.put(self.walk_items, item)
+                self.walk_items += 1
+        except BaseException as e:
+            self.fail(e)
+        finally:
+            first.close_input()
+            for t in threads:
+                t.join()
+            if self.cancelled and hasattr(iteratore, "close"):
+                # Ferma i walker ancora attivi (prefetch_sources li attende)
+                iteratore.close()
+        if self.error is not None:
+            raise self.error
+
+    def stats(self) -> Dict[str, Any]:
+        risultato = {"walk": {
+            "workers": 1,
+            "items": self.walk_items,
+            "busy_seconds": round(self.walk_seconds, 3),
+        }}
+        for stage in self.stages:
+            risultato[stage.name] = stage.stats()
+        return risultato
+
+
+# --- CONFIGURAZIONE METRICHE ---
+# Limiti superiori (secondi) dei bucket degli istogrammi di latenza
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+METRICS_INTERVAL = 10.0  # secondi tra due scritture del file Prometheus
+SLOWEST_DIRS = 10
+# Stadi misurati: listing cartelle, stat, fuzzy match, hash, copia, scrittura report
+METRIC_STAGES = ("listing", "stat", "match", "hash", "copy", "report")
+HISTOGRAM_STAGES = ("stat", "hash", "copy")
+
+
+class LatencyHistogram:
+    """Istogramma cumulativo in stile Prometheus (bucket fissi + somma + conteggio)."""
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)  # l'ultimo è +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative, running = [], 0
+        for bound, n in zip(LATENCY_BUCKETS + ("+Inf",), self.counts):
+            running += n
+            cumulative.append([bound, running])
+        return {"buckets": cumulative, "sum": round(self.total, 6), "count": self.count}
+
+
+class ScanMetrics:
+    """
+    [FEATURE 19] Metriche di una scansione.
+
+    Per ogni stadio accumula chiamate e tempo totale; per stat, hash e copia tiene
+    anche un istogramma di latenza. Conta i byte letti (hash) e scritti (copie) e le
+    cartelle più lente da leggere. Con un callback ogni evento viene anche inviato
+    come dizionario ({"event": "dir_listed", ...}). Quando le metriche sono
+    disattivate la scansione non crea questo oggetto: il costo è un confronto con None.
+    """
+
+    def __init__(self, callback=None, slowest: int = SLOWEST_DIRS):
+        self.callback = callback
+        self.slowest = slowest
+        self.started = time.time()
+        self.finished: Optional[float] = None
+        self.stages = {stage: [0, 0.0] for stage in METRIC_STAGES}  # stage -> [chiamate, secondi]
+        self.histograms = {stage: LatencyHistogram() for stage in HISTOGRAM_STAGES}
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.counters: Dict[str, int] = {}
+        self._slow_dirs: List[tuple] = []  # min-heap (secondi, path, voci)
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, calls: int = 1, bytes_read: int = 0, bytes_written: int = 0):
+        with self._lock:
+            totals = self.stages.setdefault(stage, [0, 0.0])
+            totals[0] += calls
+            totals[1] += seconds
+            histogram = self.histograms.get(stage)
+            if histogram is not None:
+                histogram.observe(seconds)
+            self.bytes_read += bytes_read
+            self.bytes_written += bytes_written
+
+    def dir_listed(self, path: str, seconds: float, entries: int):
+        """Callback del walker: tempo di listing di una cartella."""
+        self.observe("listing", seconds)
+        with self._lock:
+            item = (seconds, path, entries)
+            if len(self._slow_dirs) < self.slowest:
+                heapq.heappush(self._slow_dirs, item)
+            elif seconds > self._slow_dirs[0][0]:
+                heapq.heapreplace(self._slow_dirs, item)
+        if self.callback:
+            self.emit("dir_listed", path=path, seconds=seconds, entries=entries)
+
+    def emit(self, event: str, **fields):
+        if self.callback is None:
+            return
+        try:
+            self.callback(dict(fields, event=event))
+        except Exception:
+            pass  # Un callback difettoso non deve fermare la scansione
+
+    def set_counters(self, counters: Dict[str, int]):
+        with self._lock:
+            self.counters = dict(counters)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            end = self.finished or time.time()
+            return {
+                "elapsed_seconds": round(end - self.started, 3),
+                "running": self.finished is None,
+                "stages": {stage: {"calls": calls, "seconds": round(seconds, 6)}
+                           for stage, (calls, seconds) in self.stages.items()},
+                "latency": {stage: h.snapshot() for stage, h in self.histograms.items()},
+                "bytes_read": self.bytes_read,
+                "bytes_written": self.bytes_written,
+                "slowest_dirs": [{"path": path, "seconds": round(seconds, 6), "entries": entries}
+                                 for seconds, path, entries in sorted(self._slow_dirs, reverse=True)],
+                "counters": dict(self.counters),
+            }
+
+    def prometheus_text(self) -> str:
+        """Snapshot nel formato testuale di Prometheus (node_exporter textfile collector)."""
+        snap = self.snapshot()
+
+        def label(value) -> str:
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        lines = [
+            "# HELP filehunter_scan_elapsed_seconds Durata della scansione",
+            "# TYPE filehunter_scan_elapsed_seconds gauge",
+            f"filehunter_scan_elapsed_seconds {snap['elapsed_seconds']}",
+            "# HELP filehunter_scan_running 1 se la scansione è in corso",
+            "# TYPE filehunter_scan_running gauge",
+            f"filehunter_scan_running {int(snap['running'])}",
+            "# HELP filehunter_stage_seconds_total Tempo cumulativo per stadio",
+            "# TYPE filehunter_stage_seconds_total counter",
+        ]
+        for stage, values in snap["stages"].items():
+            lines.append(f'filehunter_stage_seconds_total{{stage="{stage}"}} {values["seconds"]}')
+        lines += ["# HELP filehunter_stage_calls_total Operazioni per stadio",
+                  "# TYPE filehunter_stage_calls_total counter"]
+        for stage, values in snap["stages"].items():
+            lines.append(f'filehunter_stage_calls_total{{stage="{stage}"}} {values["calls"]}')
+        lines += ["# HELP filehunter_bytes_read_total Byte letti per calcolare hash",
+                  "# TYPE filehunter_bytes_read_total counter",
+                  f"filehunter_bytes_read_total {snap['bytes_read']}",
+                  "# HELP filehunter_bytes_written_total Byte scritti nella destinazione",
+                  "# TYPE filehunter_bytes_written_total counter",
+                  f"filehunter_bytes_written_total {snap['bytes_written']}",
+                  "# HELP filehunter_latency_seconds Latenza delle singole operazioni",
+                  "# TYPE filehunter_latency_seconds histogram"]
+        for stage, hist in snap["latency"].items():
+            for bound, count in hist["buckets"]:
+                lines.append(f'filehunter_latency_seconds_bucket{{op="{stage}",le="{bound}"}} {count}')
+            lines.append(f'filehunter_latency_seconds_sum{{op="{stage}"}} {hist["sum"]}')
+            lines.append(f'filehunter_latency_seconds_count{{op="{stage}"}} {hist["count"]}')
+        lines += ["# HELP filehunter_files_total File per esito",
+                  "# TYPE filehunter_files_total counter"]
+        for status, count in snap["counters"].items():
+            lines.append(f'filehunter_files_total{{status="{label(status)}"}} {count}')
+        lines += ["# HELP filehunter_slow_dir_seconds Cartelle più lente da leggere",
+                  "# TYPE filehunter_slow_dir_seconds gauge"]
+        for item in snap["slowest_dirs"]:
+            lines.append(f'filehunter_slow_dir_seconds{{path="{label(item["path"])}"}} {item["seconds"]}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        # File temporaneo + rename: il collector non legge mai un file a metà
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+
+class MetricsExporter:
+    """
+    [FEATURE 19] Thread che a intervalli regolari scrive il file Prometheus e invia
+    un evento "snapshot" al callback. stop() esegue un'ultima esportazione.
+    """
+
+    def __init__(self, metrics: ScanMetrics, path: Optional[str] = None,
+                 interval: float = METRICS_INTERVAL, counters_fn=None):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.counters_fn = counters_fn
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="hunter-metrics", daemon=True)
+
+    def export(self):
+        if self.counters_fn is not None:
+            self.metrics.set_counters(self.counters_fn())
+        if self.path:
+            try:
+                self.metrics.write_prometheus(self.path)
+            except OSError as e:
+                print(f"⚠️  Impossibile scrivere le metriche in {self.path}: {e}")
+        self.metrics.emit("snapshot", metrics=self.metrics.snapshot())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.export()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.export()
+
+
+# --- CONFIGURAZIONE PROGRESSO ---
+PROGRESS_INTERVAL = 0.1          # secondi tra due eventi di avanzamento (10 al secondo)
+PROGRESS_CONSOLE_INTERVAL = 1.0  # secondi tra due righe di stato sul terminale
+PROGRESS_RATE_WINDOW = 5.0       # secondi su cui si calcolano file/s e MB/s
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """Durata in formato H:MM:SS (stringa vuota se sconosciuta)."""
+    if seconds is None:
+        return ""
+    minuti, secondi = divmod(int(round(seconds)), 60)
+    ore, minuti = divmod(minuti, 60)
+    return f"{ore}:{minuti:02d}:{secondi:02d}"
+
+
+class ProgressReporter:
+    """
+    [FEATURE 21] Avanzamento della scansione a eventi raggruppati.
+
+    I worker aggiornano solo dei contatori (record()); un thread dedicato, ogni
+    `interval` secondi e solo se qualcosa è cambiato, costruisce uno snapshot con
+    le velocità (file/s e MB/s su una finestra mobile) e, se il pre-conteggio ha
+    fornito il totale, percentuale ed ETA. Lo snapshot va al callback, nella coda
+    `events` (la GUI la svuota dal proprio main loop; se è piena si scarta il più
+    vecchio) e, più di rado, sul terminale.
+    """
+
+    def __init__(self, interval: float = PROGRESS_INTERVAL, callback=None,
+                 events: Optional[queue.Queue] = None, console: bool = False,
+                 console_interval: float = PROGRESS_CONSOLE_INTERVAL,
+                 window: float = PROGRESS_RATE_WINDOW):
+        self.interval = interval
+        self.callback = callback
+        self.events = events
+        self.console = console
+        self.console_interval = console_interval
+        self.window = window
+        self._lock = threading.Lock()
+        # File con un esito (copiati, duplicati, filtrati, errori) e file copiati
+        self.files = 0
+        self.files_copied = 0
+        self.bytes = 0
+        self.total_files: Optional[int] = None
+        self.counting = False
+        self.phase = "scanning"
+        self._current = None
+        self._started = time.monotonic()
+        self._samples = deque([(self._started, 0, 0)])
+        self._version = 0
+        self._emitted = 0
+        self._last_console = self._started
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="hunter-progress", daemon=True)
+
+    def record(self, record: Dict[str, Any]):
+        """Un record di log appena scritto: costa un lock e qualche somma."""
+        with self._lock:
+            self.files += 1
+            if record.get("status") == "success":
+                self.files_copied += 1
+                self.bytes += record.get("size") or 0
+                self._current = record.get("file")
+            self._version += 1
+
+    def restore(self, files: int, files_copied: int, nbytes: int):
+        """[FEATURE 20] Lavoro già fatto da un job ripreso: conta nel totale, non nelle velocità."""
+        with self._lock:
+            self.files += files
+            self.files_copied += files_copied
+            self.bytes += nbytes
+            self._samples = deque([(time.monotonic(), self.files, self.bytes)])
+            self._version += 1
+
+    def set_total(self, total: Optional[int]):
+        with self._lock:
+            self.total_files = total
+            self.counting = False
+            self._version += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            files, copied, nbytes = self.files, self.files_copied, self.bytes
+            total, current = self.total_files, self._current
+            samples = self._samples
+            samples.append((now, files, nbytes))
+            # Si tiene un campione più vecchio della finestra come base del calcolo
+            while len(samples) > 2 and now - samples[1][0] >= self.window:
+                samples.popleft()
+            inizio, files_base, bytes_base = samples[0]
+        durata = now - inizio
+        files_rate = (files - files_base) / durata if durata > 0 else 0.0
+        bytes_rate = (nbytes - bytes_base) / durata if durata > 0 else 0.0
+        percent = eta = None
+        if total:
+            percent = min(100.0, files / total * 100)
+            if files_rate > 0:
+                eta = max(0, total - files) / files_rate
+        nome = os.path.basename(current) if current else ""
+        return {
+            "phase": self.phase,
+            "files_processed": files,
+            "files_copied": copied,
+            "bytes": nbytes,
+            "files_per_second": round(files_rate, 1),
+            "bytes_per_second": round(bytes_rate),
+            "total_files": total,
+            "counting": self.counting,
+            "percent": round(percent, 1) if percent is not None else None,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "elapsed_seconds": round(now - self._started, 1),
+            "message": f"Elaborato: {nome}" if nome else "",
+        }
+
+    @staticmethod
+    def format_line(snap: Dict[str, Any]) -> str:
+        riga = (f"⏳ {snap['files_processed']} file esaminati, {snap['files_copied']} elaborati "
+                f"({snap['files_per_second']:.0f} file/s, {snap['bytes_per_second'] / (1024 * 1024):.1f} MB/s)")
+        if snap["percent"] is not None:
+            riga += f" {snap['percent']:.1f}%"
+            if snap["eta_seconds"] is not None:
+                riga += f" ETA {format_duration(snap['eta_seconds'])}"
+        elif snap["counting"]:
+            riga += " stima in corso..."
+        return riga
+
+    def emit(self, final: bool = False):
+        with self._lock:
+            self._emitted = self._version
+        snap = self.snapshot()
+        if self.callback is not None:
+            try:
+                # Firma storica: (messaggio, file elaborati)
+                self.callback(snap["message"], snap["files_copied"])
+            except Exception:
+                pass  # Se la GUI viene chiusa, non crashare
+        if self.events is not None:
+            # Coda "ultimo vince": chi la svuota in ritardo trova comunque lo stato più recente
+            try:
+                self.events.put_nowait(snap)
+            except queue.Full:
+                try:
+                    self.events.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    self.events.put_nowait(snap)
+                except queue.Full:
+                    pass
+        if self.console:
+            now = time.monotonic()
+            if final or now - self._last_console >= self.console_interval:
+                self._last_console = now
+                print(self.format_line(snap))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if self._version != self._emitted:
+                self.emit()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, phase: str = "finished"):
+        """Ferma il thread e invia l'ultimo snapshot (phase: finished, cancelled, error)."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.phase = phase
+        self.emit(final=True)
+
+
+# --- CONFIGURAZIONE REPORT IN STREAMING ---
+REPORT_BUFFER_RECORDS = 1000
+REPORT_FSYNC_INTERVAL = 5.0  # secondi
+
+
+class ListReportSink:
+    """Destinazione del log in memoria (comportamento storico di scan_log)."""
+
+    def __init__(self, records: Optional[list] = None):
+        self.records = records if records is not None else []
+        self.path = None
+
+    def append(self, record: Dict[str, Any]):
+        self.records.append(record)
+
+    def close(self, summary: Optional[Dict[str, Any]] = None):
+        pass
+
+
+class JsonlReportSink:
+    """
+    [FEATURE 13] Log della scansione scritto in streaming su file JSONL (gzip se .gz).
+
+    I record passano da un buffer limitato (buffer_records) e il file viene
+    sincronizzato su disco ogni fsync_interval secondi: la memoria resta costante
+    e un crash perde al massimo gli ultimi secondi. La prima riga è un header con
+    i filtri, l'ultima (se la scansione termina) il riepilogo.
+    """
+
+    def __init__(self, path: str, header: Optional[Dict[str, Any]] = None,
+                 buffer_records: int = REPORT_BUFFER_RECORDS,
+                 fsync_interval: float = REPORT_FSYNC_INTERVAL):
+        self.path = path
+        self.records = []  # Compatibilità con ListReportSink: nessun record in memoria
+        self.buffer_records = buffer_records
+        self.fsync_interval = fsync_interval
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._raw = open(path, "wb")
+        self._file = gzip.GzipFile(fileobj=self._raw, mode="wb") if path.endswith(".gz") else self._raw
+        self._lock = threading.Lock()
+        self._buffer: List[str] = []
+        self._last_sync = time.monotonic()
+        self.written = 0
+        self._write_line({"_type": "header", **(header or {})})
+
+    def _write_line(self, record: Dict[str, Any]):
+        self._buffer.append(json.dumps(_plain_record(record), ensure_ascii=False, default=str))
+        if len(self._buffer) >= self.buffer_records:
+            self._flush_locked()
+
+    def _flush_locked(self, force_sync: bool = False):
+        if self._buffer:
+            self._file.write(("\n".join(self._buffer) + "\n").encode("utf-8"))
+            self._buffer = []
+        now = time.monotonic()
+        if force_sync or now - self._last_sync >= self.fsync_interval:
+            if self._file is not self._raw:
+                # Chiude il blocco gzip corrente: i dati già scritti restano leggibili
+                self._file.flush(zlib.Z_SYNC_FLUSH)
+            self._raw.flush()
+            os.fsync(self._raw.fileno())
+            self._last_sync = now
+
+    def append(self, record: Dict[str, Any]):
+        with self._lock:
+            self.written += 1
+            self._write_line(record)
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked(force_sync=True)
+
+    def close(self, summary: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            if summary is not None:
+                self._write_line({"_type": "summary", **summary})
+            self._flush_locked(force_sync=True)
+            if self._file is not self._raw:
+                self._file.close()
+            self._raw.close()
+
+
+def read_report_stream(path: str):
+    """[FEATURE 13] Generatore dei record di un report JSONL (anche troncato da un crash)."""
+    opener = gzip.open if str(path).endswith(".gz") else open
+    try:
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Ultima riga scritta a metà: il resto del file non esiste
+                    return
+    except (EOFError, gzip.BadGzipFile, zlib.error):
+        # Stream gzip non chiuso (crash): si tiene quanto letto finora
+        return
+
+
+def summarize_report_stream(path: str) -> Dict[str, Any]:
+    """
+    [FEATURE 13] Ricostruisce il riepilogo di una scansione dal suo report JSONL.
+    Funziona anche su scansioni interrotte: "complete" indica se c'è il riepilogo finale.
+    """
+    summary = {
+        "files_trovati": 0,
+        "files_duplicati": 0,
+        "files_filtrati": 0,
+        "files_errori": 0,
+        "total_size": 0,
+    }
+    header, final = None, None
+    for record in read_report_stream(path):
+        kind = record.get("_type")
+        if kind == "header":
+            header = record
+            continue
+        if kind == "summary":
+            final = record
+            continue
+        status = record.get("status")
+        if status == "success":
+            summary["files_trovati"] += 1
+            summary["total_size"] += record.get("size") or 0
+        elif status == "duplicate":
+            summary["files_duplicati"] += 1
+        elif status in ("filtered_size", "filtered_date"):
+            summary["files_filtrati"] += 1
+        elif status == "error":
+            summary["files_errori"] += 1
+    return {
+        "path": str(path),
+        "complete": final is not None,
+        "header": header,
+        "summary": summary,
+        "final_summary": final,
+    }
+
+
+# --- CONFIGURAZIONE JOB (CHECKPOINT E RIPRESA) ---
+DEFAULT_JOB_PATH = os.path.join(DEFAULT_DATA_DIR, "job.sqlite")
+# Le cartelle concluse vengono scritte a blocchi: una transazione ogni N cartelle o T secondi
+JOB_CHECKPOINT_DIRS = 500
+JOB_CHECKPOINT_INTERVAL = 2.0  # secondi
+
+
+class JobMismatchError(ValueError):
+    """[FEATURE 20] Il journal appartiene a una ricerca con parametri diversi."""
+
+
+class ScanJournal:
+    """
+    [FEATURE 20] Journal su SQLite di un job di scansione interrompibile.
+
+    Conserva le cartelle concluse con i loro record di log e i contenuti accettati
+    dalla deduplicazione (con i digest già calcolati): alla ripresa non vengono
+    rielaborate. Per le cartelle non ancora concluse ogni trasferimento è annotato
+    prima di partire; alla ripresa quelli che risultano completati sul disco non
+    vengono ripetuti. L'impronta dei parametri impedisce di riprendere un job con
+    una ricerca diversa; resume=False svuota il journal e ricomincia.
+    """
+
+    def __init__(self, db_path: str, fingerprint: Dict[str, Any], resume: bool = True):
+        self.path = db_path
+        parent = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(parent, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS log (seq INTEGER PRIMARY KEY, record TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS contents (
+                rid INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                sample TEXT,
+                digest TEXT,
+                charged INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS transfers (
+                source TEXT PRIMARY KEY,
+                dir TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                record TEXT NOT NULL,
+                content_path TEXT,
+                size INTEGER NOT NULL
+            );
+        """)
+        impronta = json.dumps(fingerprint, sort_keys=True, ensure_ascii=False)
+        esistente = self._get_meta("fingerprint")
+        if esistente is not None and esistente != impronta and resume:
+            self._conn.close()
+            raise JobMismatchError(f"Il job in {db_path} appartiene a un'altra ricerca: "
+                             f"usa resume=False per ricominciare")
+        self.resumed = esistente is not None and resume
+        if not self.resumed:
+            for table in ("meta", "dirs", "log", "contents", "transfers"):
+                self._conn.execute(f"DELETE FROM {table}")
+            self._set_meta("fingerprint", impronta)
+            self._set_meta("created_at", datetime.now().isoformat())
+        self._set_meta("status", "running")
+        self._conn.commit()
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    @staticmethod
+    def describe(db_path: str) -> Optional[Dict[str, Any]]:
+        """Stato di un journal esistente (None se non c'è): per chiedere se riprenderlo."""
+        if not os.path.exists(db_path):
+            return None
+        conn = sqlite3.connect(db_path)
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            dirs_done = conn.execute("SELECT COUNT(*) FROM dirs").fetchone()[0]
+        except sqlite3.Error:
+            return None
+        finally:
+            conn.close()
+        if "fingerprint" not in meta:
+            return None
+        return {
+            "path": db_path,
+            "status": meta.get("status"),
+            "fingerprint": json.loads(meta["fingerprint"]),
+            "created_at": meta.get("created_at"),
+            "updated_at": meta.get("updated_at"),
+            "dirs_done": dirs_done,
+        }
+
+    def load(self) -> Dict[str, Any]:
+        """Tutto ciò che serve per riprendere: cartelle fatte, log, contenuti, file trasferiti."""
+        with self._lock:
+            trasferiti: Dict[str, list] = {}
+            for source, dir_path, position, record, content_path, size in self._conn.execute(
+                    "SELECT source, dir, position, record, content_path, size FROM transfers ORDER BY rowid"):
+                trasferiti.setdefault(dir_path, []).append(
+                    (source, position, json.loads(record), content_path, size))
+            stats = self._get_meta("dedup_stats")
+            return {
+                "dirs": {row[0] for row in self._conn.execute("SELECT path FROM dirs")},
+                "log": [json.loads(row[0]) for row in
+                        self._conn.execute("SELECT record FROM log ORDER BY seq")],
+                "contents": self._conn.execute(
+                    "SELECT rid, path, size, sample, digest, charged FROM contents ORDER BY rid").fetchall(),
+                "dedup_stats": json.loads(stats) if stats else None,
+                "transfers": trasferiti,
+            }
+
+    def next_rid(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(rid), 0) + 1 FROM contents").fetchone()[0]
+
+    def file_started(self, dir_path: str, source: str, position: int, record: Dict[str, Any],
+                     content_path: Optional[str], size: int):
+        """
+        Annota un trasferimento prima di avviarlo (write-ahead): record è l'esito
+        previsto, position il posto del file nel lotto della cartella, content_path
+        dove vivrà il contenuto a trasferimento concluso.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transfers (source, dir, position, record, content_path, size) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (source, dir_path, position,
+                 json.dumps(_plain_record(record), ensure_ascii=False, separators=(",", ":")),
+                 content_path, size))
+            self._conn.commit()
+
+    def checkpoint(self, batches: List["_JobBatch"]):
+        """Segna come concluse le cartelle (in ordine di scansione) in una sola transazione."""
+        with self._lock:
+            for batch in batches:
+                self._conn.execute("INSERT OR IGNORE INTO dirs (path) VALUES (?)", (batch.path,))
+                self._conn.executemany(
+                    "INSERT INTO log (record) VALUES (?)",
+                    [(json.dumps(_plain_record(r), ensure_ascii=False, separators=(",", ":")),)
+                     for r in batch.records])
+                # Il percorso si legge adesso: uno spostamento concluso l'ha già aggiornato
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO contents (rid, path, size, sample, digest, charged) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(record.rid, str(record.path), size, sample, digest, charged)
+                     for record, size, sample, digest, charged in batch.contents])
+                # I file trasferiti ora sono coperti dal log della cartella
+                self._conn.execute("DELETE FROM transfers WHERE dir=?", (batch.path,))
+                if batch.stats is not None:
+                    self._set_meta("dedup_stats", json.dumps(batch.stats))
+            self._set_meta("updated_at", datetime.now().isoformat())
+            self._conn.commit()
+
+    def set_status(self, status: str):
+        with self._lock:
+            self._set_meta("status", status)
+            self._set_meta("updated_at", datetime.now().isoformat())
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class _JobBatch:
+    """Una cartella in lavorazione: record di log, contenuti da salvare, trasferimenti in corso."""
+    __slots__ = ('path', 'records', 'contents', 'stats', 'pending', 'closed')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.records: List[Dict[str, Any]] = []
+        self.contents = []
+        self.stats = None
+        self.pending = 0
+        self.closed = False
+
+
+class JobTracker:
+    """
+    [FEATURE 20] Decide quando una cartella è conclusa e la scrive nel journal.
+
+    Una cartella è conclusa quando lo stadio dedup l'ha elaborata e tutti i suoi
+    trasferimenti sono terminati. I checkpoint seguono l'ordine di scansione: lo
+    stato della deduplicazione salvato con una cartella è quello subito dopo averla
+    elaborata, quindi corrisponde esattamente alle cartelle segnate come fatte.
+    """
+
+    def __init__(self, journal: ScanJournal, dedup: Optional[DuplicateFinder] = None,
+                 checkpoint_dirs: int = JOB_CHECKPOINT_DIRS,
+                 checkpoint_interval: float = JOB_CHECKPOINT_INTERVAL):
+        self.journal = journal
+        self.dedup = dedup
+        self.checkpoint_dirs = checkpoint_dirs
+        self.checkpoint_interval = checkpoint_interval
+        self._lock = threading.Lock()
+        self._open: List[_JobBatch] = []
+        self._ready: List[_JobBatch] = []
+        self._last_flush = time.monotonic()
+        self._next_rid = journal.next_rid()
+        self.dirs_checkpointed = 0
+        if dedup is not None:
+            dedup.dirty = {}
+
+    def open(self, path: str) -> _JobBatch:
+        """Chiamato dallo stadio dedup (in ordine) prima di elaborare una cartella."""
+        batch = _JobBatch(path)
+        with self._lock:
+            self._open.append(batch)
+        return batch
+
+    def log(self, batch: _JobBatch, record: Dict[str, Any]):
+        with self._lock:
+            batch.records.append(record)
+
+    def transfer_started(self, batch: _JobBatch, source: str, position: int, record: Dict[str, Any],
+                         content_path: Optional[str], size: int):
+        """Da chiamare prima di accodare il trasferimento (vedi ScanJournal.file_started)."""
+        self.journal.file_started(batch.path, source, position, record, content_path, size)
+        with self._lock:
+            batch.pending += 1
+
+    def transfer_done(self, batch: _JobBatch):
+        with self._lock:
+            batch.pending -= 1
+            self._advance_locked()
+
+    def close(self, batch: _JobBatch):
+        """Chiamato dallo stadio dedup a cartella elaborata: fotografa lo stato della deduplicazione."""
+        if self.dedup is not None:
+            dirty, self.dedup.dirty = self.dedup.dirty, {}
+            for record in dirty:
+                if record.rid is None:
+                    record.rid = self._next_rid
+                    self._next_rid += 1
+            batch.contents = [(record, record.size, record.sample, record.digest, record.charged)
+                              for record in dirty]
+            batch.stats = dict(self.dedup.stats)
+        with self._lock:
+            batch.closed = True
+            self._advance_locked()
+
+    def _advance_locked(self):
+        aperte = self._open
+        i = 0
+        while i < len(aperte) and aperte[i].closed and aperte[i].pending == 0:
+            i += 1
+        if i:
+            self._ready.extend(aperte[:i])
+            del aperte[:i]
+        if self._ready and (len(self._ready) >= self.checkpoint_dirs or
+                            time.monotonic() - self._last_flush >= self.checkpoint_interval):
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._ready:
+            self.journal.checkpoint(self._ready)
+            self.dirs_checkpointed += len(self._ready)
+            self._ready = []
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+
+# --- CONFIGURAZIONE CATALOGO ---
+DEFAULT_CATALOG_PATH = os.path.join(DEFAULT_DATA_DIR, "catalog.sqlite")
+
+
+class _CatalogStat:
+    """
+    Stat ricostruita dal catalogo. st_ino resta 0 di proposito: la cache hash
+    rifà una stat vera invece di fidarsi di metadati potenzialmente vecchi.
+    """
+    __slots__ = ('st_size', 'st_mtime', 'st_mtime_ns', 'st_dev', 'st_ino')
+
+    def __init__(self, size: int, mtime_ns: int):
+        self.st_size = size
+        self.st_mtime_ns = mtime_ns
+        self.st_mtime = mtime_ns / 1e9
+        self.st_dev = 0
+        self.st_ino = 0
+
+
+class CatalogEntry:
+    """Voce del catalogo con la stessa interfaccia minima di os.DirEntry (name, path, stat())."""
+    __slots__ = ('name', 'path', 'digest', '_stat')
+
+    def __init__(self, dir_path: str, name: str, size: int, mtime_ns: int, digest: Optional[str] = None):
+        self.name = name
+        self.path = os.path.join(dir_path, name)
+        self.digest = digest
+        self._stat = _CatalogStat(size, mtime_ns)
+
+    def stat(self, follow_symlinks: bool = True):
+        return self._stat
+
+
+class FileCatalog:
+    """
+    [FEATURE 9] Catalogo persistente del filesystem su SQLite.
+
+    Registra cartella, nome, estensione, dimensione, mtime e (opzionale) hash di
+    ogni file visitato. Le ricerche successive interrogano l'indice invece di
+    rileggere il disco; refresh() lo ricostruisce e info() dice quanto è vecchio.
+    I path delle cartelle sono salvati una sola volta e referenziati per id.
+
+    [FEATURE 10] Per ogni cartella salva anche mtime, inode, nlink e numero di voci
+    dell'ultimo listing: refresh(incremental=True) rilegge solo le cartelle cambiate
+    e mantiene i file di quelle invariate. Cartelle cancellate o rinominate spariscono
+    perché non più raggiungibili; quelle nuove vengono lette per intero.
+    Nota: il contenuto di un file modificato "in place" non cambia l'mtime della
+    cartella, quindi dimensione/mtime restano quelli dell'ultimo listing.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_CATALOG_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS dirs (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE,
+                parent_id INTEGER,
+                mtime_ns INTEGER,
+                ino INTEGER,
+                nlink INTEGER,
+                entries INTEGER,
+                listed_ns INTEGER,
+                walk_pos INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                dir_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                ext TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                hash TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_files_ext ON files(ext);
+            CREATE INDEX IF NOT EXISTS idx_files_dir ON files(dir_id);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        # Cataloghi creati prima del rescan incrementale: aggiunge le colonne mancanti
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(dirs)")}
+        for column in ("parent_id", "mtime_ns", "ino", "nlink", "entries", "listed_ns", "walk_pos"):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE dirs ADD COLUMN {column} INTEGER")
+        self._conn.commit()
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def is_empty(self) -> bool:
+        return self._get_meta("refreshed_at") is None
+
+    def load_state(self):
+        """Restituisce (path -> DirSnapshot, path -> id) dall'ultimo aggiornamento."""
+        state: Dict[str, DirSnapshot] = {}
+        ids: Dict[str, int] = {}
+        children: Dict[int, List[str]] = {}
+        rows = self._conn.execute(
+            "SELECT id, path, parent_id, mtime_ns, ino, nlink, entries, listed_ns FROM dirs "
+            "ORDER BY walk_pos, id").fetchall()
+        for dir_id, path, parent_id, *_ in rows:
+            ids[path] = dir_id
+            if parent_id is not None:
+                children.setdefault(parent_id, []).append(os.path.basename(path))
+        for dir_id, path, parent_id, mtime_ns, ino, nlink, entries, listed_ns in rows:
+            if mtime_ns is None or listed_ns is None:
+                continue  # Riga senza stato: verrà riletta
+            state[path] = DirSnapshot(mtime_ns, ino, nlink, listed_ns, entries or 0, children.get(dir_id, []))
+        return state, ids
+
+    def refresh(self, roots: List[str], walker: ParallelWalker, hasher=None,
+                incremental: bool = False, hash_algorithm: str = DEFAULT_HASH_ALGORITHM,
+                hash_executor=None) -> Dict[str, Any]:
+        """
+        Aggiorna il catalogo visitando le root con il walker indicato.
+        hasher (opzionale): (path, stat) -> digest, per salvare anche l'hash completo.
+        incremental: rilegge solo le cartelle cambiate dall'ultimo aggiornamento.
+        [FEATURE 15] hash_algorithm è l'algoritmo di hasher; hash_executor (opzionale)
+        hasha in parallelo i file di ogni cartella.
+        """
+        started = datetime.now()
+        files_indexed = 0
+        files_carried = 0
+        dirs_removed = 0
+        was_empty = self.is_empty()
+        with self._conn:
+            if incremental:
+                state, ids = self.load_state()
+                if hasher and self._get_meta("hash_algorithm") not in (None, hash_algorithm):
+                    # Gli hash mantenuti sarebbero di un altro algoritmo: meglio nessuno
+                    self._conn.execute("UPDATE files SET hash=NULL")
+                    self._set_meta("with_hashes", "0")
+            else:
+                self._conn.execute("DELETE FROM files")
+                self._conn.execute("DELETE FROM dirs")
+                state, ids = {}, {}
+            walker.use_previous_state(state)
+            visited = set()
+            root_set = set(roots)
+            # Posizione nella visita: le cartelle aggiunte da un refresh incrementale hanno
+            # id più alti ma devono restare al loro posto nell'ordine di query()
+            walk_pos = 0
+            for root_dir in roots:
+                for visit in walker.walk_dirs(root_dir):
+                    dir_id = ids.get(visit.path)
+                    walk_pos += 1
+                    if visit.skipped:
+                        # Cartella invariata: i file del listing precedente restano validi
+                        visited.add(dir_id)
+                        self._conn.execute("UPDATE dirs SET walk_pos=? WHERE id=?", (walk_pos, dir_id))
+                        files_carried += self._conn.execute(
+                            "SELECT COUNT(*) FROM files WHERE dir_id=?", (dir_id,)).fetchone()[0]
+                        continue
+                    parent_id = None if visit.path in root_set else ids.get(os.path.dirname(visit.path))
+                    st = visit.stat
+                    values = (parent_id, st.st_mtime_ns, st.st_ino, st.st_nlink, visit.entries, visit.listed_ns,
+                              walk_pos)
+                    if dir_id is None:
+                        dir_id = self._conn.execute(
+                            "INSERT INTO dirs (path, parent_id, mtime_ns, ino, nlink, entries, listed_ns, walk_pos) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (visit.path, *values)).lastrowid
+                        ids[visit.path] = dir_id
+                    else:
+                        self._conn.execute(
+                            "UPDATE dirs SET parent_id=?, mtime_ns=?, ino=?, nlink=?, entries=?, listed_ns=?, "
+                            "walk_pos=? WHERE id=?", (*values, dir_id))
+                        self._conn.execute("DELETE FROM files WHERE dir_id=?", (dir_id,))
+                    visited.add(dir_id)
+                    listed = []
+                    for entry in visit.files:
+                        try:
+                            listed.append((entry, entry.stat()))
+                        except OSError:
+                            continue
+                    if not hasher:
+                        digests = [None] * len(listed)
+                    elif hash_executor is not None:
+                        digests = list(hash_executor.map(lambda item: hasher(item[0].path, item[1]), listed))
+                    else:
+                        digests = [hasher(entry.path, st) for entry, st in listed]
+                    rows = [(dir_id, entry.name, os.path.splitext(entry.name)[1].lower(),
+                             st.st_size, st.st_mtime_ns, digest)
+                            for (entry, st), digest in zip(listed, digests)]
+                    self._conn.executemany(
+                        "INSERT INTO files (dir_id, name, ext, size, mtime_ns, hash) VALUES (?, ?, ?, ?, ?, ?)",
+                        rows)
+                    files_indexed += len(rows)
+            if incremental:
+                # Cartelle non più raggiungibili: cancellate, rinominate o ora escluse
+                stale = [(dir_id,) for dir_id in ids.values() if dir_id not in visited]
+                self._conn.executemany("DELETE FROM files WHERE dir_id=?", stale)
+                self._conn.executemany("DELETE FROM dirs WHERE id=?", stale)
+                dirs_removed = len(stale)
+            # Con un refresh incrementale gli hash sono completi solo se lo erano già
+            with_hashes = bool(hasher) and (not incremental or was_empty
+                                            or self._get_meta("with_hashes") == "1")
+            self._set_meta("roots", json.dumps(roots))
+            self._set_meta("refreshed_at", datetime.now().isoformat())
+            self._set_meta("with_hashes", "1" if with_hashes else "0")
+            if hasher:
+                self._set_meta("hash_algorithm", hash_algorithm)
+        return {
+            "incremental": incremental,
+            "files_indexed": files_indexed,
+            "files_carried_forward": files_carried,
+            "dirs_relisted": walker.dirs_listed,
+            "dirs_skipped": walker.dirs_skipped,
+            "dirs_removed": dirs_removed,
+            "duration_seconds": (datetime.now() - started).total_seconds(),
+        }
+
+    def query(self, extensions: List[str], exclude_dir: Optional[str] = None,
+              hash_algorithm: str = DEFAULT_HASH_ALGORITHM):
+        """
+        Generatore: (cartella, lista di CatalogEntry) per i file con le estensioni
+        richieste, nello stesso ordine della visita che ha costruito il catalogo.
+        exclude_dir esclude una cartella e tutto il suo contenuto (Anti-Ouroboros).
+        [FEATURE 15] Gli hash salvati sono restituiti solo se prodotti da hash_algorithm.
+        """
+        excluded = os.path.normcase(str(exclude_dir)) if exclude_dir else None
+        # Cataloghi senza l'informazione: gli hash erano sempre MD5
+        same_algorithm = (self._get_meta("hash_algorithm") or "md5") == hash_algorithm
+        placeholders = ",".join("?" for _ in extensions)
+        cursor = self._conn.execute(
+            f"SELECT d.path, f.name, f.size, f.mtime_ns, f.hash FROM files f "
+            f"JOIN dirs d ON d.id = f.dir_id WHERE f.ext IN ({placeholders}) "
+            f"ORDER BY d.walk_pos, f.dir_id, f.rowid", list(extensions))
+        current_dir, batch = None, []
+        for dir_path, name, size, mtime_ns, digest in cursor:
+            if dir_path != current_dir:
+                if batch:
+                    yield current_dir, batch
+                current_dir, batch = dir_path, []
+            if excluded:
+                normalized = os.path.normcase(dir_path)
+                if normalized == excluded or normalized.startswith(excluded.rstrip(os.sep) + os.sep):
+                    continue
+            batch.append(CatalogEntry(dir_path, name, size, mtime_ns, digest if same_algorithm else None))
+        if batch:
+            yield current_dir, batch
+
+    def info(self) -> Dict[str, Any]:
+        """Stato del catalogo: quando è stato aggiornato e quanto è vecchio."""
+        refreshed_at = self._get_meta("refreshed_at")
+        age = None
+        if refreshed_at:
+            age = (datetime.now() - datetime.fromisoformat(refreshed_at)).total_seconds()
+        roots = self._get_meta("roots")
+        return {
+            "path": self.db_path,
+            "roots": json.loads(roots) if roots else None,
+            "refreshed_at": refreshed_at,
+            "age_seconds": age,
+            "with_hashes": self._get_meta("with_hashes") == "1",
+            "hash_algorithm": self._get_meta("hash_algorithm"),
+            "files": self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0],
+            "dirs": self._conn.execute("SELECT COUNT(*) FROM dirs").fetchone()[0],
+        }
+
+    def close(self):
+        self._conn.close()
+
+
+# --- CONFIGURAZIONE PROCESSI (SHARDING) ---
+# Shard desiderati per processo: tanti shard piccoli bilanciano sottoalberi di peso diverso
+SHARDS_PER_PROCESS = 4
+# Livelli di cartelle che il processo principale può dividere per ottenere abbastanza shard
+SHARD_SPLIT_DEPTH = 3
+# File per messaggio verso il pool durante il calcolo dei digest
+SHARD_HASH_CHUNK = 64
+# File letti dalla scansione per ogni finestra di digest precalcolati (memoria limitata)
+SHARD_PRECOMPUTE_FILES = 4096
+
+
+class ShardEntry:
+    """[FEATURE 22] File trovato da un processo del pool, con l'interfaccia minima di os.DirEntry."""
+    __slots__ = ('name', 'path', '_stat')
+
+    def __init__(self, path: str, name: str, stat):
+        self.path = path
+        self.name = name
+        self._stat = stat
+
+    def stat(self, follow_symlinks: bool = True):
+        return self._stat
+
+
+# Stato di ogni processo del pool (impostato da _init_shard_worker)
+_SHARD_CONTEXT: Dict[str, Any] = {}
+
+
+def _init_shard_worker(walker_options: Dict[str, Any], filters: Dict[str, Any], hash_algorithm: str):
+    _SHARD_CONTEXT.update(walker_options=walker_options, filters=filters, hasher=FileHasher(hash_algorithm))
+
+
+def _print_excluded(path):
+    print(f"🚫 [ANTI-OUROBOROS] Saltata cartella destinazione: {path}")
+
+
+def _scan_shard(shard):
+    """
+    Eseguito in un processo del pool: visita lo shard (kind, path, prune) e applica
+    estensione, nome, dimensione e data. kind "files" legge solo i file della cartella,
+    "tree" l'intero sottoalbero. Restituisce (lotti, cartelle lette, esclusioni, stats fuzzy).
+    """
+    kind, path, prune = shard
+    options = _SHARD_CONTEXT["walker_options"]
+    # [FEATURE 23] Predicato compilato per shard: le statistiche fuzzy restano dello shard
+    predicate = FilePredicate(**_SHARD_CONTEXT["filters"])
+    walker = ParallelWalker(workers=options["workers"], exclude_paths=options["exclude_paths"],
+                            exclude_ids=options["exclude_ids"], prune_paths=prune,
+                            on_excluded=_print_excluded if options["show_excluded"] else None)
+    if kind == "files":
+        # Le sottocartelle sono shard a parte: basta il listing, senza filtrarle di nuovo
+        listing = walker.list_dir(path)
+        cartelle = [] if listing is None else [(path, listing[1])]
+        walker.dirs_listed = len(cartelle)
+    else:
+        cartelle = walker.walk(path)
+    lotti = []
+    for current_root, files in cartelle:
+        esiti = predicate.filter(current_root, predicate.match(files))
+        # os.DirEntry non attraversa i processi: resta solo ciò che serve a valle
+        lotti.append((current_root, [("file", ShardEntry(esito[1].path, esito[1].name, esito[2]), esito[2])
+                                     if esito[0] == "file" else esito for esito in esiti]))
+    return lotti, walker.dirs_listed, walker.excluded_hits, predicate.matcher.stats
+
+
+def _hash_shard_file(task):
+    """Eseguito in un processo del pool: digest completo (sample_size None) o campione."""
+    path, size, sample_size = task
+    hasher = _SHARD_CONTEXT["hasher"]
+    try:
+        if sample_size is None:
+            return hasher.hash_file(path)
+        return hasher.hash_sample(path, size, sample_size)
+    except Exception:
+        return None
+
+
+class ShardedScan:
+    """
+    [FEATURE 22] Scansione divisa tra più processi, per usare tutti i core su
+    confronto dei nomi e hashing (che in un solo processo condividono il GIL).
+
+    Fase 1: ogni shard è la lista dei file di una cartella oppure un sottoalbero
+    intero; i processi lo visitano e applicano estensione, nome, dimensione e data.
+    Concatenati nell'ordine del piano gli shard riproducono l'ordine di os.walk,
+    quindi la deduplicazione (che resta nel processo principale) sceglie gli stessi
+    originali e gli stessi nomi della scansione a processo singolo.
+    Fase 2: i digest che la deduplicazione chiederà (dimensioni in collisione anche
+    tra shard diversi) vengono calcolati nel pool, una finestra di file alla volta
+    mentre la scansione prosegue, e poi solo consultati.
+    """
+
+    def __init__(self, workers: int, walker_options: Dict[str, Any], filters: Dict[str, Any],
+                 hash_algorithm: str, sample_size: int = SAMPLE_SIZE):
+        self.workers = workers
+        self.walker_options = walker_options
+        self.sample_size = sample_size
+        # spawn ovunque: il processo principale ha già thread attivi (fork non è sicuro)
+        self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_init_shard_worker,
+                                        initargs=(walker_options, filters, hash_algorithm))
+        # Digest calcolati nel pool: path -> digest completo / campione
+        self.digests: Dict[str, str] = {}
+        self.samples: Dict[str, str] = {}
+        self.fuzzy_stats: Counter = Counter()
+        self.shards = 0
+        self.dirs_listed = 0
+        self.excluded_hits = 0
+        self.digests_precomputed = 0
+        self.scan_seconds = 0.0
+        self.hash_seconds = 0.0
+
+    def plan(self, groups: List[List[ScanUnit]], on_excluded=None) -> List[tuple]:
+        """
+        Divide le unità (raggruppate per disco, in ordine) in shard (kind, path, prune).
+        Finché gli shard sono pochi ogni sottoalbero viene sostituito dai file della
+        sua cartella seguiti dai sottoalberi dei figli: l'ordine di visita non cambia.
+        """
+        obiettivo = self.workers * SHARDS_PER_PROCESS
+        shards = []
+        for gruppo in groups:
+            prune = frozenset().union(*(unit.prune for unit in gruppo))
+            # Stesse regole del walker dei processi; le esclusioni contate qui non si ripetono
+            splitter = ParallelWalker(workers=1, exclude_paths=self.walker_options["exclude_paths"],
+                                      exclude_ids=self.walker_options["exclude_ids"],
+                                      prune_paths=prune, on_excluded=on_excluded)
+            shards.extend(["tree", unit.path, os.path.realpath(unit.path), prune, splitter] for unit in gruppo)
+        for _ in range(SHARD_SPLIT_DEPTH):
+            if len(shards) >= obiettivo or all(shard[0] == "files" for shard in shards):
+                break
+            divisi = []
+            for shard in shards:
+                kind, path, real, prune, splitter = shard
+                if kind == "files":
+                    divisi.append(shard)
+                    continue
+                visit = splitter.visit(path, real)
+                if visit is None:
+                    continue  # Illeggibile: saltata come nel walk
+                divisi.append(["files", path, real, prune, splitter])
+                divisi.extend(["tree", os.path.join(path, name), os.path.join(real, name), prune, splitter]
+                              for name in visit.children)
+            shards = divisi
+        for shard in shards:
+            self.excluded_hits += shard[4].excluded_hits
+            shard[4].excluded_hits = 0
+        self.shards = len(shards)
+        return [(kind, path, prune) for kind, path, _real, prune, _splitter in shards]
+
+    def scan(self, shards: List[tuple], cancel_event: Optional[threading.Event] = None):
+        """Generatore di lotti (cartella, esiti) nell'ordine del piano, come lo stadio filter."""
+        inizio = time.perf_counter()
+        try:
+            for lotti, dirs_listed, excluded_hits, fuzzy_stats in self.pool.map(_scan_shard, shards):
+                self.dirs_listed += dirs_listed
+                self.excluded_hits += excluded_hits
+                self.fuzzy_stats.update(fuzzy_stats)
+                yield from lotti
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+        finally:
+            self.scan_seconds += time.perf_counter() - inizio
+
+    def precompute(self, lotti, dedup: DuplicateFinder, hasher: FileHasher,
+                   cache: Optional[HashCache] = None, cancel_event: Optional[threading.Event] = None,
+                   window: int = SHARD_PRECOMPUTE_FILES):
+        """
+        Generatore: restituisce i lotti dopo aver calcolato nel pool i digest che
+        dedup.check() chiederà per i loro file: campioni (o hash completi per i file
+        piccoli) per le dimensioni in collisione, poi hash completi per i campioni in
+        collisione. La sorgente si legge a finestre di `window` file: in memoria
+        restano la finestra e, per ogni dimensione (e campione) vista una volta sola,
+        il suo primo file, da calcolare se un file successivo collide con lui.
+        I contenuti già in dedup (ripresa di un job) contano per le collisioni.
+        """
+        # dimensione / (dimensione, campione) -> unico file visto, None se già in collisione
+        per_size: Dict[int, Optional[tuple]] = {size: None for size, bucket in dedup.by_size.items()
+                                                 if dedup.records(bucket)}
+        per_sample: Dict[tuple, Optional[tuple]] = {
+            (record.size, record.sample): None for bucket in dedup.by_size.values()
+            for record in dedup.records(bucket) if record._sample is not None}
+        finestra, files = [], []
+        for lotto in lotti:
+            finestra.append(lotto)
+            files.extend((str(Path(esito[1].path)), esito[2]) for esito in lotto[1] if esito[0] == "file")
+            if len(files) >= window:
+                self._precompute_window(files, per_size, per_sample, hasher, cache, cancel_event)
+                yield from finestra
+                finestra, files = [], []
+        if finestra:
+            self._precompute_window(files, per_size, per_sample, hasher, cache, cancel_event)
+            yield from finestra
+
+    @staticmethod
+    def _collisions(items, seen: Dict[Any, Optional[tuple]], key) -> list:
+        # File in collisione, compreso il primo file della chiave quando la collisione è nuova
+        out = []
+        for item in items:
+            k = key(item)
+            if k not in seen:
+                seen[k] = item
+                continue
+            if seen[k] is not None:
+                out.append(seen[k])
+                seen[k] = None
+            out.append(item)
+        return out
+
+    def _precompute_window(self, files, per_size, per_sample, hasher: FileHasher,
+                           cache: Optional[HashCache], cancel_event: Optional[threading.Event]):
+        inizio = time.perf_counter()
+        in_collisione = self._collisions(files, per_size, lambda item: item[1].st_size)
+        piccoli = [(path, st) for path, st in in_collisione if st.st_size <= 2 * self.sample_size]
+        grandi = [(path, st) for path, st in in_collisione if st.st_size > 2 * self.sample_size]
+        self._compute(piccoli, True, hasher, cache, cancel_event)
+        self._compute(grandi, False, hasher, cache, cancel_event)
+        # Hash completi solo dove anche il campione collide
+        self._compute(self._collisions([(path, st) for path, st in grandi if path in self.samples], per_sample,
+                                       lambda item: (item[1].st_size, self.samples[item[0]])),
+                      True, hasher, cache, cancel_event)
+        self.hash_seconds += time.perf_counter() - inizio
+
+    def _compute(self, items, full: bool, hasher: FileHasher, cache: Optional[HashCache],
+                 cancel_event: Optional[threading.Event]):
+        target = self.digests if full else self.samples
+        kind = hasher.algorithm if full else hasher.sample_kind(self.sample_size)
+        tasks, keys = [], []
+        for path, st in items:
+            if path in target:
+                continue
+            # [FEATURE 8] La cache si consulta qui: dedup troverà il digest già pronto
+            key = cache.key_for(path, st) if cache is not None else None
+            cached = cache.get(key, kind) if key is not None else None
+            if cached is not None:
+                target[path] = cached
+                continue
+            tasks.append((path, st.st_size, None if full else self.sample_size))
+            keys.append(key)
+        for (path, _, _), key, digest in zip(tasks, keys,
+                                             self.pool.map(_hash_shard_file, tasks, chunksize=SHARD_HASH_CHUNK)):
+            if digest is None:
+                # Come calculate_file_hash: un file illeggibile non è duplicato di nessuno
+                target[path] = f"error_{path}"
+                continue
+            target[path] = digest
+            self.digests_precomputed += 1
+            if key is not None:
+                cache.put(key, kind, digest, path)
+            if cancel_event is not None and cancel_event.is_set():
+                return
+
+    def moved(self, source, destination):
+        """Uno spostamento concluso: il contenuto ora si legge dalla destinazione."""
+        for target in (self.digests, self.samples):
+            digest = target.pop(str(source), None)
+            if digest is not None:
+                target[str(destination)] = digest
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "shards": self.shards,
+            "dirs_listed": self.dirs_listed,
+            "digests_precomputed": self.digests_precomputed,
+            "scan_seconds": round(self.scan_seconds, 3),
+            "hash_seconds": round(self.hash_seconds, 3),
+        }
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+# --- RICERCA IN STREAMING ---
+class FileMatch:
+    """
+    [FEATURE 24] Un file che soddisfa i filtri, restituito da iter_matches appena trovato.
+    digest è l'hash completo se è stato calcolato (compute_hash, oppure una collisione
+    durante la deduplicazione), altrimenti None.
+    """
+    __slots__ = ('path', 'name', 'size', 'mtime', 'digest', 'stat')
+
+    def __init__(self, path: str, name: str, size: int, mtime: float, digest: Optional[str] = None,
+                 stat=None):
+        self.path = path
+        self.name = name
+        self.size = size
+        self.mtime = mtime
+        self.digest = digest
+        self.stat = stat
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Stessi campi dei record di log di scan_and_process."""
+        return {
+            "file": self.path,
+            "size": self.size,
+            "modified": datetime.fromtimestamp(self.mtime).isoformat(),
+            "hash": self.digest,
+        }
+
+    def __repr__(self):
+        return f"FileMatch({self.path!r}, size={self.size})"
+
+
+# --- CONFIGURAZIONE BATCH DI RICERCHE ---
+# Parametri di scan_and_process accettati da ciascun job di scan_batch
+BATCH_JOB_OPTIONS = frozenset({
+    "name", "estensioni_target", "cartella_destinazione", "query_nome", "mode", "deduplicate",
+    "min_size", "max_size", "date_from", "date_to", "dry_run", "generate_report", "content_store",
+})
+
+
+class _BatchJob:
+    """[FEATURE 25] Stato di una ricerca dentro scan_batch: filtri, dedup, destinazione, log."""
+
+    def __init__(self, index: int, spec: Dict[str, Any], hasher: FileHasher, transfers: TransferEngine,
+                 full_hasher, sample_hasher, sink=None):
+        sconosciuti = set(spec) - BATCH_JOB_OPTIONS
+        if sconosciuti:
+            raise ValueError(f"Job {index}: parametri non supportati {sorted(sconosciuti)}")
+        if "estensioni_target" not in spec or "cartella_destinazione" not in spec:
+            raise ValueError(f"Job {index}: servono estensioni_target e cartella_destinazione")
+        self.name = spec.get("name") or f"job{index}"
+        self.mode = spec.get("mode", "copy")
+        self.dry_run = spec.get("dry_run", False)
+        self.deduplicate = spec.get("deduplicate", True)
+        self.generate_report = spec.get("generate_report", False)
+        self.path_dest = Path(spec["cartella_destinazione"])
+        self.predicate = FilePredicate(spec["estensioni_target"], spec.get("query_nome"),
+                                       spec.get("min_size"), spec.get("max_size"),
+                                       spec.get("date_from"), spec.get("date_to"))
+        self.filters = {
+            "extensions": sorted(self.predicate.extensions),
+            "name_query": spec.get("query_nome"),
+            "min_size": spec.get("min_size"),
+            "max_size": spec.get("max_size"),
+            "date_from": spec["date_from"].isoformat() if spec.get("date_from") else None,
+            "date_to": spec["date_to"].isoformat() if spec.get("date_to") else None,
+            "deduplicate": self.deduplicate,
+            "hash_algorithm": hasher.algorithm,
+        }
+        self.dedup = DuplicateFinder(full_hasher, sample_hasher) if self.deduplicate else None
+        self.names = DestinationIndex()
+        self.store = ContentStore(self.path_dest, transfers, full_hasher) \
+            if spec.get("content_store") and not self.dry_run else None
+        self.lock = threading.Lock()
+        self.log = CompactLog()
+        # [FEATURE 26] Il log resta in memoria solo se finisce nel report (o va su un sink JSONL)
+        self.sink = sink if sink is not None else ListReportSink(self.log) if self.generate_report else None
+        # [FEATURE 12] Record dei trasferimenti al loro posto nell'ordine di scansione
+        self.sequence = LogSequencer(self.sink.append) if self.sink is not None else None
+        self.files_trovati = 0
+        self.files_duplicati = 0
+        self.files_filtrati = 0
+        self.files_errori = 0
+        self.total_size = 0
+
+    def record(self, record: Dict[str, Any], slot: Optional[int] = None):
+        # slot: posto riservato con reserve() prima di accodare il trasferimento
+        if self.sequence is None:
+            return
+        if slot is None:
+            self.sequence.append(record)
+        else:
+            self.sequence.fill(slot, record)
+
+    def reserve(self) -> Optional[int]:
+        return self.sequence.reserve() if self.sequence is not None else None
+
+    def skip(self, slot: Optional[int]):
+        if slot is not None:
+            self.sequence.skip(slot)
+
+
+class _BatchRunner:
+    """
+    [FEATURE 25] Filtri, deduplicazione e trasferimenti di più job, una cartella alla volta.
+    [FEATURE 26] Condiviso da scan_batch e watch: i file di una cartella (letti dal
+    walker o segnalati da inotify) passano per process_dir.
+
+    Se un file corrisponde a più job, quelli di copia lo leggono prima che un job
+    di spostamento lo sposti; lo sposta solo il primo job "move" che lo trova.
+    """
+
+    def __init__(self, hunter: "FileHunter", jobs: List[Dict[str, Any]],
+                 hash_algorithm: str = DEFAULT_HASH_ALGORITHM,
+                 transfer_workers: int = DEFAULT_TRANSFER_WORKERS,
+                 show_progress: bool = True, sinks: Optional[list] = None,
+                 governor: Optional[IOGovernor] = None):
+        self.hunter = hunter
+        self.show_progress = show_progress
+        self.hasher = FileHasher(hash_algorithm)
+        # [FEATURE 29] Stat, hash e copie di tutti i job sotto gli stessi limiti
+        self.governor = governor
+        self.transfers = TransferEngine(workers=transfer_workers, governor=governor)
+        # Sorgente -> Future dello spostamento: chi deve rileggere un contenuto lo cerca dove è finito
+        self.moves: Dict[str, Any] = {}
+        self.jobs = [_BatchJob(i, spec, self.hasher, self.transfers, self._hash_full, self._hash_sample,
+                               sinks[i - 1] if sinks else None)
+                     for i, spec in enumerate(jobs, 1)]
+        # Per ogni cartella i job di copia/anteprima vengono prima di quelli di spostamento
+        self.order = [job for job in self.jobs if job.mode != "move" or job.dry_run] + \
+                     [job for job in self.jobs if job.mode == "move" and not job.dry_run]
+        self.extensions = frozenset().union(*(job.predicate.extensions for job in self.jobs))
+
+    def _current_path(self, path):
+        future = self.moves.get(str(path))
+        if future is None:
+            return path
+        try:
+            return future.result() or path
+        except Exception:
+            return path
+
+    def _hash_full(self, path, st=None):
+        path = self._current_path(path)
+        size = st.st_size if st is not None else None
+        try:
+            if self.governor is not None:
+                return self.governor.run("hash", getattr(st, "st_dev", None), size or 0,
+                                         self.hasher.hash_file, path)
+            return self.hasher.hash_file(path)
+        except Exception:
+            return f"error_{path}"
+
+    def _hash_sample(self, path, size, sample_size, st=None):
+        path = self._current_path(path)
+        try:
+            if self.governor is not None:
+                return self.governor.run("hash", getattr(st, "st_dev", None), min(size, 2 * sample_size),
+                                         self.hasher.hash_sample, path, size, sample_size)
+            return self.hasher.hash_sample(path, size, sample_size)
+        except Exception:
+            return f"error_{path}"
+
+    def candidates(self, files) -> list:
+        """Un solo controllo sull'unione delle estensioni, poi ogni job applica i suoi filtri."""
+        extension, estensioni = FilePredicate.extension, self.extensions
+        return [entry for entry in files if extension(entry.name) in estensioni]
+
+    def process_dir(self, current_root: str, candidati):
+        """Passa a tutti i job i candidati (già filtrati con candidates) di una cartella."""
+        if not candidati:
+            return
+        in_copia: Dict[str, list] = {}
+        for job in self.order:
+            self._process(job, current_root, candidati, in_copia)
+
+    def forget_moves(self):
+        """[FEATURE 26] Dimentica gli spostamenti conclusi: in watch un nuovo file può riusare il nome."""
+        for chiave in [k for k, future in self.moves.items() if future.done()]:
+            del self.moves[chiave]
+
+    def _process(self, job: _BatchJob, current_root: str, candidati, in_copia: Dict[str, list]):
+        for esito in job.predicate.filter(current_root, job.predicate.match(candidati), None, self.governor):
+            if esito[0] == "filtered":
+                with job.lock:
+                    job.files_filtrati += 1
+                    job.record(esito[1])
+                continue
+            if esito[0] == "error":
+                with job.lock:
+                    job.files_errori += 1
+                    job.record(esito[1])
+                continue
+            _, entry, file_stat = esito
+            source_path = Path(entry.path)
+            chiave = str(source_path)
+            file_size = file_stat.st_size
+            if chiave in self.moves:
+                # Un altro job di spostamento l'ha già preso in carico
+                with job.lock:
+                    job.files_errori += 1
+                    job.record({"file": chiave, "status": "error",
+                                "error": "File già spostato da un altro job del batch"})
+                continue
+            record = None
+            if job.dedup is not None:
+                is_duplicate, record = job.dedup.check(source_path, file_size, file_stat)
+                if is_duplicate:
+                    with job.lock:
+                        job.files_duplicati += 1
+                        job.record({"file": chiave, "status": "duplicate", "hash": record.digest})
+                    continue
+            ext = os.path.splitext(entry.name)[1].lower()
+            dest_subfolder = job.path_dest / ext.replace('.', '').upper()
+            if job.dry_run:
+                if self.show_progress:
+                    print(f"[DRY-RUN {job.name}] {entry.name} ({self.hunter.format_size(file_size)})")
+                with job.lock:
+                    job.files_trovati += 1
+                    job.total_size += file_size
+                    job.record(self.success(job, source_path, dest_subfolder / entry.name,
+                                            file_size, file_stat.st_mtime, record))
+                continue
+            dest_path = job.names.reserve(dest_subfolder, entry.name)
+            sposta = job.mode == "move"
+            slot = job.reserve()
+            try:
+                future = self.transfers.submit(self._transfer, job, source_path, dest_path, file_size,
+                                               file_stat.st_mtime, record,
+                                               in_copia.get(chiave, ()) if sposta else (), slot)
+            except BaseException:
+                job.skip(slot)
+                raise
+            if sposta:
+                self.moves[chiave] = future
+                if record is not None:
+                    record.pending = future
+            else:
+                in_copia.setdefault(chiave, []).append(future)
+
+    def _transfer(self, job: _BatchJob, source_path: Path, dest_path: Path, file_size: int, file_mtime: float,
+                  record, attese, slot=None):
+        # Gira sul pool di trasferimento; uno spostamento aspetta le copie dello stesso file
+        for future in attese:
+            try:
+                future.result()
+            except Exception:
+                pass
+        try:
+            if job.store is not None:
+                job.store.ingest(source_path, dest_path, job.mode, file_size,
+                                 record.digest if record is not None else None,
+                                 record.stat if record is not None else None)
+            else:
+                self.transfers.transfer(str(source_path), str(dest_path), job.mode, file_size)
+        except Exception as e:
+            job.names.release(dest_path)
+            with job.lock:
+                job.files_errori += 1
+                job.record({"file": str(source_path), "status": "error", "error": str(e)}, slot)
+            return None
+        if record is not None and job.mode == "move":
+            record.path = str(dest_path)
+            record.stat = None
+        with job.lock:
+            job.files_trovati += 1
+            job.total_size += file_size
+            job.record(self.success(job, source_path, dest_path, file_size, file_mtime, record), slot)
+        return dest_path
+
+    @staticmethod
+    def success(job: _BatchJob, source_path, dest_path, file_size: int, file_mtime: float,
+                record) -> "LogRecord":
+        # Stesso record di successo di scan_and_process
+        return LogRecord.success(source_path, dest_path if not job.dry_run else None, file_size, file_mtime,
+                                  record._digest if record is not None else None, job.mode)
+
+    def report(self, job: _BatchJob, status: str, summary: Optional[Dict[str, Any]] = None,
+               **extra) -> Dict[str, Any]:
+        """Report del job (stessa forma di scan_and_process); lo salva se generate_report."""
+        format_size = self.hunter.format_size
+        report = {
+            "name": job.name,
+            "status": status,
+            "mode": "DRY-RUN" if job.dry_run else job.mode.upper(),
+            "timestamp": datetime.now().isoformat(),
+            "summary": {
+                "files_trovati": job.files_trovati,
+                "files_duplicati": job.files_duplicati,
+                "files_filtrati": job.files_filtrati,
+                "files_errori": job.files_errori,
+                "total_size": job.total_size,
+                "total_size_formatted": format_size(job.total_size),
+                "dedup_stats": dict(job.dedup.stats) if job.dedup is not None else None,
+                "fuzzy_stats": dict(job.predicate.matcher.stats) if job.filters["name_query"] else None,
+                "content_store": job.store.stats() if job.store is not None else None,
+            },
+            "filters": job.filters,
+            "destination": str(job.path_dest),
+            "log": job.log.to_list() if job.generate_report else [],
+        }
+        report["summary"].update(summary or {})
+        report.update(extra)
+        if job.generate_report:
+            report_path = job.path_dest / f"scan_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            try:
+                with open(report_path, 'w', encoding='utf-8') as f:
+                    json.dump(report, f, indent=2, ensure_ascii=False)
+                print(f"📄 Report {job.name} salvato in: {report_path}")
+            except Exception as e:
+                print(f"⚠️  Impossibile salvare report {job.name}: {e}")
+        print(f"✅ {job.name}: {job.files_trovati} file, {job.files_duplicati} duplicati, "
+              f"{job.files_filtrati} filtrati, {job.files_errori} errori "
+              f"({format_size(job.total_size)})")
+        return report
+
+    def shutdown(self):
+        self.transfers.shutdown(wait=True)
+
+
+@dataclass
+class _ScanOptions:
+    """
+    [FEATURE 6] Parametri di una chiamata a scan_and_process (stessi nomi e stesso significato,
+    vedi la sua docstring). Nessun default: scan_and_process li passa tutti, e un nome
+    rinominato da una sola parte fallisce subito alla costruzione.
+    """
+    estensioni_target: List[str]
+    cartella_destinazione: str
+    query_nome: Optional[str]
+    mode: str
+    deduplicate: bool
+    min_size: Optional[int]
+    max_size: Optional[int]
+    date_from: Optional[datetime]
+    date_to: Optional[datetime]
+    dry_run: bool
+    generate_report: bool
+    show_progress: bool
+    progress_callback: Any
+    walk_workers: int
+    hash_cache_path: Optional[str]
+    catalog_path: Optional[str]
+    refresh_catalog: bool
+    incremental: bool
+    transfer_workers: int
+    report_stream: Optional[str]
+    stage_workers: Optional[Dict[str, int]]
+    hash_algorithm: str
+    hash_workers: int
+    content_store: bool
+    mount_aware: bool
+    skip_network_fs: bool
+    one_filesystem: bool
+    device_workers: Optional[int]
+    root_dirs: Optional[List[str]]
+    collect_metrics: bool
+    metrics_callback: Any
+    metrics_path: Optional[str]
+    metrics_interval: float
+    job_path: Optional[str]
+    resume: bool
+    progress_interval: float
+    progress_queue: Optional[queue.Queue]
+    progress_precount: bool
+    process_workers: int
+    fused_copy: bool
+    verify_copies: bool
+    adaptive_io: bool
+    max_bytes_per_second: Optional[int]
+    max_iops: Optional[int]
+    io_priority: Optional[str]
+    io_order: str
+
+
+class _ScanRun:
+    """
+    [FEATURE 6] Una esecuzione di scan_and_process, divisa per fasi: risorse, intestazione,
+    ripresa del job, walker e trasferimenti, stadi della pipeline, report.
+
+    I parametri di scan_and_process diventano attributi con lo stesso nome (self.opt.mode,
+    self.opt.dry_run...). Le risorse nascono None e vengono create dalle fasi; run() le chiude
+    tutte in un solo finally (_close), qualunque sia la fase in cui qualcosa fallisce.
+    """
+
+    def __init__(self, hunter: "FileHunter", opt: _ScanOptions):
+        self.opt = opt
+        self.hunter = hunter
+        # Risorse: _close() rilascia solo quelle già create
+        self.annulla: Optional[threading.Event] = None
+        self.journal: Optional[ScanJournal] = None
+        self.sink = None
+        self.governor: Optional[IOGovernor] = None
+        self.hash_pool: Optional[ThreadPoolExecutor] = None
+        self.catalog: Optional[FileCatalog] = None
+        # [FEATURE 22] Scansione a processi: i digest arrivano già calcolati
+        self.sharder: Optional[ShardedScan] = None
+        self.transfers: Optional[TransferEngine] = None
+        # [FEATURE 28] Copie fatte durante l'hash (create con il motore di trasferimento)
+        self.staging: Optional[StagedCopies] = None
+        self.store: Optional[ContentStore] = None
+        self.tracker: Optional[JobTracker] = None
+        self.pipeline: Optional[ScanPipeline] = None
+        self.exporter: Optional[MetricsExporter] = None
+        self.reporter_avviato = False
+        self.fine_scansione = threading.Event()
+        self.lock = threading.Lock()
+        self.candidato = None  # Il file che la deduplicazione sta valutando
+        self.hash_cache_stats = None
+        self.catalog_info = None
+        self.catalog_refresh = None
+        self.shards = None
+
+        self.files_trovati = 0
+        self.files_duplicati = 0
+        self.files_filtrati = 0
+        self.files_errori = 0
+        self.total_size = 0
+        # [FEATURE 20] Stato del job ripreso
+        self.cartelle_fatte = set()
+        self.trasferiti_per_cartella: Dict[str, list] = {}
+
+    def run(self) -> Dict[str, Any]:
+        completata = False
+        try:
+            self._open()
+            self._header()
+            self._resume_job()
+            self._open_walkers()
+            self._open_transfers()
+            self._build_pipeline()
+            sorgente = self._sorgente()
+            self._start_progress()
+            if self.sharder is not None and self.opt.deduplicate:
+                # [FEATURE 22] Digest delle collisioni calcolati nel pool prima che dedup li chieda
+                sorgente = self.sharder.precompute(sorgente, self.dedup, self.hasher, self.hunter.hash_cache,
+                                                   self.annulla)
+            self.pipeline.run(sorgente)
+            completata = True
+        finally:
+            self._close(completata)
+        return self._report()
+
+    # --- Risorse ---
+
+    def _open(self):
+        hunter = self.hunter
+        # Reset tracking per nuova scansione
+        hunter.processed_hashes.clear()
+        hunter.scan_log.clear()
+        self.annulla = hunter._cancel_token()
+
+        # [FEATURE 19] Metriche solo se richieste: altrimenti ogni misura costa un "is None"
+        self.metrics = hunter.metrics = ScanMetrics(self.opt.metrics_callback) \
+            if self.opt.collect_metrics or self.opt.metrics_callback or self.opt.metrics_path else None
+        # [FEATURE 21] Avanzamento a eventi raggruppati: i worker non chiamano più la GUI
+        self.reporter = hunter.progress = ProgressReporter(
+            self.opt.progress_interval, self.opt.progress_callback, self.opt.progress_queue,
+            console=self.opt.show_progress and not self.opt.dry_run) \
+            if self.opt.progress_callback or self.opt.progress_queue is not None or self.opt.show_progress else None
+
+        # [FEATURE 15] Algoritmo scelto: è anche il tipo di digest in cache, catalogo e report
+        self.hasher = hunter.hasher = FileHasher(self.opt.hash_algorithm)
+        self.roots = self.opt.root_dirs or hunter.get_root_dirs()
+        self.estensioni_target = [e.lower().strip() for e in self.opt.estensioni_target]
+        self.path_dest = Path(self.opt.cartella_destinazione)
+        if not self.opt.dry_run:
+            self.path_dest.mkdir(parents=True, exist_ok=True)
+
+        # ✅ FIX ANTI-OUROBOROS: Risolve path assoluto della destinazione
+        # Questo previene il loop dove il programma scansiona i file appena copiati
+        # Dimezza il tempo di scan evitando di leggere/hashare file già processati
+        self.dest_absolute = self.path_dest.resolve()
+
+        self.filtri = {
+            "extensions": self.estensioni_target,
+            "name_query": self.opt.query_nome,
+            "min_size": self.opt.min_size,
+            "max_size": self.opt.max_size,
+            "date_from": self.opt.date_from.isoformat() if self.opt.date_from else None,
+            "date_to": self.opt.date_to.isoformat() if self.opt.date_to else None,
+            "deduplicate": self.opt.deduplicate,
+            "hash_algorithm": self.hasher.algorithm  # [FEATURE 15] Algoritmo di tutti i campi "hash"
+        }
+        # [FEATURE 20] Il journal si apre prima di pool, governor, cache e catalogo: un job di
+        # un'altra ricerca ferma tutto qui
+        if self.opt.job_path:
+            self.journal = ScanJournal(self.opt.job_path, resume=self.opt.resume, fingerprint=dict(
+                self.filtri, mode=self.opt.mode, dry_run=self.opt.dry_run, destination=str(self.dest_absolute),
+                roots=[str(r) for r in self.roots], catalog=bool(self.opt.catalog_path),
+                content_store=self.opt.content_store))
+        # [FEATURE 13] Log in memoria (storico) oppure in streaming su JSONL
+        self.sink = JsonlReportSink(str(self.opt.report_stream), header={
+            "timestamp": datetime.now().isoformat(),
+            "mode": "DRY-RUN" if self.opt.dry_run else self.opt.mode.upper(),
+            "filters": self.filtri,
+            "destination": str(self.path_dest),
+        }) if self.opt.report_stream else ListReportSink(hunter.scan_log)
+        self.log_record = self.sink.append
+        # [FEATURE 29] I/O regolato solo se richiesto: altrimenti ogni operazione costa un "is None"
+        self.workers_stadi = dict(DEFAULT_STAGE_WORKERS, **(self.opt.stage_workers or {}))
+        if self.opt.adaptive_io or self.opt.max_bytes_per_second or self.opt.max_iops or self.opt.io_priority:
+            self.governor = IOGovernor(self.opt.adaptive_io, {"stat": self.workers_stadi["filter"],
+                                                          "hash": self.opt.hash_workers,
+                                                          "copy": self.opt.transfer_workers},
+                                       self.opt.max_bytes_per_second, self.opt.max_iops, self.opt.io_priority)
+        hunter.io_governor = self.governor
+        if self.opt.deduplicate and self.opt.hash_workers > 1:
+            self.hash_pool = ThreadPoolExecutor(max_workers=self.opt.hash_workers, thread_name_prefix="hunter-hash")
+
+        # [FEATURE 7] Motore di deduplicazione a stadi
+        self.dedup = DuplicateFinder(self._hash_completo, self._hash_campione, digests=hunter.processed_hashes,
+                                     executor=self.hash_pool)
+        # [FEATURE 8] Cache hash persistente: una rescan "calda" non rilegge i contenuti
+        if self.opt.deduplicate and self.opt.hash_cache_path:
+            hunter.hash_cache = HashCache(self.opt.hash_cache_path)
+
+        # [FEATURE 17] Mount virtuali/di rete/altri filesystem esclusi, un gruppo per disco
+        self.units = hunter.plan_roots(self.roots, self.opt.mount_aware, self.opt.skip_network_fs,
+                                       self.opt.one_filesystem)
+        # [FEATURE 30] Ordine per posizione sul disco: in "auto" solo se c'è un disco a piatti;
+        # in dry-run non si legge nulla e non serve
+        self.ordine_io = LocalityOrder(self.opt.io_order)
+        self.rotazionali = sorted({unit.device for unit in self.units if is_rotational(unit.device)})
+        if self.opt.dry_run or self.opt.io_order == "walk" or (self.opt.io_order == "auto" and not self.rotazionali):
+            self.ordine_io = None
+
+    def _close(self, completata: bool):
+        hunter = self.hunter
+        if self.annulla is not None:
+            hunter._release_cancel_token(self.annulla)
+        # Attende la fine dei trasferimenti ancora in coda
+        if self.transfers is not None:
+            self.transfers.shutdown(wait=True)
+        if self.hash_pool is not None:
+            self.hash_pool.shutdown(wait=True)
+        if self.staging is not None:
+            self.staging.cleanup()
+        hunter.io_governor = None
+        if self.sharder is not None:
+            self.sharder.shutdown()
+        annullata = self.pipeline is not None and self.pipeline.cancelled
+        if self.reporter_avviato:
+            self.fine_scansione.set()
+            self.reporter.stop("cancelled" if annullata else "finished" if completata else "error")
+        if self.journal is not None:
+            # Anche dopo un errore le cartelle concluse restano nel journal
+            if self.tracker is not None:
+                self.tracker.flush()
+            if annullata:
+                self.journal.set_status("cancelled")
+            elif completata:
+                self.journal.set_status("complete")
+            else:
+                self.journal.set_status("interrupted")
+            self.journal.close()
+        if self.catalog is not None:
+            self.catalog.close()
+        # [FEATURE 15] Cache chiusa anche dopo un errore: self.hash_cache non resta impostata
+        if hunter.hash_cache is not None:
+            self.hash_cache_stats = hunter.hash_cache.stats()
+            hunter.hash_cache.close()
+            hunter.hash_cache = None
+        if not completata:
+            if self.exporter is not None:
+                self.exporter.stop()
+            if self.sink is not None:
+                self.sink.close()  # Senza riepilogo: la scansione non è terminata
+
+    # --- Intestazione, catalogo e job ---
+
+    def _header(self):
+        hunter = self.hunter
+        print(f"🚫 Anti-Ouroboros: Salterò la cartella {self.dest_absolute}")
+
+        # Header scan
+        print(f"\n{'='*60}")
+        print(f"--- AVVIO SCANSIONE {'(DRY-RUN)' if self.opt.dry_run else ''} ---")
+        print(f"{'='*60}")
+        print(f"📁 Root: {self.roots}")
+        if len(self.units) > 1 or hunter.excluded_mounts:
+            dischi = sorted({unit.device for unit in self.units})
+            print(f"💽 Mount: {len(self.units)} da visitare su {len(dischi)} dischi {dischi}, "
+                  f"{len(hunter.excluded_mounts)} esclusi")
+        print(f"🔍 Estensioni: {self.estensioni_target}")
+        if self.opt.query_nome:
+            print(f"🏷️  Filtro nome (Fuzzy): '{self.opt.query_nome}'")
+        if self.opt.min_size or self.opt.max_size:
+            min_str = hunter.format_size(self.opt.min_size) if self.opt.min_size else "N/A"
+            max_str = hunter.format_size(self.opt.max_size) if self.opt.max_size else "N/A"
+            print(f"📏 Dimensione: {min_str} - {max_str}")
+        if self.opt.date_from or self.opt.date_to:
+            from_str = self.opt.date_from.strftime("%Y-%m-%d") if self.opt.date_from else "N/A"
+            to_str = self.opt.date_to.strftime("%Y-%m-%d") if self.opt.date_to else "N/A"
+            print(f"📅 Date: {from_str} - {to_str}")
+        print(f"🔒 Deduplicazione: {'ON (' + self.hasher.algorithm + ')' if self.opt.deduplicate else 'OFF'}")
+        if self.governor is not None:
+            limite = self.opt.max_bytes_per_second
+            limiti = [f"{hunter.format_size(limite)}/s" if limite else None,
+                      f"{self.opt.max_iops} op/s" if self.opt.max_iops else None,
+                      "concorrenza adattiva" if self.opt.adaptive_io else None,
+                      f"priorità {self.opt.io_priority}" if self.opt.io_priority else None]
+            print(f"🐢 I/O regolato: {', '.join(l for l in limiti if l)}")
+        if self.ordine_io is not None:
+            criterio = 'per inode' if self.opt.io_order == 'inode' else 'per posizione fisica (FIEMAP)'
+            print(f"💿 Ordine I/O: {criterio}"
+                  f"{' sui dischi rotazionali ' + str(self.rotazionali) if self.opt.io_order == 'auto' else ''}")
+        # L'età del catalogo fa parte dell'intestazione: si apre (e aggiorna) qui
+        self._open_catalog()
+        print(f"{'='*60}\n")
+        if self.opt.report_stream:
+            print(f"📝 Log in streaming su: {self.opt.report_stream}")
+
+    def _open_catalog(self):
+        # [FEATURE 9] Catalogo: aggiornamento esplicito (o automatico se mai creato)
+        if not self.opt.catalog_path:
+            return
+        self.catalog = FileCatalog(self.opt.catalog_path)
+        if self.opt.refresh_catalog or self.catalog.is_empty():
+            self.catalog_refresh = self.hunter.refresh_catalog(
+                self.opt.catalog_path, self.roots, walk_workers=self.opt.walk_workers,
+                incremental=self.opt.incremental,
+                hash_algorithm=self.opt.hash_algorithm, mount_aware=self.opt.mount_aware,
+                skip_network_fs=self.opt.skip_network_fs, one_filesystem=self.opt.one_filesystem)
+            self.catalog_refresh.pop("catalog", None)
+        self.catalog_info = self.catalog.info()
+        print(f"🗂️  Catalogo: {self.catalog_info['files']} file, aggiornato {self.catalog_info['refreshed_at']} "
+              f"({self.catalog_info['age_seconds'] / 3600:.1f} ore fa)")
+
+    def _resume_job(self):
+        # [FEATURE 20] Job con checkpoint: riparte dall'ultimo stato salvato
+        journal = self.journal
+        if journal is not None:
+            if journal.resumed:
+                stato = journal.load()
+                self.cartelle_fatte = stato["dirs"]
+                self.trasferiti_per_cartella = stato["transfers"]
+                # Il log già salvato torna nel report e ricostruisce i contatori
+                for record in stato["log"]:
+                    status = record.get("status")
+                    if status == "success":
+                        self.files_trovati += 1
+                        self.total_size += record.get("size") or 0
+                    elif status == "duplicate":
+                        self.files_duplicati += 1
+                    elif status in ("filtered_size", "filtered_date"):
+                        self.files_filtrati += 1
+                    elif status == "error":
+                        self.files_errori += 1
+                    self.log_record(record)
+                if self.opt.deduplicate:
+                    # Contenuti già accettati con i digest calcolati: niente riletture
+                    self.dedup.restore(stato["contents"], stato["dedup_stats"])
+                if self.reporter is not None:
+                    self.reporter.restore(len(stato["log"]), self.files_trovati, self.total_size)
+                print(f"💾 Ripresa job {self.opt.job_path}: {len(self.cartelle_fatte)} cartelle già concluse, "
+                      f"{self.files_trovati} file già elaborati")
+            else:
+                print(f"💾 Job con checkpoint: {self.opt.job_path}")
+            self.tracker = JobTracker(journal, self.dedup if self.opt.deduplicate else None)
+
+        # [FEATURE 12] I trasferimenti finiscono in ordine sparso: il log resta in ordine di scansione
+        self.sequenza_log = LogSequencer(self._emetti)
+        self.registra = self.sequenza_log.append
+
+    def _emetti(self, record, lotto=None):
+        # Il record va nel log e, se c'è un job, nella cartella a cui appartiene
+        self.log_record(record)
+        if lotto is not None:
+            self.tracker.log(lotto, record)
+        if self.reporter is not None:
+            self.reporter.record(record)
+
+    # --- Walker e trasferimenti ---
+
+    def _segnala_destinazione(self, path):
+        if self.opt.show_progress:
+            print(f"🚫 [ANTI-OUROBOROS] Saltata cartella destinazione: {path}")
+
+    def _open_walkers(self):
+        metrics, governor = self.metrics, self.governor
+        # [FEATURE 17] Destinazione riconosciuta anche per (st_dev, st_ino)
+        try:
+            dest_stat = os.stat(self.dest_absolute)
+            self.dest_ids = [(dest_stat.st_dev, dest_stat.st_ino)]
+        except OSError:
+            self.dest_ids = []  # Dry-run su una destinazione che non esiste ancora
+        # [FEATURE 30] Disco della destinazione: uno spostamento sullo stesso disco è un
+        # rename e non legge dati
+        self.disco_destinazione = self.dest_ids[0][0] if self.dest_ids else None
+        # [FEATURE 6] Walker parallelo: SKIP_DIRS, cartelle nascoste e destinazione
+        # vengono filtrate senza resolve() per ogni cartella figlia
+        # [FEATURE 17] Un walker (con il suo budget di thread) per ogni disco fisico
+        self.gruppi = RootPlanner.group_by_device(self.units)
+        listing_osservato = metrics.dir_listed if metrics is not None else None
+        if governor is not None:
+            def listing_osservato(path, seconds, entries):
+                # [FEATURE 29] Anche i listing contano per max_iops e girano con la priorità scelta
+                if metrics is not None:
+                    metrics.dir_listed(path, seconds, entries)
+                governor.dir_listed(path, seconds, entries)
+        self.walkers = {device: ParallelWalker(workers=self.opt.device_workers or self.opt.walk_workers,
+                                               exclude_paths=[self.dest_absolute],
+                                               exclude_ids=self.dest_ids,
+                                               prune_paths=set().union(*(u.prune for u in gruppo)),
+                                               on_excluded=self._segnala_destinazione,
+                                               on_listed=listing_osservato)
+                        for device, gruppo in self.gruppi.items()}
+        # [FEATURE 22] Processi: shard per cartella dentro ogni disco, stesso ordine di visita
+        if self.opt.process_workers > 1 and not self.opt.catalog_path:
+            self.sharder = ShardedScan(self.opt.process_workers, {
+                "workers": self.opt.device_workers or self.opt.walk_workers,
+                "exclude_paths": [str(self.dest_absolute)],
+                "exclude_ids": self.dest_ids,
+                "show_excluded": self.opt.show_progress,
+            }, {
+                "extensions": self.estensioni_target,
+                "query": self.opt.query_nome,
+                "min_size": self.opt.min_size,
+                "max_size": self.opt.max_size,
+                "date_from": self.opt.date_from,
+                "date_to": self.opt.date_to,
+            }, self.hasher.algorithm)
+            self.shards = self.sharder.plan(list(self.gruppi.values()), on_excluded=self._segnala_destinazione)
+            print(f"🧩 Processi: {self.opt.process_workers} su {len(self.shards)} shard")
+
+    def _open_transfers(self):
+        hunter = self.hunter
+        # [FEATURE 12] Motore di trasferimento parallelo
+        self.transfers = TransferEngine(workers=self.opt.transfer_workers, governor=self.governor)
+        # [FEATURE 16] Nomi della destinazione in memoria: niente exists() per ogni tentativo
+        self.nomi_destinazione = DestinationIndex()
+        # [FEATURE 16] Store per contenuto: un oggetto per digest, viste con hardlink
+        if self.opt.content_store and not self.opt.dry_run:
+            self.store = ContentStore(self.path_dest, self.transfers,
+                                      lambda path, st: hunter.calculate_file_hash(path, file_stat=st),
+                                      hasher=self.hasher, fused=self.opt.fused_copy, verify=self.opt.verify_copies,
+                                      cached_fn=hunter._cached_hash)
+        # [FEATURE 28] Copia durante l'hash completo e verifica delle copie
+        if self.opt.fused_copy and self.opt.deduplicate and self.opt.mode == "copy" and not self.opt.dry_run:
+            self.staging = StagedCopies(self.transfers, self.hasher)
+        self.verifica = self.hasher if self.opt.verify_copies and not self.opt.dry_run else None
+        if self.staging is not None or self.verifica is not None:
+            print(f"🔗 Copie: {'hash e copia in una lettura' if self.staging is not None else 'standard'}"
+                  f"{', verificate sul disco' if self.verifica is not None else ''}")
+
+    def _sottocartella(self, ext):
+        # Struttura destinazione
+        return self.path_dest / ext.replace('.', '').upper()
+
+    def _hash_completo(self, path, st):
+        digest = self.sharder.digests.get(str(path)) if self.sharder is not None else None
+        if digest is None and self.staging is not None and path == self.candidato:
+            return self._copia_con_hash(path, st)
+        return digest if digest is not None else self.hunter.calculate_file_hash(path, file_stat=st)
+
+    def _hash_campione(self, path, size, sample, st):
+        digest = self.sharder.samples.get(str(path)) if self.sharder is not None else None
+        return digest if digest is not None else self.hunter.calculate_sample_hash(path, size, sample, st)
+
+    def _copia_con_hash(self, path, st):
+        # [FEATURE 28] Il candidato viene copiato mentre se ne calcola l'hash; con il
+        # digest in cache non serve leggerlo e la copia resta al pool di trasferimento
+        hunter, metrics = self.hunter, self.metrics
+        cached = hunter._cached_hash(path, st)
+        if cached is not None:
+            return cached
+        ext = os.path.splitext(path)[1].lower()
+        cartella = self.store.root if self.store is not None else self._sottocartella(ext)
+        size = st.st_size if st is not None else os.path.getsize(path)
+        try:
+            inizio = time.perf_counter() if metrics is not None else 0.0
+            digest = self.staging.stage(path, cartella, size)
+            if metrics is not None:
+                hunter._observe_hash(metrics, path, time.perf_counter() - inizio, size)
+        except Exception:
+            return f"error_{path}"
+        if hunter.hash_cache is not None:
+            hunter.hash_cache.put(hunter.hash_cache.key_for(path, st), self.hasher.algorithm, digest, path)
+        return digest
+
+    def _esito_successo(self, source_path, dest_path, file_size, file_mtime, record):
+        # Log dettagliato ([FEATURE 27] compatto: dimensione e data si formattano nel report)
+        return LogRecord.success(source_path, dest_path if not self.opt.dry_run else None, file_size, file_mtime,
+                                 record._digest if record is not None else None, self.opt.mode)
+
+    def _trasferimento_riuscito(self, source_path, dest_path, file, file_size, file_mtime, record, lotto=None,
+                                posto=None):
+        esito = self._esito_successo(source_path, dest_path, file_size, file_mtime, record)
+        with self.lock:
+            self.files_trovati += 1
+            self.total_size += file_size
+        if posto is None:
+            self.registra(esito, lotto)
+        else:
+            self.sequenza_log.fill(posto, esito, lotto)
+        if lotto is not None and not self.opt.dry_run:
+            self.tracker.transfer_done(lotto)
+
+    def _errore_trasferimento(self, source_path, dest_path, error: Exception, lotto, posto):
+        # Nome liberato e record di errore al posto riservato nel log
+        self.nomi_destinazione.release(dest_path)
+        with self.lock:
+            self.files_errori += 1
+        self.sequenza_log.fill(posto, {
+            "file": str(source_path),
+            "status": "error",
+            "error": str(error)
+        }, lotto)
+        if lotto is not None:
+            self.tracker.transfer_done(lotto)
+
+    def _esegui_trasferimento(self, source_path, dest_path, file, file_size, file_mtime, record, lotto=None,
+                              posto=None):
+        # Gira su un thread del pool di trasferimento; posto è il suo record nel log
+        metrics, staging, store = self.metrics, self.staging, self.store
+        try:
+            inizio = time.perf_counter() if metrics is not None else 0.0
+            # [FEATURE 28] Copia già fatta durante l'hash: resta solo il commit
+            staged = staging.take(str(source_path)) if staging is not None else None
+            digest = record.digest if record is not None else None
+            if digest is not None and digest.startswith("error_"):
+                digest = None
+            if store is not None:
+                method = store.ingest(source_path, dest_path, self.opt.mode, file_size, digest,
+                                      record.stat if record is not None else None, staged)
+            elif staged is not None:
+                method = staging.commit(staged, dest_path, self.verifica)
+            else:
+                method = self.transfers.transfer(str(source_path), str(dest_path), self.opt.mode, file_size,
+                                                 self.verifica, digest)
+            if metrics is not None:
+                durata = time.perf_counter() - inizio
+                # Rename e oggetti già nello store non scrivono dati
+                scritti = 0 if method in ("rename", "move_rename") or "_reused_" in method else file_size
+                metrics.observe("copy", durata, bytes_written=scritti)
+                if metrics.callback:
+                    metrics.emit("file_copied", source=str(source_path), destination=str(dest_path),
+                                 bytes=file_size, seconds=durata, method=method)
+        except Exception as e:
+            self._errore_trasferimento(source_path, dest_path, e, lotto, posto)
+            return
+        if record is not None and self.opt.mode == "move":
+            # Il contenuto ora vive nella destinazione (prima che il Future risulti concluso)
+            if self.sharder is not None:
+                self.sharder.moved(source_path, dest_path)
+            record.path = str(dest_path)
+            record.stat = None
+        self._trasferimento_riuscito(source_path, dest_path, file, file_size, file_mtime, record, lotto, posto)
+
+    def _accoda(self, source_path, dest_path, file, file_size, file_mtime, record, job, posto):
+        # [FEATURE 12] Il trasferimento va in coda sul pool; posto è il suo record nel log
+        try:
+            future = self.transfers.submit(self._esegui_trasferimento, source_path, dest_path,
+                                           file, file_size, file_mtime, record, job, posto)
+        except Exception as e:
+            if self.staging is not None:
+                self.staging.discard(str(source_path))
+            self._errore_trasferimento(source_path, dest_path, e, job, posto)
+            return
+        except BaseException:
+            self.sequenza_log.skip(posto)
+            if job is not None:
+                self.tracker.transfer_done(job)
+            raise
+        if record is not None and self.opt.mode == "move":
+            record.pending = future
+
+    def _legge_dati(self, source_path, st) -> bool:
+        # [FEATURE 30] Solo i trasferimenti che leggono la sorgente vengono riordinati
+        if self.opt.mode == "move" and st.st_dev == self.disco_destinazione:
+            return False
+        return self.staging is None or str(source_path) not in self.staging
+
+    # --- Stadi della pipeline ---
+    # walk -> match -> filter -> dedup -> copy; ogni lotto è una cartella
+
+    def _build_pipeline(self):
+        # [FEATURE 11] Matcher fuzzy compilato una sola volta per questa ricerca
+        # [FEATURE 23] Insieme a estensioni, dimensione e data in un unico predicato
+        self.predicate = FilePredicate(self.estensioni_target, self.opt.query_nome, self.opt.min_size,
+                                       self.opt.max_size, self.opt.date_from, self.opt.date_to)
+        self.matcher = self.predicate.matcher
+        # [FEATURE 22] Con i processi match e filter sono già stati applicati negli shard
+        stadi = [] if self.sharder is not None else [
+            PipelineStage("match", self._stadio_match, self.workers_stadi["match"]),
+            PipelineStage("filter", self._stadio_filter, self.workers_stadi["filter"]),
+        ]
+        self.pipeline = ScanPipeline(stadi + [
+            # Un solo thread, in ordine di scansione: decide quale copia è l'originale
+            # e quale nome riceve il suffisso, come la versione seriale
+            PipelineStage("dedup", self._stadio_dedup, ordered=True),
+        ], cancel_event=self.annulla)
+
+        # [FEATURE 19] Export periodico (file Prometheus + evento "snapshot")
+        if self.metrics is not None:
+            self.metrics.emit("scan_started", roots=self.roots, destination=str(self.path_dest),
+                              filters=self.filtri)
+            self.exporter = MetricsExporter(self.metrics, self.opt.metrics_path, self.opt.metrics_interval,
+                                            counters_fn=self._conteggi)
+            self.exporter.start()
+
+    def _conteggi(self):
+        return {"success": self.files_trovati, "duplicate": self.files_duplicati,
+                "filtered": self.files_filtrati, "error": self.files_errori}
+
+    def _sorgenti(self):
+        # Le voci arrivano dal disco (DirEntry) o dal catalogo (CatalogEntry)
+        if self.opt.catalog_path:
+            yield from self.catalog.query(self.estensioni_target, exclude_dir=self.dest_absolute,
+                                          hash_algorithm=self.hasher.algorithm)
+            return
+        def walk_gruppo(device):
+            for unit in self.gruppi[device]:
+                yield from self.walkers[device].walk(unit.path)
+
+        yield from prefetch_sources([walk_gruppo(device) for device in self.gruppi])
+
+    def _sorgente(self):
+        sorgente = self.sharder.scan(self.shards, self.annulla) if self.sharder is not None else self._sorgenti()
+        if self.cartelle_fatte:
+            # [FEATURE 20] Le cartelle concluse vengono ancora visitate (per le sottocartelle)
+            # ma non rielaborate
+            sorgente = (lotto for lotto in sorgente if lotto[0] not in self.cartelle_fatte)
+        return sorgente
+
+    def _stadio_match(self, lotto):
+        current_root, files = lotto
+        # Estensione (frozenset) e poi nome (fuzzy) in blocco per tutta la cartella;
+        # una cartella senza candidati prosegue comunque: il job la segna come conclusa
+        return current_root, self.predicate.match(files, self.metrics)
+
+    def _stadio_filter(self, lotto):
+        # Solo metadati: i record di log viaggiano a valle per restare in ordine
+        current_root, candidati = lotto
+        return current_root, self.predicate.filter(current_root, candidati, self.metrics, self.governor)
+
+    def _trasferimenti_completati(self, current_root):
+        # [FEATURE 20] Trasferimenti annotati prima dell'interruzione: valgono solo
+        # quelli che hanno lasciato nella destinazione un file completo
+        completati = {}
+        for riga in self.trasferiti_per_cartella.pop(current_root, ()):
+            source, _, esito, content_path, file_size = riga
+            try:
+                if os.path.getsize(esito["destination"]) == file_size:
+                    completati[source] = riga
+                else:
+                    # Copia parziale: il nome era riservato a questo job, si libera
+                    os.remove(esito["destination"])
+                    self.nomi_destinazione.release(Path(esito["destination"]))
+            except OSError:
+                pass
+        return completati
+
+    def _riprendi_trasferimento(self, riga, job):
+        # [FEATURE 20] Il file è già nella destinazione: stesso controllo dedup della
+        # prima esecuzione (lo stato resta identico), nessuna nuova copia
+        source, _, esito, content_path, file_size = riga
+        if self.opt.deduplicate:
+            self.dedup.check(Path(content_path), file_size)
+        if self.opt.mode == "move" and content_path != source and os.path.exists(source):
+            # Spostamento interrotto dopo la copia: manca solo la cancellazione
+            try:
+                os.remove(source)
+            except OSError:
+                pass
+        with self.lock:
+            self.files_trovati += 1
+            self.total_size += file_size
+            self.registra(esito, job)
+
+    def _stadio_dedup(self, lotto):
+        current_root, esiti = lotto
+        job = self.tracker.open(current_root) if self.tracker is not None else None
+        # [FEATURE 30] Copie rimandate a fine cartella, per riordinarle sul disco
+        in_attesa = []
+        completati = self._trasferimenti_completati(current_root) if self.trasferiti_per_cartella else None
+        if completati:
+            # I file già spostati non sono più nel listing: tornano al loro posto nel lotto
+            presenti = {str(Path(esito[1].path)) for esito in esiti if esito[0] == "file"}
+            for riga in sorted((r for r in completati.values() if r[0] not in presenti),
+                               key=lambda r: r[1]):
+                esiti.insert(min(riga[1], len(esiti)), ("resumed", riga))
+        for posizione, esito in enumerate(esiti):
+            if esito[0] == "filtered":
+                self.files_filtrati += 1
+                self.registra(esito[1], job)
+                continue
+            if esito[0] == "error":
+                with self.lock:
+                    self.files_errori += 1
+                    self.registra(esito[1], job)
+                continue
+            if esito[0] == "resumed":
+                self._riprendi_trasferimento(esito[1], job)
+                continue
+            _, entry, file_stat = esito
+            self.candidato = str(Path(entry.path))
+            if completati and self.candidato in completati:
+                self._riprendi_trasferimento(completati[self.candidato], job)
+                continue
+            self._elabora_file(entry, file_stat, posizione, job, in_attesa)
+        if in_attesa:
+            self._accoda_in_ordine(in_attesa, job)
+        if job is not None:
+            self.tracker.close(job)
+
+    def _elabora_file(self, entry, file_stat, posizione, job, in_attesa: list):
+        # Deduplicazione, nome nella destinazione e trasferimento di un file del lotto
+        file = entry.name
+        ext = os.path.splitext(file)[1].lower()
+        source_path = Path(entry.path)
+        mode, dry_run = self.opt.mode, self.opt.dry_run
+
+        try:
+            file_size = file_stat.st_size
+            file_mtime = file_stat.st_mtime
+
+            # [FEATURE 2] Hash deduplication
+            # [FEATURE 7] A stadi: dimensione -> campione -> hash completo
+            if self.opt.deduplicate:
+                # Il catalogo può fornire l'hash già calcolato (CatalogEntry.digest)
+                is_duplicate, content = self.dedup.check(source_path, file_size, file_stat,
+                                                         getattr(entry, 'digest', None))
+                file_hash = content.digest
+                if is_duplicate:
+                    if self.staging is not None:
+                        self.staging.discard(str(source_path))  # [FEATURE 28]
+                    self.files_duplicati += 1
+                    self.registra({
+                        "file": str(source_path),
+                        "status": "duplicate",
+                        "hash": file_hash
+                    }, job)
+                    return
+
+            # Struttura destinazione
+            dest_subfolder = self._sottocartella(ext)
+
+            # Gestione Duplicati Nome (Rinomina se esiste)
+            # [FEATURE 16] Risolta sull'indice in memoria, che include i trasferimenti in corso
+            if dry_run:
+                dest_path = dest_subfolder / file
+            else:
+                dest_path = self.nomi_destinazione.reserve(dest_subfolder, file)
+
+            # [FEATURE 3] Progress
+            # [FEATURE 21] Riga per file solo in anteprima: altrimenti basta la riga di stato
+            if self.opt.show_progress and dry_run:
+                print(f"[{'DRY-RUN' if dry_run else mode.upper()}] {file} ({self.hunter.format_size(file_size)})")
+
+            # [FEATURE 5] Dry-run: non esegue operazioni
+            # [FEATURE 12] Il trasferimento va in coda sul pool: la scansione prosegue
+            record = content if self.opt.deduplicate else None
+            if dry_run:
+                self._trasferimento_riuscito(source_path, dest_path, file, file_size, file_mtime, record, job)
+            else:
+                if job is not None:
+                    # [FEATURE 20] Annotato prima di partire: sopravvive a un crash a metà
+                    self.tracker.transfer_started(job, str(source_path), posizione,
+                                                  self._esito_successo(source_path, dest_path, file_size,
+                                                                       file_mtime, record),
+                                                  str(dest_path) if mode == "move" else str(source_path),
+                                                  file_size)
+                richiesta = (source_path, dest_path, file, file_size, file_mtime, record, job,
+                             self.sequenza_log.reserve())
+                if self.ordine_io is not None and self._legge_dati(source_path, file_stat):
+                    in_attesa.append((str(source_path), file_stat, richiesta))
+                else:
+                    self._accoda(*richiesta)
+
+        except Exception as e:
+            if self.staging is not None:
+                self.staging.discard(str(source_path))
+            with self.lock:
+                self.files_errori += 1
+                self.registra({
+                    "file": str(source_path),
+                    "status": "error",
+                    "error": str(e)
+                }, job)
+
+    def _accoda_in_ordine(self, in_attesa: list, job):
+        # [FEATURE 30] Originali e nomi sono già decisi: cambia solo l'ordine di lettura
+        in_attesa = self.ordine_io.order(in_attesa)
+        for i, (_, _, richiesta) in enumerate(in_attesa):
+            try:
+                self._accoda(*richiesta)
+            except BaseException:
+                for _, _, rimasta in in_attesa[i + 1:]:
+                    self.sequenza_log.skip(rimasta[-1])
+                    if job is not None:
+                        self.tracker.transfer_done(job)
+                raise
+
+    # --- Avanzamento ---
+
+    def _start_progress(self):
+        if self.reporter is None:
+            return
+        if self.opt.progress_precount:
+            self.reporter.counting = True
+            threading.Thread(target=self._pre_conteggio, name="hunter-precount", daemon=True).start()
+        self.reporter.start()
+        self.reporter_avviato = True
+
+    def _lotti_da_contare(self):
+        if self.opt.catalog_path:
+            # Connessione propria: quella della scansione appartiene a un altro thread
+            catalogo = FileCatalog(self.opt.catalog_path)
+            try:
+                yield from catalogo.query(self.estensioni_target, exclude_dir=self.dest_absolute)
+            finally:
+                catalogo.close()
+            return
+        for device, gruppo in self.gruppi.items():
+            walker = ParallelWalker(workers=self.opt.device_workers or self.opt.walk_workers,
+                                    exclude_paths=[self.dest_absolute], exclude_ids=self.dest_ids,
+                                    prune_paths=set().union(*(u.prune for u in gruppo)))
+            for unit in gruppo:
+                yield from walker.walk(unit.path)
+
+    def _pre_conteggio(self):
+        # [FEATURE 21] Pre-conteggio in parallelo alla scansione: solo i filtri economici
+        # (estensione e nome), nessuna stat; percentuale ed ETA appena il totale è noto.
+        # Predicato separato: le statistiche fuzzy del report restano quelle della scansione
+        conteggio = FilePredicate(self.estensioni_target, self.opt.query_nome)
+        totale = 0
+        try:
+            for _, files in self._lotti_da_contare():
+                if self.fine_scansione.is_set():
+                    return
+                totale += len(conteggio.match(files))
+        except Exception:
+            totale = None  # Senza totale l'avanzamento resta indeterminato
+        self.reporter.set_total(totale)
+
+    # --- Report ---
+
+    def _report(self) -> Dict[str, Any]:
+        hunter, metrics, sharder = self.hunter, self.metrics, self.sharder
+        annullata = self.pipeline.cancelled
+        if annullata:
+            print("\n⏹️  Scansione interrotta su richiesta" +
+                  (f": riprendi con lo stesso job ({self.opt.job_path})" if self.opt.job_path else ""))
+
+        dest_folder_skipped = sum(w.excluded_hits for w in self.walkers.values())
+        dirs_scanned = sum(w.dirs_listed for w in self.walkers.values())
+        if sharder is not None:
+            dest_folder_skipped += sharder.excluded_hits
+            dirs_scanned += sharder.dirs_listed
+            self.matcher.stats.update((k, self.matcher.stats[k] + v) for k, v in sharder.fuzzy_stats.items())
+
+        files_trovati, total_size, transfers = self.files_trovati, self.total_size, self.transfers
+        # --- REPORT FINALE ---
+        report = {
+            "status": "cancelled" if annullata else "success",  # [FEATURE 20]
+            "mode": "DRY-RUN" if self.opt.dry_run else self.opt.mode.upper(),
+            "timestamp": datetime.now().isoformat(),
+            "summary": {
+                "files_trovati": files_trovati,
+                "files_duplicati": self.files_duplicati,
+                "files_filtrati": self.files_filtrati,
+                "files_errori": self.files_errori,
+                "dest_folder_skipped": dest_folder_skipped,  # ✅ Anti-Ouroboros stat
+                "dirs_scanned": dirs_scanned,
+                "total_size": total_size,
+                "total_size_formatted": hunter.format_size(total_size),
+                "dedup_stats": dict(self.dedup.stats) if self.opt.deduplicate else None,
+                "hash_cache": self.hash_cache_stats,
+                "fuzzy_stats": dict(self.matcher.stats) if self.opt.query_nome else None,
+                "transfer": transfers.stats(),  # [FEATURE 12] Metodi usati e throughput
+                # [FEATURE 14] Per stadio: lotti, tempo di lavoro, latenza, profondità coda
+                "pipeline": dict(self.pipeline.stats(), copy=transfers.stage_stats()),
+                "content_store": self.store.stats() if self.store is not None else None,  # [FEATURE 16]
+                "processes": sharder.stats() if sharder is not None else None,  # [FEATURE 22]
+                "fused_copy": self.staging.stats() if self.staging is not None else None,  # [FEATURE 28]
+                "io": self.governor.stats() if self.governor is not None else None,  # [FEATURE 29]
+                # [FEATURE 30] Ordine per posizione e confronto con l'ordine del listing
+                "io_order": dict(self.ordine_io.stats, mode=self.opt.io_order, rotational_devices=self.rotazionali)
+                if self.ordine_io is not None else None,
+                "metrics": None  # [FEATURE 19] Riempito sotto se collect_metrics
+            },
+            "filters": self.filtri,
+            "destination": str(self.path_dest),
+            "catalog": self.catalog_info,  # [FEATURE 9] Età del catalogo usato (None se scan da disco)
+            "catalog_refresh": self.catalog_refresh,  # [FEATURE 10] Cartelle saltate vs rilette
+            # [FEATURE 17] Unità visitate (per disco) e mount esclusi
+            "roots_plan": {
+                "units": [{"path": u.path, "device": u.device, "fstype": u.fstype,
+                           "rotational": u.device in self.rotazionali} for u in self.units],  # [FEATURE 30]
+                "excluded_mounts": hunter.excluded_mounts,
+            },
+            "log": hunter.scan_log.to_list() if self.opt.generate_report else [],
+            "log_stream": self.sink.path,  # [FEATURE 13] File JSONL con il log completo (se in streaming)
+            # [FEATURE 20] Journal del job: cartelle riprese e checkpoint scritti
+            "job": {
+                "path": self.opt.job_path,
+                "resumed": self.journal.resumed,
+                "dirs_resumed": len(self.cartelle_fatte),
+                "dirs_checkpointed": self.tracker.dirs_checkpointed,
+            } if self.journal is not None else None
+        }
+        if metrics is not None:
+            metrics.set_counters(self._conteggi())
+            report["summary"]["metrics"] = metrics.snapshot()
+        inizio_report = time.perf_counter()
+        self.sink.close(report["summary"])
+
+        # [FEATURE 5] Salva report JSON se richiesto
+        if self.opt.generate_report:
+            report_path = self.path_dest / f"scan_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            try:
+                with open(report_path, 'w', encoding='utf-8') as f:
+                    json.dump(report, f, indent=2, ensure_ascii=False)
+                print(f"\n📄 Report salvato in: {report_path}")
+            except Exception as e:
+                print(f"\n⚠️  Impossibile salvare report: {e}")
+        if metrics is not None:
+            # L'ultima esportazione include anche il tempo di scrittura del report
+            metrics.observe("report", time.perf_counter() - inizio_report)
+            metrics.finished = time.time()
+            self.exporter.stop()
+            metrics.emit("scan_finished", summary={k: v for k, v in report["summary"].items() if k != "metrics"})
+
+        # Messaggio finale
+        message = f"""
+{'='*60}
+{'⏹️  SCANSIONE INTERROTTA' if annullata else '🎯 SCANSIONE COMPLETATA'} {'(MODALITÀ ANTEPRIMA)' if self.opt.dry_run else ''}
+{'='*60}
+✅ File processati: {files_trovati}
+🔄 Duplicati saltati: {self.files_duplicati}
+📉 Letture evitate (dedup): {hunter.format_size(self.dedup.stats["bytes_avoided_size"] + self.dedup.stats["bytes_avoided_sample"])}
+🚫 Filtrati (size/date): {self.files_filtrati}
+🛡️  Cartella destinazione skippata: {dest_folder_skipped}x (Anti-Ouroboros)
+❌ Errori/Permessi negati: {self.files_errori}
+💾 Dimensione totale: {hunter.format_size(total_size)}
+🚚 Trasferimento: {hunter.format_size(transfers.stats()["bytes_per_second"])}/s {dict(transfers.by_method) or ''}
+{'='*60}
+"""
+
+        report["message"] = message
+        print(message)
+
+        return report
+
+
+# --- CONFIGURAZIONE WATCH (INOTIFY) ---
+# Costanti di <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+# Eventi osservati su ogni cartella. IN_CREATE serve per le sottocartelle: un file
+# viene elaborato alla chiusura in scrittura (IN_CLOSE_WRITE), non a metà copia.
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+WATCH_READ_SIZE = 256 * 1024     # Byte letti per volta dal descrittore inotify
+WATCH_POLL_INTERVAL = 30.0       # Secondi tra due controlli delle cartelle senza watch (limite esaurito)
+WATCH_TICK = 1.0                 # Attesa massima di un read (cancel/duration restano reattivi)
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """
+    [FEATURE 26] Interfaccia minima a inotify(7) via ctypes (solo Linux).
+
+    add() restituisce il watch descriptor oppure None: con ENOSPC (limite
+    fs.inotify.max_user_watches esaurito) imposta limit_reached e la cartella
+    va controllata in polling. read() restituisce una lista di
+    (wd, mask, cookie, nome) con nome "" per gli eventi sulla cartella stessa.
+    """
+
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify disponibile solo su Linux")
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify non supportato dalla libc")
+        self._ctypes = ctypes
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            # EMFILE: esaurito fs.inotify.max_user_instances
+            raise OSError(err, f"inotify_init1: {os.strerror(err)}")
+        self.limit_reached = False
+
+    def add(self, path: str, mask: int = WATCH_MASK) -> Optional[int]:
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd >= 0:
+            return wd
+        if self._ctypes.get_errno() == errno.ENOSPC:
+            self.limit_reached = True
+        # ENOENT/EACCES/ENOTDIR: cartella sparita, illeggibile o sostituita da un file
+        return None
+
+    def remove(self, wd: int):
+        if self._rm_watch(self.fd, wd) == 0:
+            # Un watch liberato: vale la pena riprovare con le cartelle in polling
+            self.limit_reached = False
+
+    def read(self, timeout: float) -> list:
+        try:
+            pronti, _, _ = select.select([self.fd], [], [], timeout)
+        except InterruptedError:
+            return []
+        if not pronti:
+            return []
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, WATCH_READ_SIZE)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset + _INOTIFY_EVENT.size <= len(data):
+                wd, mask, cookie, length = _INOTIFY_EVENT.unpack_from(data, offset)
+                offset += _INOTIFY_EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                events.append((wd, mask, cookie, name))
+            if len(data) < WATCH_READ_SIZE // 2:
+                break
+        return events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
 class FileHunter:
     def __init__(self):
         self.os_type = platform.system()
         # Tracking per evitare duplicati basati su hash
-        self.processed_hashes = set()
-        # Log dettagliato per report
-        self.scan_log = []
+        # [FEATURE 27] Digest grezzi in una tabella ordinata; si usa come un set di stringhe
+        self.processed_hashes = DigestSet()
+        # Log dettagliato per report ([FEATURE 27] record compatti, letti come dizionari)
+        self.scan_log = CompactLog()
+        # [FEATURE 8] Cache hash persistente (attiva solo durante scan_and_process)
+        self.hash_cache: Optional[HashCache] = None
+        # [FEATURE 11] Ultimo matcher fuzzy compilato (usato da fuzzy_match)
+        self._fuzzy_matcher: Optional[FuzzyMatcher] = None
+        # [FEATURE 15] Motore di hashing (algoritmo scelto per la scansione corrente)
+        self.hasher = FileHasher()
+        # [FEATURE 17] Mount esclusi dall'ultimo piano delle root
+        self.excluded_mounts: List[Dict[str, str]] = []
+        # [FEATURE 19] Metriche dell'ultima scansione (None se disattivate)
+        self.metrics: Optional[ScanMetrics] = None
+        # [FEATURE 20] Un evento per ogni operazione in corso (vedi cancel()): una ricerca che
+        # parte non cancella la richiesta di interruzione fatta per un'altra
+        self._cancel_events: set = set()
+        self._cancel_lock = threading.Lock()
+        # [FEATURE 21] Avanzamento della scansione in corso (None se nessuno lo osserva)
+        self.progress: Optional[ProgressReporter] = None
+        # [FEATURE 29] Regolazione dell'I/O della scansione in corso (None = a piena velocità)
+        self.io_governor: Optional[IOGovernor] = None
         
+    def cancel(self):
+        """
+        [FEATURE 20] Interrompe la scansione in corso (da un altro thread, es. la GUI).
+        Le cartelle in lavorazione vengono concluse, i trasferimenti avviati terminano
+        e scan_and_process restituisce un report con status "cancelled".
+        Vale per tutte le operazioni in corso (scansioni, iter_matches, scan_batch, watch).
+        """
+        with self._cancel_lock:
+            for event in self._cancel_events:
+                event.set()
+
+    def _cancel_token(self) -> threading.Event:
+        """[FEATURE 20] Evento di interruzione di un'operazione, impostato da cancel()."""
+        token = threading.Event()
+        with self._cancel_lock:
+            self._cancel_events.add(token)
+        return token
+
+    def _release_cancel_token(self, token: threading.Event):
+        with self._cancel_lock:
+            self._cancel_events.discard(token)
+
     def get_root_dirs(self):
         """Restituisce le root da scansionare in base al sistema operativo."""
         roots = []
@@ -49,34 +5554,93 @@ class FileHunter:
         if not query_utente:
             return True # Se l'utente non cerca un nome, va bene tutto
         
-        nome_reale_clean = nome_file_reale.lower()
-        query_clean = query_utente.lower()
-
-        # 1. Match Esatto o Parziale (Contiene la stringa)
-        if query_clean in nome_reale_clean:
-            return True
-        
-        # 2. Match Probabilistico (Fuzzing)
-        # Ratio > 0.6 significa "simile al 60%" (es. "fattura" trova "fttura")
-        ratio = difflib.SequenceMatcher(None, query_clean, nome_reale_clean).ratio()
-        return ratio > 0.65
+        # [FEATURE 11] Il matcher compilato viene riusato finché la query non cambia
+        # Ratio > 0.65 significa "simile al 65%" (es. "fattura" trova "fttura")
+        matcher = self._fuzzy_matcher
+        if matcher is None or matcher.query != query_utente:
+            matcher = self._fuzzy_matcher = FuzzyMatcher(query_utente)
+        return matcher.match(nome_file_reale)
 
-    def calculate_file_hash(self, filepath: Path, chunk_size: int = 8192) -> str:
+    def calculate_file_hash(self, filepath: Path, chunk_size: int = 8192, file_stat=None) -> str:
         """
-        [FEATURE 2] Calcola hash MD5 del file per identificare duplicati identici.
+        [FEATURE 2] Calcola hash del file per identificare duplicati identici.
         Legge il file a blocchi per gestire file grandi senza saturare la RAM.
+        [FEATURE 8] Se la cache hash è attiva viene consultata prima di leggere.
+        [FEATURE 15] Algoritmo e buffer dipendono da self.hasher (MD5 di default);
+        chunk_size è mantenuto solo per compatibilità.
         """
-        hash_md5 = hashlib.md5()
+        hasher = self.hasher
+        cache_key = None
+        if self.hash_cache is not None:
+            cache_key = self.hash_cache.key_for(filepath, file_stat)
+            cached = self.hash_cache.get(cache_key, hasher.algorithm)
+            if cached is not None:
+                return cached
         try:
-            with open(filepath, "rb") as f:
-                for chunk in iter(lambda: f.read(chunk_size), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
+            metrics = self.metrics
+            inizio = time.perf_counter() if metrics is not None else 0.0
+            size = file_stat.st_size if file_stat is not None else None
+            governor = self.io_governor
+            if governor is not None:
+                digest = governor.run("hash", getattr(file_stat, "st_dev", None), size or 0,
+                                      hasher.hash_file, filepath)
+            else:
+                digest = hasher.hash_file(filepath)
+            if metrics is not None:
+                self._observe_hash(metrics, filepath, time.perf_counter() - inizio,
+                                   file_stat.st_size if file_stat is not None else os.path.getsize(filepath))
+            if cache_key is not None:
+                self.hash_cache.put(cache_key, hasher.algorithm, digest, filepath)
+            return digest
         except Exception:
             # Se non riesco a leggere il file, restituisco un hash "unico" basato sul path
             # Così non viene considerato duplicato ma non blocca lo scan
             return f"error_{filepath}"
 
+    def _cached_hash(self, filepath, file_stat=None) -> Optional[str]:
+        """[FEATURE 28] Digest completo dalla cache hash, senza leggere il file (None se assente)."""
+        if self.hash_cache is None:
+            return None
+        return self.hash_cache.get(self.hash_cache.key_for(filepath, file_stat), self.hasher.algorithm)
+
+    def calculate_sample_hash(self, filepath: Path, file_size: int, sample_size: int = SAMPLE_SIZE,
+                              file_stat=None) -> str:
+        """
+        [FEATURE 7] Hash economico di testa e coda del file (sample_size byte ciascuna).
+        Serve solo a escludere i falsi duplicati con la stessa dimensione.
+        """
+        hasher = self.hasher
+        kind = hasher.sample_kind(sample_size)
+        cache_key = None
+        if self.hash_cache is not None:
+            cache_key = self.hash_cache.key_for(filepath, file_stat)
+            cached = self.hash_cache.get(cache_key, kind)
+            if cached is not None:
+                return cached
+        try:
+            metrics = self.metrics
+            inizio = time.perf_counter() if metrics is not None else 0.0
+            governor = self.io_governor
+            if governor is not None:
+                digest = governor.run("hash", getattr(file_stat, "st_dev", None), min(file_size, 2 * sample_size),
+                                      hasher.hash_sample, filepath, file_size, sample_size)
+            else:
+                digest = hasher.hash_sample(filepath, file_size, sample_size)
+            if metrics is not None:
+                self._observe_hash(metrics, filepath, time.perf_counter() - inizio,
+                                   min(file_size, 2 * sample_size))
+            if cache_key is not None:
+                self.hash_cache.put(cache_key, kind, digest, filepath)
+            return digest
+        except Exception:
+            return f"error_{filepath}"
+
+    @staticmethod
+    def _observe_hash(metrics: ScanMetrics, filepath, seconds: float, nbytes: int):
+        metrics.observe("hash", seconds, bytes_read=nbytes)
+        if metrics.callback:
+            metrics.emit("file_hashed", path=str(filepath), seconds=seconds, bytes=nbytes)
+
     def check_size_filter(self, file_size: int, min_size: Optional[int], max_size: Optional[int]) -> bool:
         """
         [FEATURE 4] Filtro per dimensione file (in bytes).
@@ -100,11 +5664,7 @@ class FileHunter:
 
     def format_size(self, size_bytes: int) -> str:
         """Helper per convertire bytes in formato leggibile (KB, MB, GB)."""
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if size_bytes < 1024.0:
-                return f"{size_bytes:.2f} {unit}"
-            size_bytes /= 1024.0
-        return f"{size_bytes:.2f} PB"
+        return _format_size(size_bytes)
 
     def update_progress(self, current: int, total: int, file_name: str):
         """
@@ -115,6 +5675,71 @@ class FileHunter:
             percentage = (current / total) * 100
             print(f"[{percentage:.1f}%] Analizzati {current}/{total} file... ({file_name})")
 
+    def plan_roots(self, roots: List[str], mount_aware: bool = True, skip_network_fs: bool = False,
+                   one_filesystem: bool = False) -> List[ScanUnit]:
+        """
+        [FEATURE 17] Divide le root in unità di scansione in base ai mount.
+        Con mount_aware=False (e nessuna altra opzione) ogni root resta una sola unità.
+        """
+        use_mounts = mount_aware or skip_network_fs or one_filesystem
+        planner = RootPlanner(skip_pseudo=mount_aware, skip_network=skip_network_fs,
+                              one_filesystem=one_filesystem, mounts=None if use_mounts else [])
+        units = planner.plan(roots)
+        self.excluded_mounts = planner.excluded
+        return units
+
+    def refresh_catalog(self,
+                        catalog_path: str = DEFAULT_CATALOG_PATH,
+                        root_dirs: Optional[List[str]] = None,
+                        with_hashes: bool = False,
+                        walk_workers: int = DEFAULT_WALK_WORKERS,
+                        hash_cache_path: Optional[str] = None,
+                        incremental: bool = False,
+                        hash_algorithm: str = DEFAULT_HASH_ALGORITHM,
+                        hash_workers: int = DEFAULT_HASH_WORKERS,
+                        mount_aware: bool = True,
+                        skip_network_fs: bool = False,
+                        one_filesystem: bool = False) -> Dict[str, Any]:
+        """
+        [FEATURE 9] Aggiornamento esplicito del catalogo: rivisita le root e
+        ricostruisce l'indice. with_hashes salva anche l'hash di ogni file.
+        [FEATURE 10] incremental rilegge solo le cartelle cambiate.
+        [FEATURE 15] hash_algorithm/hash_workers: algoritmo e thread per gli hash.
+        [FEATURE 17] mount_aware/skip_network_fs/one_filesystem: come in scan_and_process.
+        """
+        units = self.plan_roots(root_dirs or self.get_root_dirs(), mount_aware, skip_network_fs, one_filesystem)
+        roots = [unit.path for unit in units]
+        prune = set().union(*(unit.prune for unit in units))
+        catalog = FileCatalog(catalog_path)
+        self.hasher = FileHasher(hash_algorithm)
+        # Chiamato da scan_and_process la cache è già aperta (e la chiude lui)
+        own_cache = with_hashes and hash_cache_path and self.hash_cache is None
+        if own_cache:
+            self.hash_cache = HashCache(hash_cache_path)
+        hash_pool = ThreadPoolExecutor(max_workers=hash_workers, thread_name_prefix="hunter-hash") \
+            if with_hashes and hash_workers > 1 else None
+        try:
+            print(f"🗂️  Aggiornamento catalogo {catalog_path} su {roots}...")
+            hasher = (lambda path, st: self.calculate_file_hash(path, file_stat=st)) if with_hashes else None
+            stats = catalog.refresh(roots, ParallelWalker(workers=walk_workers, prune_paths=prune), hasher=hasher,
+                                    incremental=incremental, hash_algorithm=hash_algorithm,
+                                    hash_executor=hash_pool)
+            stats["catalog"] = catalog.info()
+            print(f"🗂️  Catalogo aggiornato: {stats['files_indexed']} file letti in "
+                  f"{stats['dirs_relisted']} cartelle ({stats['duration_seconds']:.1f}s)")
+            if incremental:
+                print(f"🗂️  Incrementale: {stats['dirs_skipped']} cartelle invariate saltate "
+                      f"({stats['files_carried_forward']} file mantenuti), "
+                      f"{stats['dirs_removed']} cartelle rimosse")
+            return stats
+        finally:
+            if hash_pool is not None:
+                hash_pool.shutdown(wait=True)
+            catalog.close()
+            if own_cache:
+                self.hash_cache.close()
+                self.hash_cache = None
+
     def scan_and_process(self, 
                         estensioni_target: List[str], 
                         cartella_destinazione: str, 
@@ -129,7 +5754,40 @@ class FileHunter:
                         dry_run: bool = False,              # [FEATURE 5] Modalità anteprima
                         generate_report: bool = False,      # [FEATURE 5] Genera report JSON
                         show_progress: bool = True,  
-                        progress_callback = None        # [FEATURE 3] Mostra progress
+                        progress_callback = None,       # [FEATURE 3] Mostra progress
+                        walk_workers: int = DEFAULT_WALK_WORKERS,  # [FEATURE 6] Thread per il listing
+                        hash_cache_path: Optional[str] = None,  # [FEATURE 8] Cache hash SQLite
+                        catalog_path: Optional[str] = None,     # [FEATURE 9] Cerca nel catalogo
+                        refresh_catalog: bool = False,          # [FEATURE 9] Aggiorna prima il catalogo
+                        incremental: bool = False,              # [FEATURE 10] Refresh solo cartelle cambiate
+                        transfer_workers: int = DEFAULT_TRANSFER_WORKERS,  # [FEATURE 12] Copie in parallelo
+                        report_stream: Optional[str] = None,    # [FEATURE 13] Log JSONL in streaming
+                        stage_workers: Optional[Dict[str, int]] = None,  # [FEATURE 14] Thread per stadio
+                        hash_algorithm: str = DEFAULT_HASH_ALGORITHM,   # [FEATURE 15] md5/sha1/sha256/blake2b
+                        hash_workers: int = DEFAULT_HASH_WORKERS,       # [FEATURE 15] Hash in parallelo
+                        content_store: bool = False,                    # [FEATURE 16] Store per contenuto
+                        mount_aware: bool = True,                       # [FEATURE 17] Salta FS virtuali
+                        skip_network_fs: bool = False,                  # [FEATURE 17] Salta FS di rete
+                        one_filesystem: bool = False,                   # [FEATURE 17] Resta sul FS della root
+                        device_workers: Optional[int] = None,           # [FEATURE 17] Thread per disco
+                        root_dirs: Optional[List[str]] = None,          # [FEATURE 18] Root da visitare
+                        collect_metrics: bool = False,                  # [FEATURE 19] Metriche per stadio
+                        metrics_callback=None,                          # [FEATURE 19] Eventi strutturati
+                        metrics_path: Optional[str] = None,             # [FEATURE 19] File Prometheus
+                        metrics_interval: float = METRICS_INTERVAL,     # [FEATURE 19] Secondi tra export
+                        job_path: Optional[str] = None,                 # [FEATURE 20] Journal per riprendere
+                        resume: bool = True,                            # [FEATURE 20] Riprende il job nel journal
+                        progress_interval: float = PROGRESS_INTERVAL,   # [FEATURE 21] Secondi tra due eventi
+                        progress_queue: Optional[queue.Queue] = None,   # [FEATURE 21] Snapshot per la GUI
+                        progress_precount: bool = False,                # [FEATURE 21] Pre-conteggio per % ed ETA
+                        process_workers: int = 0,                       # [FEATURE 22] Processi per filtri e hash
+                        fused_copy: bool = False,                       # [FEATURE 28] Hash e copia in una lettura
+                        verify_copies: bool = False,                    # [FEATURE 28] Verifica ogni copia
+                        adaptive_io: bool = False,                      # [FEATURE 29] Concorrenza AIMD per disco
+                        max_bytes_per_second: Optional[int] = None,     # [FEATURE 29] Limite di banda
+                        max_iops: Optional[int] = None,                 # [FEATURE 29] Limite di operazioni/s
+                        io_priority: Optional[str] = None,              # [FEATURE 29] "low" o "idle"
+                        io_order: str = DEFAULT_IO_ORDER                # [FEATURE 30] Ordine di hash e copie
                         ) -> Dict[str, Any]:
         """
         Motore principale MIGLIORATO.
@@ -145,244 +5803,813 @@ class FileHunter:
         - dry_run: Modalità anteprima (non copia/sposta)
         - generate_report: Salva report JSON dettagliato
         - show_progress: Mostra progress bar testuale
+        - walk_workers: Thread usati per leggere le cartelle in parallelo
+        - hash_cache_path: Database SQLite della cache hash (es. DEFAULT_HASH_CACHE_PATH)
+        - catalog_path: Usa il catalogo (es. DEFAULT_CATALOG_PATH) invece di visitare il disco
+        - refresh_catalog: Ricostruisce il catalogo prima della ricerca
+        - incremental: Il refresh del catalogo rilegge solo le cartelle modificate
+        - transfer_workers: Thread dedicati a copie/spostamenti
+        - report_stream: Scrive il log in streaming su questo file JSONL (.gz = compresso)
+          invece di tenerlo in memoria (scan_log resta vuoto)
+        - stage_workers: Thread per gli stadi "match" e "filter" della pipeline
+          (es. {"filter": 4}); walk e copy usano walk_workers e transfer_workers.
+          Il log resta in ordine di scansione con qualsiasi numero di thread
+        - hash_algorithm: Algoritmo dei digest (MD5 di default per compatibilità; BLAKE2b è il più veloce)
+        - hash_workers: Thread che calcolano insieme i digest dei file in collisione
+        - content_store: Salva ogni contenuto una volta sola in <dest>/.objects e crea
+          <dest>/<EXT>/<nome> come hardlink (o reflink/copia se non supportati)
+        - mount_aware: Legge /proc/self/mountinfo e non entra nei mount virtuali (tmpfs, overlay...)
+        - skip_network_fs: Non entra nei mount di rete (NFS, SMB, sshfs...)
+        - one_filesystem: Non lascia il filesystem di ciascuna root (come find -xdev)
+        - device_workers: Thread di listing per ogni disco fisico (default: walk_workers)
+        - root_dirs: Cartelle da cui partire invece delle root di sistema (get_root_dirs)
+        - collect_metrics: Tempi e chiamate per stadio, istogrammi di latenza, cartelle più lente
+          (in report["summary"]["metrics"] e in self.metrics)
+        - metrics_callback: Funzione che riceve gli eventi come dizionari ({"event": "dir_listed", ...})
+        - metrics_path: File in formato Prometheus riscritto ogni metrics_interval secondi
+        - job_path: Journal SQLite (es. DEFAULT_JOB_PATH) con le cartelle concluse e i file
+          trasferiti: una scansione interrotta (cancel(), chiusura, crash) riparte da lì
+          senza rileggere né ricopiare, e il report finale è quello di una corsa unica
+        - resume: False ignora il journal esistente e ricomincia da zero
+        - progress_callback: Riceve (messaggio, file elaborati) al massimo ogni progress_interval
+          secondi, da un thread dedicato e non più per ogni file
+        - progress_queue: Coda in cui arrivano gli snapshot di avanzamento (file/s, MB/s,
+          percentuale, ETA); la GUI la svuota dal main loop. Con show_progress il terminale
+          riceve una riga di stato al secondo (l'elenco per file resta solo in dry-run)
+        - progress_precount: Conta in parallelo i file candidati per dare percentuale ed ETA
+        - process_workers: Con 2 o più divide la scansione in shard (per cartella e per disco)
+          visitati da altrettanti processi, che applicano i filtri e calcolano gli hash;
+          deduplicazione e trasferimenti restano qui, con gli stessi esiti del processo
+          singolo. Ignorato con catalog_path
+        - fused_copy: In copia con deduplicazione, un file che va hashato per intero viene
+          copiato nello stesso passaggio in un temporaneo della destinazione, rinominato se il
+          contenuto è nuovo ed eliminato se è un duplicato (una lettura invece di due)
+        - verify_copies: Ogni copia viene riletta dal disco e confrontata con il digest della
+          sorgente prima di prendere il nome definitivo; se il digest non è già noto viene
+          calcolato durante la copia (due letture in tutto). Una copia diversa è un errore
+        - adaptive_io: Stat, hash e copie regolano da sole quanti thread fanno I/O su ogni
+          disco in base alla latenza misurata (AIMD); stage_workers["filter"], hash_workers e
+          transfer_workers diventano i massimi. La concorrenza scelta è in summary["io"]
+        - max_bytes_per_second / max_iops: Limiti rigidi per letture e copie (byte/s) e per
+          listing, stat, hash e copie (operazioni/s); l'attesa è in summary["io"]["throttle_seconds"]
+        - io_priority: "low" (nice 10, ioprio best-effort 7) o "idle" (nice 19, classe idle)
+          per i thread che fanno I/O (Linux). Con process_workers i processi figli non sono regolati
+        - io_order: Ordine in cui partono le copie di una cartella, scelti originali e nomi
+          nell'ordine del listing. "walk" (default) lo mantiene; "auto" ordina per primo extent
+          fisico (FIEMAP, o inode) solo sui dischi rotazionali (/sys/block/<disco>/queue/rotational);
+          "extent" e "inode" sempre. Ignorato in dry-run. Salti all'indietro e distanza tra
+          extent in summary["io_order"]
+        """
+        # [FEATURE 6] Le fasi della scansione sono in _ScanRun
+        return _ScanRun(self, _ScanOptions(
+            estensioni_target=estensioni_target,
+            cartella_destinazione=cartella_destinazione,
+            query_nome=query_nome,
+            mode=mode,
+            deduplicate=deduplicate,
+            min_size=min_size,
+            max_size=max_size,
+            date_from=date_from,
+            date_to=date_to,
+            dry_run=dry_run,
+            generate_report=generate_report,
+            show_progress=show_progress,
+            progress_callback=progress_callback,
+            walk_workers=walk_workers,
+            hash_cache_path=hash_cache_path,
+            catalog_path=catalog_path,
+            refresh_catalog=refresh_catalog,
+            incremental=incremental,
+            transfer_workers=transfer_workers,
+            report_stream=report_stream,
+            stage_workers=stage_workers,
+            hash_algorithm=hash_algorithm,
+            hash_workers=hash_workers,
+            content_store=content_store,
+            mount_aware=mount_aware,
+            skip_network_fs=skip_network_fs,
+            one_filesystem=one_filesystem,
+            device_workers=device_workers,
+            root_dirs=root_dirs,
+            collect_metrics=collect_metrics,
+            metrics_callback=metrics_callback,
+            metrics_path=metrics_path,
+            metrics_interval=metrics_interval,
+            job_path=job_path,
+            resume=resume,
+            progress_interval=progress_interval,
+            progress_queue=progress_queue,
+            progress_precount=progress_precount,
+            process_workers=process_workers,
+            fused_copy=fused_copy,
+            verify_copies=verify_copies,
+            adaptive_io=adaptive_io,
+            max_bytes_per_second=max_bytes_per_second,
+            max_iops=max_iops,
+            io_priority=io_priority,
+            io_order=io_order
+        )).run()
+
+    def iter_matches(self,
+                     estensioni_target: List[str],
+                     query_nome: Optional[str] = None,
+                     min_size: Optional[int] = None,
+                     max_size: Optional[int] = None,
+                     date_from: Optional[datetime] = None,
+                     date_to: Optional[datetime] = None,
+                     deduplicate: bool = False,
+                     compute_hash: bool = False,
+                     hash_algorithm: str = DEFAULT_HASH_ALGORITHM,
+                     root_dirs: Optional[List[str]] = None,
+                     exclude_dirs: Optional[List[str]] = None,
+                     walk_workers: int = DEFAULT_WALK_WORKERS,
+                     device_workers: Optional[int] = None,
+                     mount_aware: bool = True,
+                     skip_network_fs: bool = False,
+                     one_filesystem: bool = False,
+                     catalog_path: Optional[str] = None,
+                     per_directory: bool = False):
+        """
+        [FEATURE 24] Ricerca lazy: generatore di FileMatch restituiti man mano che
+        vengono trovati, senza trasferimenti né report. Filtri, root e mount come in
+        scan_and_process.
+
+        - deduplicate: salta i file con contenuto già restituito (stessa logica a stadi)
+        - compute_hash: calcola sempre l'hash completo (FileMatch.digest)
+        - exclude_dirs: cartelle da non visitare (es. la destinazione di transfer_matches)
+        - per_directory: restituisce una lista di FileMatch per cartella invece dei singoli
+
+        Interrompere l'iterazione (break, close()) ferma subito i listing in corso;
+        anche cancel() la interrompe alla cartella successiva.
+        """
+        annulla = self._cancel_token()
+        predicate = FilePredicate(estensioni_target, query_nome, min_size, max_size, date_from, date_to)
+        hasher = FileHasher(hash_algorithm)
+
+        def hash_completo(path, st=None):
+            try:
+                return hasher.hash_file(path)
+            except Exception:
+                return f"error_{path}"
+
+        def hash_campione(path, size, sample_size, st=None):
+            try:
+                return hasher.hash_sample(path, size, sample_size)
+            except Exception:
+                return f"error_{path}"
+
+        dedup = DuplicateFinder(hash_completo, hash_campione) if deduplicate else None
+        catalog = None
+        # Il catalogo contiene anche le cartelle escluse: vengono scartate qui
+        esclusi_catalogo = []
+        if catalog_path:
+            catalog = FileCatalog(catalog_path)
+            sorgente = catalog.query(sorted(predicate.extensions), hash_algorithm=hasher.algorithm)
+            esclusi_catalogo = [os.path.normcase(os.path.realpath(p)) for p in exclude_dirs or ()]
+        else:
+            units = self.plan_roots(root_dirs or self.get_root_dirs(), mount_aware, skip_network_fs,
+                                    one_filesystem)
+            exclude_ids = []
+            for path in exclude_dirs or ():
+                try:
+                    st = os.stat(path)
+                    exclude_ids.append((st.st_dev, st.st_ino))
+                except OSError:
+                    pass
+
+            def walk_gruppo(gruppo):
+                walker = ParallelWalker(workers=device_workers or walk_workers, exclude_paths=exclude_dirs or (),
+                                        exclude_ids=exclude_ids,
+                                        prune_paths=set().union(*(u.prune for u in gruppo)))
+                for unit in gruppo:
+                    yield from walker.walk(unit.path)
+
+            sorgente = prefetch_sources([walk_gruppo(gruppo)
+                                         for gruppo in RootPlanner.group_by_device(units).values()])
+        try:
+            for current_root, files in sorgente:
+                if annulla.is_set():
+                    return
+                if esclusi_catalogo and any(_is_under(os.path.normcase(current_root), escluso)
+                                            for escluso in esclusi_catalogo):
+                    continue
+                trovati = []
+                for esito in predicate.filter(current_root, predicate.match(files)):
+                    if esito[0] != "file":
+                        continue
+                    _, entry, file_stat = esito
+                    path = str(Path(entry.path))
+                    # Il catalogo può fornire l'hash già calcolato (CatalogEntry.digest)
+                    digest = getattr(entry, 'digest', None)
+                    if dedup is not None:
+                        is_duplicate, record = dedup.check(path, file_stat.st_size, file_stat, digest)
+                        if is_duplicate:
+                            continue
+                        digest = dedup.full_digest(record) if compute_hash else record.digest
+                    elif compute_hash and digest is None:
+                        digest = hash_completo(path, file_stat)
+                    trovati.append(FileMatch(path, entry.name, file_stat.st_size, file_stat.st_mtime,
+                                             digest, file_stat))
+                if not trovati:
+                    continue
+                if per_directory:
+                    yield trovati
+                else:
+                    yield from trovati
+        finally:
+            self._release_cancel_token(annulla)
+            sorgente.close()
+            if catalog is not None:
+                catalog.close()
+
+    async def aiter_matches(self, *args, **kwargs):
+        """
+        [FEATURE 24] Come iter_matches (stessi parametri) ma come iteratore asincrono:
+        la ricerca gira in un thread e il ciclo asyncio non si blocca.
+        Uscire dal ciclo "async for" ferma la ricerca.
+        """
+        kwargs["per_directory"] = True
+        generatore = self.iter_matches(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        fine = object()
+        try:
+            while True:
+                trovati = await loop.run_in_executor(None, next, generatore, fine)
+                if trovati is fine:
+                    return
+                for match in trovati:
+                    yield match
+        finally:
+            # close() attende il listing in corso: anche questo fuori dal ciclo
+            await loop.run_in_executor(None, generatore.close)
+
+    def transfer_matches(self,
+                         matches,
+                         cartella_destinazione: str,
+                         mode: str = "copy",
+                         transfer_workers: int = DEFAULT_TRANSFER_WORKERS,
+                         content_store: bool = False,
+                         hash_algorithm: str = DEFAULT_HASH_ALGORITHM) -> Dict[str, Any]:
+        """
+        [FEATURE 24] Consumatore a valle di iter_matches: copia o sposta ogni FileMatch
+        in <destinazione>/<EXT>/<nome> come scan_and_process (stessi suffissi _1, _2
+        per i nomi in collisione, stesso store per contenuto).
+        Per fermarsi prima basta passare un iteratore limitato (es. itertools.islice).
+        Se la destinazione è sotto le root va passata a iter_matches in exclude_dirs.
+        Restituisce contatori, statistiche di trasferimento e log.
         """
-        # Reset tracking per nuova scansione
-        self.processed_hashes.clear()
-        self.scan_log.clear()
-        
-        roots = self.get_root_dirs()
-        estensioni_target = [e.lower().strip() for e in estensioni_target]
-        
-        files_trovati = 0
-        files_duplicati = 0
-        files_filtrati = 0
-        files_errori = 0
-        dest_folder_skipped = 0  # ✅ Conta quante volte skippiamo la destinazione
-        total_size = 0
-        
         path_dest = Path(cartella_destinazione)
-        if not dry_run:
-            path_dest.mkdir(parents=True, exist_ok=True)
-        
-        # ✅ FIX ANTI-OUROBOROS: Risolve path assoluto della destinazione
-        # Questo previene il loop dove il programma scansiona i file appena copiati
-        # Dimezza il tempo di scan evitando di leggere/hashare file già processati
-        dest_absolute = path_dest.resolve()
-        print(f"🚫 Anti-Ouroboros: Salterò la cartella {dest_absolute}")
+        path_dest.mkdir(parents=True, exist_ok=True)
+        transfers = TransferEngine(workers=transfer_workers)
+        nomi_destinazione = DestinationIndex()
+        hasher = FileHasher(hash_algorithm)
+        store = ContentStore(path_dest, transfers, lambda path, st: hasher.hash_file(path)) \
+            if content_store else None
+        lock = threading.Lock()
+        log = []
+        conteggi = {"files_trovati": 0, "files_errori": 0, "total_size": 0}
+
+        def trasferisci(match: FileMatch, dest_path: Path):
+            try:
+                if store is not None:
+                    store.ingest(Path(match.path), dest_path, mode, match.size, match.digest, match.stat)
+                else:
+                    transfers.transfer(match.path, str(dest_path), mode, match.size)
+            except Exception as e:
+                nomi_destinazione.release(dest_path)
+                with lock:
+                    conteggi["files_errori"] += 1
+                    log.append({"file": match.path, "status": "error", "error": str(e)})
+                return
+            with lock:
+                conteggi["files_trovati"] += 1
+                conteggi["total_size"] += match.size
+                log.append({
+                    "file": match.path,
+                    "destination": str(dest_path),
+                    "status": "success",
+                    "size": match.size,
+                    "size_formatted": self.format_size(match.size),
+                    "modified": datetime.fromtimestamp(match.mtime).isoformat(),
+                    "hash": match.digest,
+                    "mode": mode
+                })
+
+        try:
+            for match in matches:
+                ext = os.path.splitext(match.name)[1].lower()
+                dest_path = nomi_destinazione.reserve(path_dest / ext.replace('.', '').upper(), match.name)
+                transfers.submit(trasferisci, match, dest_path)
+        finally:
+            transfers.shutdown(wait=True)
+        return dict(conteggi,
+                    total_size_formatted=self.format_size(conteggi["total_size"]),
+                    transfer=transfers.stats(),
+                    content_store=store.stats() if store is not None else None,
+                    log=log)
+
+    def scan_batch(self,
+                   jobs: List[Dict[str, Any]],
+                   root_dirs: Optional[List[str]] = None,
+                   walk_workers: int = DEFAULT_WALK_WORKERS,
+                   device_workers: Optional[int] = None,
+                   transfer_workers: int = DEFAULT_TRANSFER_WORKERS,
+                   hash_algorithm: str = DEFAULT_HASH_ALGORITHM,
+                   mount_aware: bool = True,
+                   skip_network_fs: bool = False,
+                   one_filesystem: bool = False,
+                   show_progress: bool = True,
+                   adaptive_io: bool = False,
+                   max_bytes_per_second: Optional[int] = None,
+                   max_iops: Optional[int] = None,
+                   io_priority: Optional[str] = None) -> Dict[str, Any]:
+        """
+        [FEATURE 25] Esegue molte ricerche con una sola visita del filesystem.
+
+        Ogni job è un dizionario con i parametri di scan_and_process (name,
+        estensioni_target, cartella_destinazione, query_nome, mode, deduplicate,
+        min_size, max_size, date_from, date_to, dry_run, generate_report, content_store).
+        Ogni cartella viene letta una volta e i suoi file vanno a tutti i job i cui
+        filtri corrispondono (la stat del DirEntry è condivisa); ciascun job ha la sua
+        deduplicazione, la sua destinazione e il suo report, con gli stessi esiti di
+        una scan_and_process separata. Le destinazioni di tutti i job sono escluse.
+
+        Se un file corrisponde a più job, quelli di copia lo leggono prima che un job
+        di spostamento lo sposti; lo sposta solo il primo job "move" che lo trova.
+        [FEATURE 29] adaptive_io, max_bytes_per_second, max_iops e io_priority come in
+        scan_and_process, condivisi da tutti i job.
+        Restituisce {"jobs": [report per job], "summary": {...}}.
+        """
+        annulla = self._cancel_token()
+        inizio = time.perf_counter()
+        governor = self._io_governor(adaptive_io, max_bytes_per_second, max_iops, io_priority, transfer_workers)
+        runner = _BatchRunner(self, jobs, hash_algorithm, transfer_workers, show_progress, governor=governor)
+        roots = root_dirs or self.get_root_dirs()
+        units = self.plan_roots(roots, mount_aware, skip_network_fs, one_filesystem)
 
-        # Header scan
         print(f"\n{'='*60}")
-        print(f"--- AVVIO SCANSIONE {'(DRY-RUN)' if dry_run else ''} ---")
+        print(f"--- AVVIO BATCH: {len(runner.jobs)} ricerche, una sola scansione ---")
         print(f"{'='*60}")
         print(f"📁 Root: {roots}")
-        print(f"🔍 Estensioni: {estensioni_target}")
-        if query_nome:
-            print(f"🏷️  Filtro nome (Fuzzy): '{query_nome}'")
-        if min_size or max_size:
-            min_str = self.format_size(min_size) if min_size else "N/A"
-            max_str = self.format_size(max_size) if max_size else "N/A"
-            print(f"📏 Dimensione: {min_str} - {max_str}")
-        if date_from or date_to:
-            from_str = date_from.strftime("%Y-%m-%d") if date_from else "N/A"
-            to_str = date_to.strftime("%Y-%m-%d") if date_to else "N/A"
-            print(f"📅 Date: {from_str} - {to_str}")
-        print(f"🔒 Deduplicazione: {'ON' if deduplicate else 'OFF'}")
+        for job in runner.jobs:
+            print(f"🔎 {job.name}: {job.filters['extensions']} -> {job.path_dest} "
+                  f"({'DRY-RUN' if job.dry_run else job.mode.upper()})")
         print(f"{'='*60}\n")
-        
-        # Prima passata: conta file totali per progress (opzionale, può rallentare)
-        # Per ora usiamo progress incrementale senza totale
-        
-        for root_dir in roots:
-            # ✅ FIX BUG: followlinks=False previene loop infiniti e duplicati da symlink
-            for current_root, dirs, files in os.walk(root_dir, topdown=True, followlinks=False):
-                
-                # --- FILTRO SICUREZZA ---
-                # 1. Filtra cartelle di sistema pericolose
-                # 2. Filtra cartelle nascoste (iniziano con .)
-                # 3. ✅ ANTI-OUROBOROS: Filtra la cartella di destinazione!
-                current_path = Path(current_root).resolve()
-                
-                # Rimuove dirs da scansionare se:
-                # - Nome in SKIP_DIRS (sistema)
-                # - Nome inizia con . (nascosta)
-                # - Path completo coincide con destinazione (OUROBOROS!)
-                original_dirs_count = len(dirs)
-                dirs[:] = [
-                    d for d in dirs 
-                    if d not in SKIP_DIRS 
-                    and not d.startswith('.')
-                    and (current_path / d).resolve() != dest_absolute
-                ]
-                
-                # Conta se abbiamo skippato la cartella destinazione
-                if len(dirs) < original_dirs_count:
-                    for d in set(os.listdir(current_root) if os.path.isdir(current_root) else []) - set(dirs):
-                        if (current_path / d).resolve() == dest_absolute:
-                            dest_folder_skipped += 1
-                            if show_progress:
-                                print(f"🚫 [ANTI-OUROBOROS] Saltata cartella destinazione: {dest_absolute}")
-                            break
-                
-                for file in files:
-                    # Gestione estensioni
-                    ext = os.path.splitext(file)[1].lower()
-                    
-                    if ext in estensioni_target:
-                        # Controllo nome (fuzzy)
-                        if self.fuzzy_match(file, query_nome):
-                            source_path = Path(current_root) / file
-                            
-                            try:
-                                # Ottieni metadati file
-                                file_stat = source_path.stat()
-                                file_size = file_stat.st_size
-                                file_mtime = file_stat.st_mtime
-                                
-                                # [FEATURE 4] Filtri dimensione e data
-                                if not self.check_size_filter(file_size, min_size, max_size):
-                                    files_filtrati += 1
-                                    self.scan_log.append({
-                                        "file": str(source_path),
-                                        "status": "filtered_size",
-                                        "size": file_size
-                                    })
-                                    continue
-                                
-                                if not self.check_date_filter(file_mtime, date_from, date_to):
-                                    files_filtrati += 1
-                                    self.scan_log.append({
-                                        "file": str(source_path),
-                                        "status": "filtered_date",
-                                        "mtime": datetime.fromtimestamp(file_mtime).isoformat()
-                                    })
-                                    continue
-                                
-                                # [FEATURE 2] Hash deduplication
-                                if deduplicate:
-                                    file_hash = self.calculate_file_hash(source_path)
-                                    if file_hash in self.processed_hashes:
-                                        files_duplicati += 1
-                                        self.scan_log.append({
-                                            "file": str(source_path),
-                                            "status": "duplicate",
-                                            "hash": file_hash
-                                        })
-                                        continue
-                                    self.processed_hashes.add(file_hash)
-                                
-                                # Struttura destinazione
-                                dest_subfolder = path_dest / ext.replace('.', '').upper()
-                                if not dry_run:
-                                    dest_subfolder.mkdir(exist_ok=True)
-                                
-                                dest_path = dest_subfolder / file
-                                
-                                # Gestione Duplicati Nome (Rinomina se esiste)
-                                counter = 1
-                                while dest_path.exists() and not dry_run:
-                                    dest_path = dest_subfolder / f"{source_path.stem}_{counter}{source_path.suffix}"
-                                    counter += 1
-                                
-                                # [FEATURE 3] Progress
-                                if show_progress:
-                                    print(f"[{'DRY-RUN' if dry_run else mode.upper()}] {file} ({self.format_size(file_size)})")
-                                
-                                # [FEATURE 5] Dry-run: non esegue operazioni
-                                if not dry_run:
-                                    if mode == "move":
-                                        shutil.move(str(source_path), str(dest_path))
-                                    else:
-                                        shutil.copy2(str(source_path), str(dest_path))
-                                
-                                files_trovati += 1
-                                total_size += file_size
-
-                                if progress_callback:
-                                    try:
-                                        # Invia alla GUI il messaggio e il conteggio attuale
-                                        progress_callback(f"Elaborato: {file}", files_trovati)
-                                    except Exception:
-                                        pass # Se la GUI viene chiusa, non crashare
-                                
-                                # Log dettagliato
-                                self.scan_log.append({
-                                    "file": str(source_path),
-                                    "destination": str(dest_path) if not dry_run else "N/A (dry-run)",
-                                    "status": "success",
-                                    "size": file_size,
-                                    "size_formatted": self.format_size(file_size),
-                                    "modified": datetime.fromtimestamp(file_mtime).isoformat(),
-                                    "hash": file_hash if deduplicate else None,
-                                    "mode": mode
-                                })
-                                
-                            except Exception as e:
-                                files_errori += 1
-                                self.scan_log.append({
-                                    "file": str(source_path),
-                                    "status": "error",
-                                    "error": str(e)
-                                })
 
-        # --- REPORT FINALE ---
-        report = {
-            "status": "success",
-            "mode": "DRY-RUN" if dry_run else mode.upper(),
-            "timestamp": datetime.now().isoformat(),
+        walkers, gruppi = self._batch_walkers(runner, units, walk_workers, device_workers, show_progress)
+
+        def walk_gruppo(walker, gruppo):
+            for unit in gruppo:
+                yield from walker.walk(unit.path)
+
+        sorgente = prefetch_sources([walk_gruppo(walker, gruppo) for walker, gruppo in zip(walkers, gruppi)])
+        annullata = False
+        try:
+            for current_root, files in sorgente:
+                if annulla.is_set():
+                    annullata = True
+                    break
+                runner.process_dir(current_root, runner.candidates(files))
+        finally:
+            self._release_cancel_token(annulla)
+            sorgente.close()
+            runner.shutdown()
+
+        status = "cancelled" if annullata else "success"
+        return {
+            "jobs": [runner.report(job, status) for job in runner.jobs],
             "summary": {
-                "files_trovati": files_trovati,
-                "files_duplicati": files_duplicati,
-                "files_filtrati": files_filtrati,
-                "files_errori": files_errori,
-                "dest_folder_skipped": dest_folder_skipped,  # ✅ Anti-Ouroboros stat
-                "total_size": total_size,
-                "total_size_formatted": self.format_size(total_size)
+                "status": status,
+                "jobs": len(runner.jobs),
+                "dirs_scanned": sum(w.dirs_listed for w in walkers),
+                "dest_folder_skipped": sum(w.excluded_hits for w in walkers),
+                "seconds": round(time.perf_counter() - inizio, 3),
+                "transfer": runner.transfers.stats(),
+                "io": governor.stats() if governor is not None else None,  # [FEATURE 29]
+                "roots_plan": {
+                    "units": [{"path": u.path, "device": u.device, "fstype": u.fstype} for u in units],
+                    "excluded_mounts": self.excluded_mounts,
+                },
             },
-            "filters": {
-                "extensions": estensioni_target,
-                "name_query": query_nome,
-                "min_size": min_size,
-                "max_size": max_size,
-                "date_from": date_from.isoformat() if date_from else None,
-                "date_to": date_to.isoformat() if date_to else None,
-                "deduplicate": deduplicate
-            },
-            "destination": str(path_dest),
-            "log": self.scan_log if generate_report else []
         }
-        
-        # [FEATURE 5] Salva report JSON se richiesto
-        if generate_report:
-            report_path = path_dest / f"scan_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+
+    @staticmethod
+    def _io_governor(adaptive_io: bool, max_bytes_per_second: Optional[int], max_iops: Optional[int],
+                     io_priority: Optional[str], transfer_workers: int) -> Optional[IOGovernor]:
+        """[FEATURE 29] Governor di scan_batch e watch (stat sul thread della visita, hash anche nelle copie verso lo store)."""
+        if not (adaptive_io or max_bytes_per_second or max_iops or io_priority):
+            return None
+        return IOGovernor(adaptive_io, {"stat": 1, "hash": transfer_workers, "copy": transfer_workers},
+                          max_bytes_per_second, max_iops, io_priority)
+
+    def _batch_walkers(self, runner: "_BatchRunner", units: List[ScanUnit], walk_workers: int,
+                       device_workers: Optional[int], show_progress: bool):
+        """Un walker per disco (come scan_and_process) che esclude le destinazioni di tutti i job."""
+        dest_paths, dest_ids = [], []
+        for job in runner.jobs:
+            if not job.dry_run:
+                job.path_dest.mkdir(parents=True, exist_ok=True)
+            dest_paths.append(job.path_dest.resolve())
             try:
-                with open(report_path, 'w', encoding='utf-8') as f:
-                    json.dump(report, f, indent=2, ensure_ascii=False)
-                print(f"\n📄 Report salvato in: {report_path}")
-            except Exception as e:
-                print(f"\n⚠️  Impossibile salvare report: {e}")
-        
-        # Messaggio finale
-        message = f"""
-{'='*60}
-🎯 SCANSIONE COMPLETATA {'(MODALITÀ ANTEPRIMA)' if dry_run else ''}
-{'='*60}
-✅ File processati: {files_trovati}
-🔄 Duplicati saltati: {files_duplicati}
-🚫 Filtrati (size/date): {files_filtrati}
-🛡️  Cartella destinazione skippata: {dest_folder_skipped}x (Anti-Ouroboros)
-❌ Errori/Permessi negati: {files_errori}
-💾 Dimensione totale: {self.format_size(total_size)}
-{'='*60}
-"""
-        
-        report["message"] = message
-        print(message)
-        
+                st = os.stat(job.path_dest)
+                dest_ids.append((st.st_dev, st.st_ino))
+            except OSError:
+                pass
+
+        def segnala_destinazione(path):
+            if show_progress:
+                print(f"🚫 [ANTI-OUROBOROS] Saltata cartella destinazione: {path}")
+
+        gruppi = list(RootPlanner.group_by_device(units).values())
+        walkers = [ParallelWalker(workers=device_workers or walk_workers, exclude_paths=dest_paths,
+                                  exclude_ids=dest_ids, prune_paths=set().union(*(u.prune for u in gruppo)),
+                                  on_excluded=segnala_destinazione,
+                                  on_listed=runner.governor.dir_listed if runner.governor is not None else None)
+                   for gruppo in gruppi]
+        return walkers, gruppi
+
+    def watch(self,
+              estensioni_target: List[str],
+              cartella_destinazione: str,
+              query_nome: Optional[str] = None,
+              mode: str = "copy",
+              deduplicate: bool = True,
+              min_size: Optional[int] = None,
+              max_size: Optional[int] = None,
+              date_from: Optional[datetime] = None,
+              date_to: Optional[datetime] = None,
+              dry_run: bool = False,
+              generate_report: bool = False,
+              content_store: bool = False,
+              report_stream: Optional[str] = None,
+              root_dirs: Optional[List[str]] = None,
+              walk_workers: int = DEFAULT_WALK_WORKERS,
+              device_workers: Optional[int] = None,
+              transfer_workers: int = DEFAULT_TRANSFER_WORKERS,
+              hash_algorithm: str = DEFAULT_HASH_ALGORITHM,
+              mount_aware: bool = True,
+              skip_network_fs: bool = False,
+              one_filesystem: bool = False,
+              duration: Optional[float] = None,
+              poll_interval: float = WATCH_POLL_INTERVAL,
+              show_progress: bool = True,
+              adaptive_io: bool = False,
+              max_bytes_per_second: Optional[int] = None,
+              max_iops: Optional[int] = None,
+              io_priority: Optional[str] = None) -> Dict[str, Any]:
+        """
+        [FEATURE 26] Caccia continua (solo Linux): una scansione iniziale, poi inotify.
+
+        I file nuovi o riscritti (IN_CLOSE_WRITE, IN_MOVED_TO) passano per gli stessi
+        filtri, la stessa deduplicazione e lo stesso trasferimento di scan_and_process,
+        senza rileggere il disco. Le cartelle nuove o spostate dentro le root vengono
+        osservate e lette; uno spostamento di cartella aggiorna solo i percorsi noti.
+
+        - Overflow della coda eventi (IN_Q_OVERFLOW): rescan mirato delle root, che
+          rielabora solo i file con dimensione o mtime cambiati.
+        - Limite fs.inotify.max_user_watches esaurito: le cartelle senza watch vengono
+          rilette ogni poll_interval secondi.
+
+        Termina dopo duration secondi (None = finché non viene chiamato cancel()).
+        Con report_stream il log va su JSONL; generate_report lo tiene in memoria e
+        salva il report JSON alla fine (sconsigliato per sessioni lunghe).
+        [FEATURE 29] adaptive_io, max_bytes_per_second, max_iops e io_priority come in
+        scan_and_process: per una caccia continua accanto ad altri servizi.
+        """
+        annulla = self._cancel_token()
+        inizio = time.monotonic()
+        governor = self._io_governor(adaptive_io, max_bytes_per_second, max_iops, io_priority, transfer_workers)
+        watcher = InotifyWatcher()
+        spec = {
+            "name": "watch", "estensioni_target": estensioni_target,
+            "cartella_destinazione": cartella_destinazione, "query_nome": query_nome, "mode": mode,
+            "deduplicate": deduplicate, "min_size": min_size, "max_size": max_size,
+            "date_from": date_from, "date_to": date_to, "dry_run": dry_run,
+            "generate_report": generate_report and not report_stream, "content_store": content_store,
+        }
+        sink = None
+        if report_stream:
+            sink = JsonlReportSink(str(report_stream), header={
+                "timestamp": datetime.now().isoformat(),
+                "mode": "DRY-RUN" if dry_run else mode.upper(),
+                "destination": str(cartella_destinazione),
+                "watch": True,
+            })
+            print(f"📝 Log in streaming su: {report_stream}")
+        try:
+            runner = _BatchRunner(self, [spec], hash_algorithm, transfer_workers, show_progress,
+                                  sinks=[sink] if sink is not None else None, governor=governor)
+        except Exception:
+            watcher.close()
+            if sink is not None:
+                sink.close()
+            raise
+        roots = root_dirs or self.get_root_dirs()
+        units = self.plan_roots(roots, mount_aware, skip_network_fs, one_filesystem)
+        walkers, gruppi = self._batch_walkers(runner, units, walk_workers, device_workers, show_progress)
+        # Le regole di esclusione (SKIP_DIRS, nascoste, destinazione, mount) sono quelle del walker del disco
+        regole = {unit.path: walker for walker, gruppo in zip(walkers, gruppi) for unit in gruppo}
+
+        wd_path: Dict[int, str] = {}
+        path_wd: Dict[str, int] = {}
+        senza_watch: Dict[str, Any] = {}  # Cartella -> walker: controllate in polling
+        # Firma (size, mtime_ns) dei candidati già elaborati: un rescan rielabora solo i cambiati
+        visti: Dict[str, tuple] = {}
+        stats = {"dirs_watched": 0, "unwatched_dirs": 0, "events": 0, "files_events": 0,
+                 "overflows": 0, "rescans": 0, "dir_moves": 0, "polls": 0}
+        limite_segnalato = False
+        # osserva() gira anche sui thread dei walker (before_list)
+        lock_watch = threading.RLock()
+
+        print(f"\n{'='*60}")
+        print(f"--- AVVIO WATCH: {runner.jobs[0].filters['extensions']} -> {cartella_destinazione} "
+              f"({'DRY-RUN' if dry_run else mode.upper()}) ---")
+        print(f"📁 Root: {roots}")
+        print(f"{'='*60}\n")
+
+        def walker_di(path: str):
+            migliore = None
+            for root, walker in regole.items():
+                if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+                    if migliore is None or len(root) > len(migliore[0]):
+                        migliore = (root, walker)
+            return migliore[1] if migliore else walkers[0]
+
+        def osserva(path: str, walker) -> bool:
+            nonlocal limite_segnalato
+            with lock_watch:
+                if path in path_wd:
+                    return True
+                wd = watcher.add(path)
+                if wd is None:
+                    if watcher.limit_reached:
+                        senza_watch[path] = walker
+                        if not limite_segnalato:
+                            limite_segnalato = True
+                            print("⚠️  Limite watch inotify esaurito: le cartelle restanti vengono controllate "
+                                  f"ogni {poll_interval:g}s (aumentare fs.inotify.max_user_watches)")
+                    return False
+                # Un wd riusato dopo IN_IGNORED punta a un'altra cartella
+                vecchio = wd_path.get(wd)
+                if vecchio is not None and path_wd.get(vecchio) == wd:
+                    del path_wd[vecchio]
+                wd_path[wd] = path
+                path_wd[path] = wd
+                senza_watch.pop(path, None)
+                return True
+
+        # Watch prima del listing anche nella scansione iniziale e nei rescan: un file creato
+        # nel frattempo arriva dal listing o come evento (le firme in visti evitano il doppio)
+        for walker in walkers:
+            walker.before_list = lambda path, walker=walker: osserva(path, walker)
+
+        def dimentica(path: str):
+            """Toglie watch e firme di una cartella uscita dalle root (o cancellata) e dei suoi figli."""
+            prefisso = path.rstrip(os.sep) + os.sep
+            with lock_watch:
+                for p in [p for p in path_wd if p == path or p.startswith(prefisso)]:
+                    wd = path_wd.pop(p)
+                    wd_path.pop(wd, None)
+                    watcher.remove(wd)
+                for p in [p for p in senza_watch if p == path or p.startswith(prefisso)]:
+                    del senza_watch[p]
+            for p in [p for p in visti if p.startswith(prefisso)]:
+                del visti[p]
+
+        def rinomina(vecchio: str, nuovo: str):
+            """Cartella spostata dentro le root: i watch restano validi, cambiano solo i percorsi."""
+            stats["dir_moves"] += 1
+            vp, np_ = vecchio.rstrip(os.sep) + os.sep, nuovo.rstrip(os.sep) + os.sep
+
+            def sposta(p):
+                return nuovo if p == vecchio else np_ + p[len(vp):] if p.startswith(vp) else None
+
+            with lock_watch:
+                for p in list(path_wd):
+                    dest = sposta(p)
+                    if dest is not None:
+                        wd = path_wd.pop(p)
+                        path_wd[dest] = wd
+                        wd_path[wd] = dest
+                for p in list(senza_watch):
+                    dest = sposta(p)
+                    if dest is not None:
+                        senza_watch[dest] = senza_watch.pop(p)
+            for p in [p for p in visti if p.startswith(vp)]:
+                visti[np_ + p[len(vp):]] = visti.pop(p)
+
+        def elabora(current_root: str, files, solo_cambiati: bool):
+            candidati = []
+            for entry in runner.candidates(files):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    candidati.append(entry)  # L'errore finisce nel log come in scan_and_process
+                    continue
+                firma = (st.st_size, st.st_mtime_ns)
+                if solo_cambiati and visti.get(entry.path) == firma:
+                    continue
+                visti[entry.path] = firma
+                candidati.append(entry)
+            runner.process_dir(current_root, candidati)
+
+        def scansiona(roots_da_leggere, solo_cambiati: bool):
+            """Walk delle root con watch su ogni cartella letta (scansione iniziale e rescan)."""
+            sorgenti = []
+            for root in roots_da_leggere:
+                walker = walker_di(root)
+
+                def cartelle(root=root, walker=walker):
+                    for visit in walker.walk_dirs(root):
+                        yield visit.path, visit.files, walker
+                sorgenti.append(cartelle())
+            sorgente = prefetch_sources(sorgenti)
+            try:
+                for current_root, files, walker in sorgente:
+                    if annulla.is_set():
+                        return False
+                    osserva(current_root, walker)
+                    if files is not None:
+                        elabora(current_root, files, solo_cambiati)
+            finally:
+                sorgente.close()
+            return True
+
+        def leggi_nuova(path: str, walker):
+            """
+            Cartella nuova: watch prima del listing (nessun file perso tra i due),
+            poi figli in profondità. I file già visti vengono saltati.
+            """
+            pila = [path]
+            while pila and not annulla.is_set():
+                cartella = pila.pop()
+                osserva(cartella, walker)
+                listing = walker.list_children(cartella)
+                if listing is None:
+                    continue
+                figli, files = listing
+                elabora(cartella, files, True)
+                pila.extend(os.path.join(cartella, name) for name in reversed(figli))
+
+        def file_evento(cartella: str, name: str):
+            path = os.path.join(cartella, name)
+            if FilePredicate.extension(name) not in runner.extensions:
+                return
+            try:
+                st = os.stat(path)
+            except OSError:
+                return  # Già spostato o cancellato
+            if not stat.S_ISREG(st.st_mode):
+                return
+            if visti.get(path) == (st.st_size, st.st_mtime_ns):
+                return
+            stats["files_events"] += 1
+            runner.forget_moves()
+            elabora(cartella, [ShardEntry(path, name, st)], False)
+
+        annullata = False
+        try:
+            if not scansiona([unit.path for unit in units], False):
+                annullata = True
+            else:
+                print(f"👁️  Watch attivi su {len(path_wd)} cartelle"
+                      + (f", {len(senza_watch)} in polling" if senza_watch else ""))
+            ultimo_poll = time.monotonic()
+            da_abbinare: Dict[int, tuple] = {}  # cookie -> (percorso, giro) di un IN_MOVED_FROM
+            giro = 0
+            while not annullata:
+                if annulla.is_set():
+                    annullata = True
+                    break
+                attesa = WATCH_TICK
+                if duration is not None:
+                    restante = duration - (time.monotonic() - inizio)
+                    if restante <= 0:
+                        break
+                    attesa = min(attesa, restante)
+                eventi = watcher.read(attesa)
+                giro += 1
+                overflow = False
+                for wd, mask, cookie, name in eventi:
+                    stats["events"] += 1
+                    if mask & IN_Q_OVERFLOW:
+                        overflow = True
+                        continue
+                    cartella = wd_path.get(wd)
+                    if mask & IN_IGNORED:
+                        # Watch rimosso dal kernel (cartella cancellata o smontata)
+                        if cartella is not None:
+                            with lock_watch:
+                                del wd_path[wd]
+                                if path_wd.get(cartella) == wd:
+                                    del path_wd[cartella]
+                        continue
+                    if cartella is None or mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                        continue
+                    path = os.path.join(cartella, name)
+                    if mask & IN_ISDIR:
+                        walker = walker_di(cartella)
+                        if mask & IN_MOVED_FROM:
+                            da_abbinare[cookie] = (path, giro)
+                        elif mask & IN_MOVED_TO and cookie in da_abbinare:
+                            vecchio, _ = da_abbinare.pop(cookie)
+                            if walker.should_visit(cartella, name):
+                                rinomina(vecchio, path)
+                            else:
+                                dimentica(vecchio)
+                        elif mask & (IN_CREATE | IN_MOVED_TO) and walker.should_visit(cartella, name):
+                            leggi_nuova(path, walker)
+                        elif mask & IN_DELETE:
+                            dimentica(path)
+                    elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                        file_evento(cartella, name)
+                    elif mask & (IN_DELETE | IN_MOVED_FROM):
+                        visti.pop(path, None)
+                # Un IN_MOVED_FROM senza IN_MOVED_TO entro il giro successivo: cartella uscita dalle root
+                for cookie, (vecchio, quando) in list(da_abbinare.items()):
+                    if quando < giro:
+                        del da_abbinare[cookie]
+                        dimentica(vecchio)
+                if overflow:
+                    stats["overflows"] += 1
+                    stats["rescans"] += 1
+                    print("⚠️  Coda eventi inotify piena: rescan mirato delle root")
+                    da_abbinare.clear()
+                    if not scansiona([unit.path for unit in units], True):
+                        annullata = True
+                if senza_watch and time.monotonic() - ultimo_poll >= poll_interval:
+                    ultimo_poll = time.monotonic()
+                    stats["polls"] += 1
+                    for cartella, walker in list(senza_watch.items()):
+                        if not watcher.limit_reached:
+                            # Se il watch riesce, quest'ultima lettura recupera quanto successo nel frattempo
+                            osserva(cartella, walker)
+                        listing = walker.list_children(cartella)
+                        if listing is None:
+                            senza_watch.pop(cartella, None)
+                            continue
+                        figli, files = listing
+                        elabora(cartella, files, True)
+                        for name in figli:
+                            figlio = os.path.join(cartella, name)
+                            if figlio not in path_wd and figlio not in senza_watch:
+                                leggi_nuova(figlio, walker)
+        finally:
+            self._release_cancel_token(annulla)
+            watcher.close()
+            runner.shutdown()
+
+        stats["dirs_watched"] = len(path_wd)
+        stats["unwatched_dirs"] = len(senza_watch)
+        job = runner.jobs[0]
+        status = "cancelled" if annullata else "success"
+        report = runner.report(job, status, summary={
+            "dirs_scanned": sum(w.dirs_listed for w in walkers),
+            "dest_folder_skipped": sum(w.excluded_hits for w in walkers),
+            "seconds": round(time.monotonic() - inizio, 3),
+            "transfer": runner.transfers.stats(),
+            "io": governor.stats() if governor is not None else None,  # [FEATURE 29]
+        }, log_stream=sink.path if sink is not None else None, watch=stats)
+        if sink is not None:
+            sink.close(report["summary"])
+        print(f"👁️  Watch terminato: {stats['events']} eventi, {stats['overflows']} overflow, "
+              f"{stats['dir_moves']} cartelle spostate")
         return report
 
 
 # --- INTERFACCIA TESTUALE MIGLIORATA ---
 if __name__ == "__main__":
+    # [FEATURE 8] Manutenzione cache hash: python FileHunter.py --vacuum-cache [percorso.sqlite]
+    if len(sys.argv) > 1 and sys.argv[1] == "--vacuum-cache":
+        cache_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_HASH_CACHE_PATH
+        cache = HashCache(cache_path)
+        risultato = cache.vacuum()
+        cache.close()
+        print(f"🧹 Cache {cache_path}: rimosse {risultato['removed_stale']} righe obsolete, "
+              f"{risultato['removed_lru']} per limite dimensione. Righe rimaste: {risultato['entries']}")
+        sys.exit(0)
+
+    # [FEATURE 13] Riepilogo di un log in streaming: python FileHunter.py --summarize-report log.jsonl[.gz]
+    if len(sys.argv) > 2 and sys.argv[1] == "--summarize-report":
+        print(json.dumps(summarize_report_stream(sys.argv[2]), indent=2, ensure_ascii=False))
+        sys.exit(0)
+
+    # [FEATURE 9] Aggiornamento catalogo: python FileHunter.py --refresh-catalog [percorso.sqlite]
+    # [FEATURE 10] --update-catalog: stesso comando ma incrementale (solo cartelle cambiate)
+    if len(sys.argv) > 1 and sys.argv[1] in ("--refresh-catalog", "--update-catalog"):
+        catalog_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_CATALOG_PATH
+        FileHunter().refresh_catalog(catalog_path, incremental=sys.argv[1] == "--update-catalog")
+        sys.exit(0)
+
+    # [FEATURE 26] Caccia continua: python FileHunter.py --watch .jpg,.pdf destinazione [root ...]
+    if len(sys.argv) > 3 and sys.argv[1] == "--watch":
+        try:
+            FileHunter().watch([e.strip() for e in sys.argv[2].split(',')], sys.argv[3],
+                               root_dirs=sys.argv[4:] or None)
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
     hunter = FileHunter()
     
     print("\n" + "="*60)
@@ -410,6 +6637,12 @@ if __name__ == "__main__":
     dedup = input("🔒 Abilitare deduplicazione hash? [S/n]: ").lower()
     deduplicate = dedup != 'n'
     
+    # [FEATURE 8] Cache hash persistente
+    hash_cache_path = None
+    if deduplicate:
+        cache_input = input(f"💾 Usare la cache hash persistente ({DEFAULT_HASH_CACHE_PATH})? [s/N]: ").lower()
+        hash_cache_path = DEFAULT_HASH_CACHE_PATH if cache_input == 's' else None
+    
     # Dimensione
     min_size_input = input("📏 Dimensione minima file (es. 1MB, 500KB, Invio per nessun limite): ").strip()
     min_size = None
@@ -438,17 +6671,48 @@ if __name__ == "__main__":
         except:
             print("⚠️  Formato non valido, ignoro filtro dimensione massima")
     
+    # [FEATURE 9] Catalogo
+    catalog_input = input(f"🗂️  Cercare nel catalogo ({DEFAULT_CATALOG_PATH}) invece che su disco? "
+                          f"[s/N/a=aggiorna/i=aggiorna incrementale]: ").lower()
+    catalog_path = DEFAULT_CATALOG_PATH if catalog_input in ('s', 'a', 'i') else None
+    refresh_catalog = catalog_input in ('a', 'i')
+    incremental = catalog_input == 'i'
+    
     # Dry-run
     dry = input("🔍 Modalità anteprima (non copia/sposta file)? [s/N]: ").lower()
     dry_run = dry == 's'
     
+    # [FEATURE 28] Copia durante l'hash e verifica delle copie
+    fused_copy = False
+    verify_copies = False
+    if not dry_run:
+        if deduplicate and modalita == "copy":
+            fused_copy = input("🔗 Copiare i file mentre se ne calcola l'hash (una lettura sola)? [s/N]: ").lower() == 's'
+        verify_copies = input("🧪 Verificare ogni copia rileggendola dal disco? [s/N]: ").lower() == 's'
+    
+    # [FEATURE 29] Convivenza con altri servizi: priorità bassa e concorrenza adattiva
+    low_io = input("🐢 Ridurre l'impatto sui dischi (priorità bassa, thread adattivi)? [s/N]: ").lower() == 's'
+    
     # Report
     report = input("📄 Generare report JSON dettagliato? [s/N]: ").lower()
     generate_report = report == 's'
     
+    # [FEATURE 20] Job con checkpoint: dopo Ctrl-C o un crash si riparte da dove si era arrivati
+    job_path = None
+    resume = False
+    job_info = ScanJournal.describe(DEFAULT_JOB_PATH)
+    if job_info and job_info["status"] != "complete":
+        riprendi = input(f"💾 C'è una ricerca interrotta ({job_info['dirs_done']} cartelle concluse). "
+                         f"Riprenderla? (servono gli stessi parametri) [S/n]: ").lower()
+        resume = riprendi != 'n'
+        job_path = DEFAULT_JOB_PATH
+    else:
+        job_input = input("💾 Salvare i progressi per poter riprendere se la ricerca viene interrotta? [s/N]: ").lower()
+        job_path = DEFAULT_JOB_PATH if job_input == 's' else None
+    
     print("\n🔎 Inizio ricerca... Potrebbe volerci un po' se scansioni tutto il disco.")
     
-    result = hunter.scan_and_process(
+    parametri = dict(
         estensioni_target=estensioni,
         cartella_destinazione=dest,
         query_nome=nome,
@@ -458,5 +6722,25 @@ if __name__ == "__main__":
         max_size=max_size,
         dry_run=dry_run,
         generate_report=generate_report,
-        show_progress=True
-    )
\ No newline at end of file
+        show_progress=True,
+        hash_cache_path=hash_cache_path,
+        catalog_path=catalog_path,
+        refresh_catalog=refresh_catalog,
+        incremental=incremental,
+        job_path=job_path,
+        resume=resume,
+        fused_copy=fused_copy,
+        verify_copies=verify_copies,
+        adaptive_io=low_io,
+        io_priority="idle" if low_io else None
+    )
+    try:
+        result = hunter.scan_and_process(**parametri)
+    except JobMismatchError:
+        # La ricerca interrotta aveva altri parametri: si scarta solo se l'utente lo conferma
+        scarta = input("⚠️  La ricerca interrotta usava parametri diversi e non può essere ripresa. "
+                       "Scartarla e ricominciare da zero? [s/N]: ").lower()
+        if scarta != 's':
+            print("❎ Annullato: la ricerca interrotta è stata conservata.")
+            sys.exit(1)
+        result = hunter.scan_and_process(**dict(parametri, resume=False))
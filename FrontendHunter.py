@@ -1,12 +1,14 @@
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 import threading
+import queue
 import os
 import sys
 
 # Tenta di importare il tuo backend
 try:
-    from FileHunter import FileHunter
+    from FileHunter import (FileHunter, ScanJournal, JobMismatchError, DEFAULT_CATALOG_PATH, DEFAULT_JOB_PATH,
+                            format_duration)
 except ImportError:
     messagebox.showerror("Errore", "FileHunter.py non trovato nella stessa cartella!")
     sys.exit(1)
@@ -15,18 +17,25 @@ except ImportError:
 ctk.set_appearance_mode("Dark")  # Modi: "System" (standard), "Dark", "Light"
 ctk.set_default_color_theme("blue")  # Temi: "blue" (standard), "green", "dark-blue"
 
+# Aggiornamento della barra di avanzamento: ~10 fotogrammi al secondo dal main loop di Tk
+PROGRESS_FRAME_MS = 100
+
 class ProfessionalHunterApp(ctk.CTk):
     def __init__(self):
         super().__init__()
 
         # Setup Finestra
         self.title("File Hunter Pro")
-        self.geometry("800x600")
+        self.geometry("800x650")
         self.resizable(False, False)
         
         # Inizializza il motore
         self.hunter = FileHunter()
         self.is_running = False
+        self.resume_job = False
+        self.use_job = False
+        # Snapshot di avanzamento dal backend: li legge solo il main loop (poll_progress)
+        self.progress_events = queue.Queue(maxsize=16)
 
         # --- LAYOUT GUI ---
         self.create_interface()
@@ -54,13 +63,25 @@ class ProfessionalHunterApp(ctk.CTk):
         self.progressbar.set(0)
         self.progressbar.pack(fill="x", padx=20, pady=5)
 
-        # --- BOTTONE AVVIO ---
-        self.btn_start = ctk.CTkButton(self, text="AVVIA ANALISI", 
+        # --- BOTTONI AVVIO / STOP ---
+        buttons_frame = ctk.CTkFrame(self, fg_color="transparent")
+        buttons_frame.pack(pady=20, padx=40, fill="x")
+
+        self.btn_start = ctk.CTkButton(buttons_frame, text="AVVIA ANALISI", 
                                      command=self.start_thread,
                                      height=50, 
                                      font=("Roboto Medium", 16),
                                      fg_color="#106A43", hover_color="#148052") # Verde professionale
-        self.btn_start.pack(pady=20, padx=40, fill="x")
+        self.btn_start.pack(side="left", fill="x", expand=True)
+
+        # Interrompe la scansione: il job salvato potrà essere ripreso
+        self.btn_stop = ctk.CTkButton(buttons_frame, text="FERMA",
+                                    command=self.stop_process,
+                                    height=50, width=140,
+                                    font=("Roboto Medium", 16),
+                                    state="disabled",
+                                    fg_color="#8B1E1E", hover_color="#A32626")
+        self.btn_stop.pack(side="left", padx=(10, 0))
 
     def grid_input(self, parent):
         # Estensioni
@@ -99,18 +120,86 @@ class ProfessionalHunterApp(ctk.CTk):
         self.sw_dry = ctk.CTkSwitch(opts_frame, text="Simulazione (Test)")
         self.sw_dry.pack(side="left", padx=20)
 
+        # Catalogo (ricerca sull'indice invece che sul disco)
+        catalog_frame = ctk.CTkFrame(parent, fg_color="transparent")
+        catalog_frame.pack(fill="x", padx=20, pady=(0, 10))
+
+        self.sw_catalog = ctk.CTkSwitch(catalog_frame, text="Cerca nel Catalogo (istantaneo)")
+        self.sw_catalog.pack(side="left", padx=(0, 20))
+
+        self.btn_catalog = ctk.CTkButton(catalog_frame, text="Aggiorna Catalogo", command=self.start_catalog_refresh, width=140)
+        self.btn_catalog.pack(side="left")
+
+        # Conteggio preliminare: percentuale e tempo stimato invece della barra indeterminata
+        self.sw_eta = ctk.CTkSwitch(catalog_frame, text="Stima tempo rimanente")
+        self.sw_eta.select()
+        self.sw_eta.pack(side="left", padx=20)
+
+        # Journal con checkpoint solo su richiesta: una ricerca qualsiasi non tocca quella interrotta
+        self.sw_job = ctk.CTkSwitch(catalog_frame, text="Ricerca riprendibile")
+        self.sw_job.pack(side="left", padx=20)
+
     def select_folder(self):
         path = filedialog.askdirectory()
         if path:
             self.selected_folder = path
             self.lbl_dest.configure(text=f"...{path[-30:]}" if len(path) > 30 else path, text_color="white")
 
-    def update_progress_safe(self, message, count):
-        """Callback chiamata dal Backend"""
-        # CustomTkinter è thread-safe per .configure, ma update_idletasks a volte serve
-        self.status_label.configure(text=f"{message} (Totale: {count})")
+    def start_catalog_refresh(self):
+        if self.is_running:
+            return
+        self.is_running = True
+        self.btn_start.configure(state="disabled")
+        self.btn_catalog.configure(state="disabled", text="Aggiornamento...")
+        self.status_label.configure(text="Aggiornamento catalogo in corso (scansione completa del disco)...")
+        self.progressbar.configure(mode="indeterminate")
+        self.progressbar.start()
+        threading.Thread(target=self.run_catalog_refresh, daemon=True).start()
+
+    def run_catalog_refresh(self):
+        try:
+            stats = self.hunter.refresh_catalog(DEFAULT_CATALOG_PATH)
+            text = f"Catalogo aggiornato: {stats['files_indexed']} file indicizzati."
+        except Exception as e:
+            text = f"Errore aggiornamento catalogo: {e}"
+        self.after(0, lambda: self.finish_catalog_refresh(text))
+
+    def finish_catalog_refresh(self, text):
+        self.is_running = False
+        self.progressbar.stop()
+        self.progressbar.configure(mode="determinate")
+        self.progressbar.set(1)
+        self.btn_start.configure(state="normal")
+        self.btn_catalog.configure(state="normal", text="Aggiorna Catalogo")
+        self.status_label.configure(text=text)
+
+    def poll_progress(self):
+        """Svuota la coda degli snapshot dal main loop: i thread di lavoro non toccano i widget"""
+        snap = None
+        while True:
+            try:
+                snap = self.progress_events.get_nowait()
+            except queue.Empty:
+                break
+        if snap is not None:
+            self.show_progress(snap)
         if self.is_running:
-            self.progressbar.step() 
+            self.after(PROGRESS_FRAME_MS, self.poll_progress)
+
+    def show_progress(self, snap):
+        text = (f"{snap['files_copied']} file elaborati su {snap['files_processed']} esaminati · "
+                f"{snap['files_per_second']:.0f} file/s · {snap['bytes_per_second'] / (1024 * 1024):.1f} MB/s")
+        if snap["percent"] is not None:
+            if self.progressbar.cget("mode") != "determinate":
+                self.progressbar.stop()
+                self.progressbar.configure(mode="determinate")
+            self.progressbar.set(snap["percent"] / 100)
+            text += f" · {snap['percent']:.0f}%"
+            if snap["eta_seconds"] is not None and snap["phase"] == "scanning":
+                text += f" · ETA {format_duration(snap['eta_seconds'])}"
+        elif snap["counting"]:
+            text += " · stima in corso..."
+        self.status_label.configure(text=text)
 
     def start_thread(self):
         if not self.entry_ext.get():
@@ -120,11 +209,34 @@ class ProfessionalHunterApp(ctk.CTk):
             messagebox.showwarning("Attenzione", "Seleziona dove salvare i file!")
             return
 
+        # Una ricerca interrotta (pulsante FERMA, chiusura, crash) può ripartire da dove era arrivata
+        self.use_job = self.sw_job.get() == 1
+        job = ScanJournal.describe(DEFAULT_JOB_PATH) if self.use_job else None
+        self.resume_job = False
+        if job and job["status"] != "complete":
+            self.resume_job = messagebox.askyesno(
+                "Ricerca interrotta",
+                f"C'è una ricerca interrotta ({job['dirs_done']} cartelle già concluse).\n"
+                f"Riprenderla? Servono gli stessi parametri; 'No' ricomincia da zero.")
+
         self.is_running = True
         self.btn_start.configure(state="disabled", text="ELABORAZIONE IN CORSO...")
+        self.btn_stop.configure(state="normal", text="FERMA")
+        # Indeterminata finché il pre-conteggio non fornisce il totale
+        self.progressbar.configure(mode="indeterminate")
         self.progressbar.start()
+        while not self.progress_events.empty():
+            self.progress_events.get_nowait()
         
         threading.Thread(target=self.run_process, daemon=True).start()
+        self.after(PROGRESS_FRAME_MS, self.poll_progress)
+
+    def stop_process(self):
+        if not self.is_running:
+            return
+        self.btn_stop.configure(state="disabled", text="ARRESTO...")
+        self.status_label.configure(text="Arresto in corso: attendo la fine dei trasferimenti avviati...")
+        self.hunter.cancel()
 
     def run_process(self):
         try:
@@ -133,32 +245,82 @@ class ProfessionalHunterApp(ctk.CTk):
             mode = "move" if self.sw_mode.get() == 1 else "copy"
             
             # --- CHIAMATA AL BACKEND ---
-            result = self.hunter.scan_and_process(
+            parametri = dict(
                 estensioni_target=estensioni,
                 cartella_destinazione=self.selected_folder,
                 query_nome=nome_query if nome_query else None,
                 mode=mode,
                 deduplicate=bool(self.sw_dedup.get()),
                 dry_run=bool(self.sw_dry.get()),
-                progress_callback=self.update_progress_safe # Passiamo la funzione GUI
+                progress_queue=self.progress_events, # Snapshot letti da poll_progress
+                progress_precount=bool(self.sw_eta.get()),
+                catalog_path=DEFAULT_CATALOG_PATH if self.sw_catalog.get() == 1 else None,
+                job_path=DEFAULT_JOB_PATH if self.use_job else None,
+                resume=self.resume_job
             )
+            try:
+                result = self.hunter.scan_and_process(**parametri)
+            except JobMismatchError:
+                # La ricerca interrotta aveva altri parametri: si scarta solo con il consenso esplicito
+                if self.ask_from_worker(
+                        "Parametri diversi",
+                        "La ricerca interrotta era stata avviata con parametri diversi "
+                        "(estensioni, destinazione, modalità o filtri) e non può essere ripresa.\n\n"
+                        "Scartarla e ricominciare da zero con i parametri attuali?\n"
+                        "'No' annulla e conserva la ricerca interrotta."):
+                    self.after(0, lambda: self.status_label.configure(
+                        text="Ricerca interrotta scartata: ricomincio da zero..."))
+                    result = self.hunter.scan_and_process(**dict(parametri, resume=False))
+                else:
+                    result = {"status": "aborted"}
             
             self.after(0, lambda: self.finish_process(result)) # Torna al thread principale per chiudere
 
         except Exception as e:
             self.after(0, lambda: self.finish_process({"status": "error", "message": str(e)}))
 
+    def ask_from_worker(self, title, message):
+        """Pone una domanda sì/no dal thread di lavoro: la finestra la apre il main loop di Tk."""
+        risposta = {}
+        pronta = threading.Event()
+
+        def domanda():
+            risposta["si"] = messagebox.askyesno(title, message)
+            pronta.set()
+
+        self.after(0, domanda)
+        pronta.wait()
+        return risposta["si"]
+
     def finish_process(self, result):
         self.is_running = False
+        self.poll_progress()  # Ultimo snapshot (fase "finished")
         self.progressbar.stop()
+        self.progressbar.configure(mode="determinate")
         self.progressbar.set(1)
         self.btn_start.configure(state="normal", text="AVVIA ANALISI")
+        self.btn_stop.configure(state="disabled", text="FERMA")
         
-        if result["status"] == "success":
+        if result["status"] == "aborted":
+            messagebox.showinfo("Annullata", "Ricerca annullata: la ricerca interrotta è stata conservata.")
+            self.status_label.configure(text="Ricerca annullata.")
+        elif result["status"] == "cancelled":
+            dettagli = result.get('summary', {})
+            riprendibile = result.get('job') is not None
+            messagebox.showinfo("Interrotta",
+                                f"Ricerca interrotta.\n\n"
+                                f"File già elaborati: {dettagli.get('files_trovati', 0)}" +
+                                ("\n\nAl prossimo avvio potrai riprenderla da qui." if riprendibile else ""))
+            self.status_label.configure(text="Ricerca interrotta (riprendibile)." if riprendibile
+                                        else "Ricerca interrotta.")
+        elif result["status"] == "success":
             dettagli = result.get('summary', {})
             msg = (f"Operazione Completata!\n\n"
                    f"File Trovati: {dettagli.get('files_trovati', result.get('trovati', 0))}\n"
                    f"Duplicati Evitati: {dettagli.get('files_duplicati', 0)}")
+            catalogo = result.get('catalog')
+            if catalogo and catalogo.get('age_seconds') is not None:
+                msg += f"\n\nCatalogo aggiornato {catalogo['age_seconds'] / 3600:.1f} ore fa"
             messagebox.showinfo("Successo", msg)
             self.status_label.configure(text="Operazione completata con successo.")
         else:
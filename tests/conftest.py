@@ -0,0 +1,138 @@
+"""
+Albero sintetico deterministico e confronto con la versione originale di FileHunter
+(tests/baseline_filehunter.py): stessi conteggi, stessi originali, stessi nomi nella
+destinazione e log nello stesso ordine.
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+sys.path.insert(0, TESTS_DIR)
+
+import baseline_filehunter  # noqa: E402
+import FileHunter  # noqa: E402
+
+EXTENSIONS = [".jpg", ".pdf"]
+# mtime fisso: "modified" e i filtri per data non dipendono da quando gira il test
+BASE_MTIME = 1_600_000_000
+
+
+def _payloads(rng: random.Random):
+    big = bytes(rng.getrandbits(8) for _ in range(150 * 1024))
+    payloads = [bytes(rng.getrandbits(8) for _ in range(rng.randint(0, 3000))) for _ in range(14)]
+    # Stessa dimensione, contenuto diverso: stadio "campione"
+    payloads += [bytes([i]) * 2048 for i in range(3)]
+    # Stessi testa e coda, centro diverso: stadio "hash completo"
+    payloads += [big[:70000] + bytes([i]) + big[70001:] for i in range(3)]
+    return payloads
+
+
+def make_tree(root: str, seed: int = 7, dirs: int = 24, files: int = 160):
+    """
+    Crea sempre gli stessi file nello stesso ordine: due alberi con lo stesso seed
+    sullo stesso filesystem hanno anche lo stesso ordine di listing.
+    """
+    rng = random.Random(seed)
+    os.makedirs(root)
+    cartelle = [root]
+    for i in range(dirs):
+        parent = rng.choice(cartelle)
+        name = rng.choice(["foto", "doc", "fattura", ".nascosta", "lib"]) + str(i)
+        if i == 5:
+            name = "lib"  # SKIP_DIRS
+        path = os.path.join(parent, name)
+        os.makedirs(path, exist_ok=True)
+        cartelle.append(path)
+    payloads = _payloads(rng)
+    for i in range(files):
+        cartella = rng.choice(cartelle)
+        name = rng.choice(["IMG_0001", "fattura", "fttura_2023", "report", "scan"]) + \
+            rng.choice(["", "", str(rng.randint(0, 3))]) + rng.choice([".jpg", ".pdf", ".txt", ".JPG"])
+        path = os.path.join(cartella, name)
+        with open(path, "wb") as f:
+            f.write(rng.choice(payloads))
+        os.utime(path, (BASE_MTIME + i * 3600, BASE_MTIME + i * 3600))
+    os.symlink(cartelle[3], os.path.join(root, "link"))
+    return root
+
+
+def grow_tree(root: str, seed: int = 11):
+    """Aggiunge cartelle e file a un albero esistente (sempre nello stesso modo)."""
+    rng = random.Random(seed)
+    payloads = _payloads(random.Random(7))
+    for i in range(4):
+        path = os.path.join(root, f"nuova{i}", "sotto")
+        os.makedirs(path)
+        for j in range(6):
+            name = os.path.join(path if j % 2 else os.path.dirname(path), f"IMG_0001{j % 3}.jpg")
+            with open(name, "wb") as f:
+                f.write(rng.choice(payloads))
+            os.utime(name, (BASE_MTIME, BASE_MTIME))
+
+
+@contextlib.contextmanager
+def silent():
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def normalize(log, src: str, dest: str):
+    """Log come (file, status, destinazione) con le radici sostituite."""
+    def rel(path):
+        if path is None:
+            return None
+        return path.replace(dest, "DEST").replace(src, "SRC")
+    return [(rel(r["file"]), r["status"], rel(r.get("destination"))) for r in log]
+
+
+def listing(dest: str):
+    """Contenuto della destinazione (percorso relativo -> byte), senza report e store."""
+    out = {}
+    for current, dirs, files in os.walk(dest):
+        dirs[:] = [d for d in dirs if d != ".objects"]
+        for name in files:
+            if name.startswith("scan_report"):
+                continue
+            path = os.path.join(current, name)
+            with open(path, "rb") as f:
+                out[os.path.relpath(path, dest)] = f.read()
+    return out
+
+
+SUMMARY_KEYS = ("files_trovati", "files_duplicati", "files_filtrati", "files_errori", "total_size")
+
+
+def outcome(report, log, src, dest):
+    summary = {k: report["summary"][k] for k in SUMMARY_KEYS}
+    return summary, normalize(log, src, dest), listing(dest) if os.path.isdir(dest) else {}
+
+
+def run_baseline(src: str, dest: str, **kwargs):
+    hunter = baseline_filehunter.FileHunter()
+    hunter.get_root_dirs = lambda: [src]
+    with silent():
+        report = hunter.scan_and_process(EXTENSIONS, dest, show_progress=False, **kwargs)
+    return outcome(report, hunter.scan_log, src, dest)
+
+
+def run_hunter(src: str, dest: str, hunter=None, **kwargs):
+    hunter = hunter or FileHunter.FileHunter()
+    kwargs.setdefault("root_dirs", [src])
+    with silent():
+        report = hunter.scan_and_process(EXTENSIONS, dest, show_progress=False, **kwargs)
+    return outcome(report, hunter.scan_log, src, dest), report
+
+
+@pytest.fixture
+def trees(tmp_path):
+    """Crea alberi identici su richiesta: trees("nome") -> (sorgente, destinazione)."""
+    def crea(name: str, seed: int = 7):
+        src = make_tree(str(tmp_path / name / "src"), seed)
+        return src, str(tmp_path / name / "dest")
+    return crea
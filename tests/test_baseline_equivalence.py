@@ -0,0 +1,134 @@
+"""Le ottimizzazioni non cambiano gli esiti: confronto con la versione originale."""
+import pytest
+
+from conftest import run_baseline, run_hunter, grow_tree, silent, normalize, EXTENSIONS
+import FileHunter
+
+
+@pytest.mark.parametrize("mode", ["copy", "move"])
+@pytest.mark.parametrize("transfer_workers", [1, 4])
+def test_transfer_matches_baseline(trees, mode, transfer_workers):
+    expected = run_baseline(*trees("base"), mode=mode)
+    actual, _ = run_hunter(*trees("new"), mode=mode, transfer_workers=transfer_workers)
+    assert actual == expected
+
+
+def test_dry_run_matches_baseline(trees):
+    expected = run_baseline(*trees("base"), dry_run=True, query_nome="fattura")
+    actual, _ = run_hunter(*trees("new"), dry_run=True, query_nome="fattura")
+    assert actual == expected
+
+
+def test_filters_and_no_dedup_match_baseline(trees):
+    filtri = dict(min_size=100, max_size=100_000, deduplicate=False,
+                  date_from=FileHunter.datetime.fromtimestamp(1_600_000_000 + 20 * 3600))
+    expected = run_baseline(*trees("base"), **filtri)
+    actual, _ = run_hunter(*trees("new"), **filtri)
+    assert actual == expected
+
+
+def test_destination_inside_root_matches_baseline(trees):
+    src, _ = trees("base")
+    expected = run_baseline(src, src + "/OUT")
+    src2, _ = trees("new")
+    actual, _ = run_hunter(src2, src2 + "/OUT")
+    assert actual == expected
+
+
+def test_pipeline_workers_keep_scan_order(trees):
+    expected = run_baseline(*trees("base"))
+    actual, _ = run_hunter(*trees("new"), stage_workers={"match": 4, "filter": 4}, hash_workers=4,
+                           walk_workers=8, transfer_workers=8)
+    assert actual == expected
+
+
+@pytest.mark.parametrize("io_order", ["walk", "auto", "inode", "extent"])
+@pytest.mark.parametrize("mode", ["copy", "move"])
+def test_io_order_keeps_outcome(trees, io_order, mode):
+    expected = run_baseline(*trees("base"), mode=mode)
+    actual, report = run_hunter(*trees("new"), mode=mode, io_order=io_order)
+    assert actual == expected
+
+
+@pytest.mark.parametrize("option", [{"fused_copy": True}, {"fused_copy": True, "verify_copies": True},
+                                    {"content_store": True}, {"adaptive_io": True}])
+def test_copy_options_keep_outcome(trees, option):
+    expected = run_baseline(*trees("base"))
+    actual, _ = run_hunter(*trees("new"), **option)
+    assert actual[:2] == expected[:2]
+    if not option.get("content_store"):
+        assert actual[2] == expected[2]
+
+
+def test_report_stream_keeps_scan_order(trees, tmp_path):
+    expected = run_baseline(*trees("base"))
+    src, dest = trees("new")
+    stream = str(tmp_path / "log.jsonl")
+    run_hunter(src, dest, report_stream=stream, transfer_workers=4)
+    log = [r for r in FileHunter.read_report_stream(stream) if "file" in r]
+    assert normalize(log, src, dest) == expected[1]
+
+
+def test_process_workers_match_baseline(trees):
+    expected = run_baseline(*trees("base"))
+    actual, report = run_hunter(*trees("new"), process_workers=2)
+    assert report["summary"]["processes"]["workers"] == 2
+    assert actual == expected
+
+
+def test_catalog_after_incremental_refresh_matches_disk(trees, tmp_path):
+    src, dest = trees("new")
+    catalog = str(tmp_path / "catalog.sqlite")
+    hunter = FileHunter.FileHunter()
+    with silent():
+        hunter.refresh_catalog(catalog, [src])
+    grow_tree(src)
+    with silent():
+        hunter.refresh_catalog(catalog, [src], incremental=True)
+    actual, _ = run_hunter(src, dest, catalog_path=catalog)
+
+    base_src, base_dest = trees("base")
+    grow_tree(base_src)
+    assert actual == run_baseline(base_src, base_dest)
+
+
+@pytest.mark.parametrize("mode", ["copy", "move"])
+def test_cancelled_job_resumes_to_baseline(trees, tmp_path, mode):
+    expected = run_baseline(*trees("base"), mode=mode)
+    src, dest = trees("new")
+    job = str(tmp_path / "job.sqlite")
+    hunter = FileHunter.FileHunter()
+    copiati = []
+
+    def interrompi(event):
+        if event["event"] == "file_copied":
+            copiati.append(event)
+            if len(copiati) == 8:
+                hunter.cancel()
+
+    _, report = run_hunter(src, dest, hunter=hunter, mode=mode, job_path=job, transfer_workers=1,
+                           metrics_callback=interrompi)
+    assert report["status"] == "cancelled"
+    actual, report = run_hunter(src, dest, mode=mode, job_path=job, generate_report=True)
+    assert report["job"]["resumed"]
+    assert actual == expected
+
+
+def test_scan_batch_matches_scan_and_process(trees, tmp_path):
+    expected = run_baseline(*trees("base"))
+    src, dest = trees("new")
+    with silent():
+        result = FileHunter.FileHunter().scan_batch(
+            [{"estensioni_target": EXTENSIONS, "cartella_destinazione": dest, "generate_report": True}],
+            root_dirs=[src], show_progress=False)
+    report = result["jobs"][0]
+    assert normalize(report["log"], src, dest) == expected[1]
+
+
+def test_iter_matches_yields_baseline_winners(trees):
+    expected = run_baseline(*trees("base"), dry_run=True)
+    src, _ = trees("new")
+    vincitori = [m.path for m in FileHunter.FileHunter().iter_matches(EXTENSIONS, root_dirs=[src],
+                                                                        deduplicate=True)]
+    assert [p.replace(src, "SRC") for p in vincitori] == \
+        [f for f, status, _ in expected[1] if status == "success"]
@@ -0,0 +1,11 @@
+"""Suite di benchmark: esecuzione minima su un albero sintetico."""
+import BenchmarkHunter
+
+
+def test_run_suite_creates_a_missing_workdir(tmp_path):
+    workdir = tmp_path / "non" / "ancora"
+    spec = dict(BenchmarkHunter.TREE_PRESETS["small"], depth=1, fanout=1, files_per_dir=5)
+    result = BenchmarkHunter.run_suite(spec, only=["walk"], repeat=1, workdir=str(workdir))
+    assert list(result["results"]) == ["walk"]
+    # Senza keep l'albero generato viene rimosso, la cartella di lavoro resta
+    assert workdir.is_dir() and not any(workdir.iterdir())
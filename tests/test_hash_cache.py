@@ -0,0 +1,62 @@
+"""Cache hash persistente: eviction LRU e manutenzione."""
+import os
+
+import FileHunter
+
+
+def _cache(tmp_path, **kwargs):
+    return FileHunter.HashCache(str(tmp_path / "cache.sqlite"), **kwargs)
+
+
+def test_evict_removes_least_recently_used_down_to_ninety_percent(tmp_path):
+    cache = _cache(tmp_path, max_entries=10)
+    cache._run_stamp = 100
+    for i in range(20):
+        cache.put((1, i, 10, 0), "md5", f"d{i}")
+    cache.flush()
+    # Una sessione successiva rilegge le ultime cinque: diventano le più recenti
+    cache._run_stamp = 200
+    recenti = [cache.get((1, i, 10, 0), "md5") for i in range(15, 20)]
+    assert recenti == [f"d{i}" for i in range(15, 20)]
+    assert cache.evict() == 11
+    assert cache.count() == 9
+    assert all(cache.get((1, i, 10, 0), "md5") == f"d{i}" for i in range(15, 20))
+    assert cache.evict() == 0
+    cache.close()
+
+
+def test_close_applies_the_size_limit(tmp_path):
+    cache = _cache(tmp_path, max_entries=4)
+    for i in range(8):
+        cache.put((1, i, 10, 0), "md5", f"d{i}")
+    cache.close()
+    cache = _cache(tmp_path)
+    assert cache.count() == 4  # Sotto 10 righe il margine del 10% è zero
+    cache.close()
+
+
+def test_vacuum_prunes_changed_and_missing_files(tmp_path):
+    cache = _cache(tmp_path)
+    paths = []
+    for name in ("uguale", "modificato", "sparito"):
+        path = tmp_path / name
+        path.write_bytes(name.encode())
+        cache.put(cache.key_for(str(path)), "md5", name, path)
+        paths.append(path)
+    cache.put((1, 1, 1, 1), "md5", "senza_percorso")
+    paths[1].write_bytes(b"contenuto diverso")
+    os.remove(paths[2])
+
+    assert cache.vacuum() == {"removed_stale": 3, "removed_lru": 0, "entries": 1}
+    assert cache.get(cache.key_for(str(paths[0])), "md5") == "uguale"
+    cache.close()
+
+
+def test_error_digests_are_not_cached(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put((1, 1, 1, 1), "md5", "error_/x")
+    cache.put(None, "md5", "abc")
+    cache.flush()
+    assert cache.count() == 0
+    assert cache.stats()["misses"] == 0
+    cache.close()
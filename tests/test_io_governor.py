@@ -0,0 +1,104 @@
+"""Convivenza con altri servizi: concorrenza AIMD, limiti a token bucket e priorità dei thread."""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from conftest import EXTENSIONS, silent
+import FileHunter
+
+
+def _giro(limiter, seconds):
+    # Tutti i posti occupati (limite raggiunto), poi rilasciati con la stessa latenza
+    presi = limiter.limit
+    for _ in range(presi):
+        limiter.acquire()
+    for _ in range(presi):
+        limiter.release(seconds)
+
+
+def test_limiter_grows_by_one_and_backs_off_multiplicatively():
+    limiter = FileHunter.AdaptiveLimiter(max_limit=4)
+    assert limiter.limit == FileHunter.ADAPTIVE_INITIAL == 2
+    for _ in range(8):
+        _giro(limiter, 0.001)
+    # Prima finestra: latenza stabile e limite raggiunto, un posto in più
+    assert (limiter.limit, limiter.increases) == (3, 1)
+    for _ in range(20):
+        _giro(limiter, 0.001)
+    assert (limiter.limit, limiter.peak, limiter.increases) == (4, 4, 2)  # Mai oltre max_limit
+
+    # Latenza dieci volte la base: 4 -> 2 -> 1, poi fermo al minimo
+    for _ in range(30):
+        _giro(limiter, 0.01)
+    assert (limiter.limit, limiter.decreases) == (1, 2)
+    stats = limiter.stats()
+    assert stats["concurrency"] == 1 and stats["peak_concurrency"] == 4
+    assert stats["baseline_latency_ms"] < 2
+
+
+def test_limiter_does_not_grow_below_its_limit():
+    limiter = FileHunter.AdaptiveLimiter(max_limit=4)
+    for _ in range(40):
+        limiter.acquire()  # Un solo posto occupato alla volta: il limite non è il collo di bottiglia
+        limiter.release(0.001)
+    assert (limiter.limit, limiter.increases) == (2, 0)
+
+
+def test_latency_is_measured_per_megabyte():
+    limiter = FileHunter.AdaptiveLimiter(max_limit=4)
+    for _ in range(8):
+        _giro(limiter, 0.001)
+    # Letture dieci volte più grandi e dieci volte più lente: stessa latenza per MB
+    for _ in range(10):
+        presi = limiter.limit
+        for _ in range(presi):
+            limiter.acquire()
+        for _ in range(presi):
+            limiter.release(0.01, 10 * FileHunter.IO_LATENCY_UNIT)
+    assert limiter.decreases == 0
+
+
+def test_token_bucket_caps_credit_at_one_second():
+    bucket = FileHunter._TokenBucket(100)
+    bucket.stamp -= 60  # Un minuto fermo: il credito resta di un secondo
+    assert bucket.reserve(100) == 0.0
+    assert bucket.reserve(50) == pytest.approx(0.5, abs=0.01)
+    # Il debito si somma: il prossimo aspetta anche quello precedente
+    assert bucket.reserve(50) == pytest.approx(1.0, abs=0.01)
+
+
+def test_governor_waits_for_the_byte_limit():
+    governor = FileHunter.IOGovernor(max_bytes_per_second=1000)
+    inizio = time.monotonic()
+    for _ in range(3):
+        governor.run("copy", None, 500, lambda: None)
+    # 1500 byte con 1000 di credito: mezzo secondo di attesa
+    assert 0.45 <= time.monotonic() - inizio < 1.0
+    assert governor.stats()["throttle_seconds"] == pytest.approx(0.5, abs=0.05)
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="nice per thread solo su Linux")
+def test_idle_priority_leaves_the_calling_thread_alone(trees):
+    src, dest = trees("new")
+    esito = {}
+
+    def chiamante():
+        tid = threading.get_native_id()
+        esito["prima"] = os.getpriority(os.PRIO_PROCESS, tid)
+        with silent():
+            esito["report"] = FileHunter.FileHunter().scan_batch(
+                [dict(name="a", estensioni_target=EXTENSIONS, cartella_destinazione=dest)],
+                root_dirs=[src], show_progress=False, io_priority="idle")
+        esito["dopo"] = os.getpriority(os.PRIO_PROCESS, tid)
+
+    # Thread a parte: un'eventuale regressione non rallenta il resto della suite
+    thread = threading.Thread(target=chiamante, name="chiamante")
+    thread.start()
+    thread.join()
+    assert esito["dopo"] == esito["prima"]
+    io = esito["report"]["summary"]["io"]
+    # I thread della libreria (walker, copie) ricevono comunque la priorità
+    assert io["threads_prioritized"] + io["priority_failures"] > 0
@@ -0,0 +1,85 @@
+"""Ricerca lazy: stessi file di scan_and_process, versione asincrona e interruzione anticipata."""
+import asyncio
+import threading
+import time
+
+from conftest import EXTENSIONS, run_hunter, silent
+import FileHunter
+
+
+def _walkers():
+    return [t for t in threading.enumerate() if t.name.startswith(("hunter-walk", "hunter-source"))]
+
+
+def _wait_walkers_gone(timeout=2.0):
+    limite = time.monotonic() + timeout
+    while _walkers() and time.monotonic() < limite:
+        time.sleep(0.01)
+    return not _walkers()
+
+
+def _originali(src, tmp_path):
+    hunter = FileHunter.FileHunter()
+    with silent():
+        hunter.scan_and_process(EXTENSIONS, str(tmp_path / "dest"), root_dirs=[src], show_progress=False,
+                                dry_run=True)
+    return [(r["file"], r["size"]) for r in hunter.scan_log if r["status"] == "success"]
+
+
+def test_matches_are_the_originals_of_a_deduplicating_scan(trees, tmp_path):
+    src, _ = trees("new")
+    matches = list(FileHunter.FileHunter().iter_matches(EXTENSIONS, root_dirs=[src], deduplicate=True,
+                                                        compute_hash=True))
+    assert [(m.path, m.size) for m in matches] == _originali(src, tmp_path)
+    assert all(m.digest and not m.digest.startswith("error_") for m in matches)
+    assert len({m.digest for m in matches}) == len(matches)
+
+
+def test_aiter_matches_yields_the_same_files(trees):
+    src, _ = trees("new")
+    attesi = [m.path for m in FileHunter.FileHunter().iter_matches(EXTENSIONS, root_dirs=[src])]
+
+    async def raccogli():
+        return [m.path async for m in FileHunter.FileHunter().aiter_matches(EXTENSIONS, root_dirs=[src])]
+
+    assert asyncio.run(raccogli()) == attesi
+
+
+def test_closing_the_iterator_stops_the_walkers(trees):
+    src, _ = trees("new")
+    hunter = FileHunter.FileHunter()
+    matches = hunter.iter_matches(EXTENSIONS, root_dirs=[src], walk_workers=2)
+    next(matches)
+    matches.close()
+    assert _wait_walkers_gone()
+    assert not hunter._cancel_events
+
+
+def test_breaking_out_of_async_for_stops_the_search(trees):
+    src, _ = trees("new")
+    hunter = FileHunter.FileHunter()
+
+    async def primi(n):
+        trovati = []
+        async for match in hunter.aiter_matches(EXTENSIONS, root_dirs=[src], walk_workers=2):
+            trovati.append(match)
+            if len(trovati) == n:
+                break
+        return trovati
+
+    assert len(asyncio.run(primi(3))) == 3
+    assert _wait_walkers_gone()
+    assert not hunter._cancel_events
+
+
+def test_cancel_survives_a_concurrent_scan(trees):
+    src, dest = trees("new")
+    hunter = FileHunter.FileHunter()
+    matches = hunter.iter_matches(EXTENSIONS, root_dirs=[src], walk_workers=1)
+    next(matches)
+    hunter.cancel()
+    # Una scansione avviata dopo cancel() non annulla l'interruzione già chiesta
+    _, report = run_hunter(src, dest, hunter=hunter)
+    assert report["status"] == "success"
+    assert len(list(matches)) < 20
+    assert not hunter._cancel_events
@@ -0,0 +1,72 @@
+"""Avanzamento a eventi: limite di frequenza, coda "ultimo vince", percentuale ed ETA."""
+import queue
+import time
+from collections import deque
+
+import pytest
+
+import FileHunter
+
+
+def _records(reporter, n, size=10):
+    for i in range(n):
+        reporter.record({"file": f"/src/f{i}.jpg", "status": "success", "size": size})
+
+
+def test_events_are_throttled_and_skipped_when_idle():
+    chiamate = []
+    reporter = FileHunter.ProgressReporter(interval=0.05, callback=lambda msg, n: chiamate.append(n))
+    inizio = time.monotonic()
+    reporter.start()
+    for _ in range(20):
+        _records(reporter, 50)
+        time.sleep(0.01)
+    time.sleep(0.1)
+    # 1000 record: al massimo un evento per intervallo trascorso, non uno per record
+    assert 1 <= len(chiamate) <= (time.monotonic() - inizio) / 0.05 + 1
+    assert chiamate[-1] == 1000
+    fermo = len(chiamate)
+    time.sleep(0.2)
+    assert len(chiamate) == fermo  # Nessun cambiamento, nessun evento
+    reporter.stop()
+    assert len(chiamate) == fermo + 1
+
+
+def test_full_queue_keeps_only_the_latest_snapshot():
+    eventi = queue.Queue(maxsize=1)
+    reporter = FileHunter.ProgressReporter(events=eventi)
+    for _ in range(3):
+        _records(reporter, 1)
+        reporter.emit()
+    assert eventi.qsize() == 1
+    assert eventi.get_nowait()["files_processed"] == 3
+    reporter.stop("cancelled")
+    assert eventi.get_nowait()["phase"] == "cancelled"
+
+
+def test_percent_and_eta_from_the_rate_window():
+    reporter = FileHunter.ProgressReporter()
+    reporter.counting = True
+    assert reporter.snapshot()["percent"] is None
+    reporter.set_total(300)
+    _records(reporter, 100, size=1024 * 1024)
+    # Cento file negli ultimi dieci secondi: 10 file/s, ne restano 200
+    reporter._samples = deque([(time.monotonic() - 10, 0, 0)])
+    snap = reporter.snapshot()
+    assert not snap["counting"]
+    assert snap["percent"] == pytest.approx(33.3)
+    assert snap["files_per_second"] == pytest.approx(10, abs=0.1)
+    assert snap["eta_seconds"] == pytest.approx(20, abs=0.5)
+    assert "ETA 0:00:20" in FileHunter.ProgressReporter.format_line(snap)
+    assert snap["message"] == "Elaborato: f99.jpg"
+
+
+def test_restored_work_counts_in_the_total_but_not_in_the_rate():
+    reporter = FileHunter.ProgressReporter()
+    reporter.set_total(100)
+    reporter.restore(files=60, files_copied=50, nbytes=500)
+    snap = reporter.snapshot()
+    assert (snap["files_processed"], snap["files_copied"], snap["bytes"]) == (60, 50, 500)
+    assert snap["percent"] == 60.0
+    assert snap["files_per_second"] == 0
+    assert snap["eta_seconds"] is None
@@ -0,0 +1,52 @@
+"""Log in streaming su JSONL (anche gzip): lettura e riepilogo, completi o troncati."""
+import shutil
+
+import pytest
+
+from conftest import SUMMARY_KEYS, normalize, run_baseline, run_hunter
+import FileHunter
+
+
+@pytest.mark.parametrize("name", ["log.jsonl", "log.jsonl.gz"])
+def test_stream_summary_matches_the_report(trees, tmp_path, name):
+    expected = run_baseline(*trees("base"))
+    src, dest = trees("new")
+    stream = str(tmp_path / name)
+    _, report = run_hunter(src, dest, report_stream=stream)
+
+    riepilogo = FileHunter.summarize_report_stream(stream)
+    assert riepilogo["complete"]
+    assert riepilogo["header"]["destination"] == dest
+    assert riepilogo["summary"] == {k: report["summary"][k] for k in SUMMARY_KEYS}
+    assert riepilogo["final_summary"]["files_trovati"] == report["summary"]["files_trovati"]
+    log = [r for r in FileHunter.read_report_stream(stream) if "_type" not in r]
+    assert normalize(log, src, dest) == expected[1]
+
+
+def test_unclosed_gzip_stream_keeps_the_flushed_records(tmp_path):
+    stream = str(tmp_path / "log.jsonl.gz")
+    sink = FileHunter.JsonlReportSink(stream, header={"mode": "COPY"}, buffer_records=2)
+    for i in range(5):
+        sink.append({"file": f"f{i}", "status": "success", "size": 10})
+    sink.flush()
+    sink.append({"file": "f5", "status": "error", "error": "x"})
+    # Copia del file come lo lascerebbe un crash: blocco gzip aperto, niente riepilogo
+    crash = str(tmp_path / "crash.jsonl.gz")
+    shutil.copyfile(stream, crash)
+    sink.close()
+
+    records = list(FileHunter.read_report_stream(crash))
+    assert records[0] == {"_type": "header", "mode": "COPY"}
+    assert [r["file"] for r in records[1:]] == [f"f{i}" for i in range(5)]
+    riepilogo = FileHunter.summarize_report_stream(crash)
+    assert not riepilogo["complete"]
+    assert riepilogo["summary"]["files_trovati"] == 5
+    assert riepilogo["summary"]["total_size"] == 50
+
+
+def test_half_written_line_ends_the_stream(tmp_path):
+    stream = tmp_path / "log.jsonl"
+    stream.write_text('{"_type": "header"}\n{"file": "a", "status": "duplicate"}\n{"file": "b", "sta')
+    riepilogo = FileHunter.summarize_report_stream(str(stream))
+    assert riepilogo["summary"]["files_duplicati"] == 1
+    assert not riepilogo["complete"]
@@ -0,0 +1,91 @@
+"""Root divise per mount: un gruppo di walker per disco, esiti nell'ordine del piano."""
+import threading
+import time
+
+from conftest import run_hunter
+import FileHunter
+
+
+def _mounts(src):
+    # Root su un disco, src/m montata da un altro: due gruppi di walker
+    return [FileHunter.MountPoint(1, 0, 1000, 0, "/", "/", "ext4", "/dev/fake0"),
+            FileHunter.MountPoint(2, 1, 1001, 0, "/", str(src / "m"), "ext4", "/dev/fake1")]
+
+
+def _tree(tmp_path):
+    src = tmp_path / "src"
+    for cartella in ("a", "m", "m/sotto", "z"):
+        (src / cartella).mkdir(parents=True)
+    for cartella in ("a", "m", "m/sotto", "z"):
+        for i in range(3):
+            (src / cartella / f"f{i}.jpg").write_bytes(f"{cartella}{i}".encode())
+        (src / cartella / "stesso.jpg").write_bytes(b"contenuto comune")
+        (src / cartella / "nome.jpg").write_bytes(cartella.encode())
+    return src
+
+
+def test_planner_splits_roots_by_device(tmp_path):
+    src = _tree(tmp_path)
+    units = FileHunter.RootPlanner(mounts=_mounts(src)).plan([str(src)])
+    assert [(u.path, u.device) for u in units] == [(str(src), "1000:0"), (str(src / "m"), "1001:0")]
+    assert units[0].prune == {str(src / "m")}
+    assert list(FileHunter.RootPlanner.group_by_device(units)) == ["1000:0", "1001:0"]
+
+
+def test_prefetch_sources_yields_in_plan_order():
+    def lenta():
+        for i in range(5):
+            time.sleep(0.02)
+            yield ("lenta", i)
+
+    def veloce():
+        yield from (("veloce", i) for i in range(50))
+
+    assert list(FileHunter.prefetch_sources([lenta(), veloce()], queue_size=4)) == \
+        [("lenta", i) for i in range(5)] + [("veloce", i) for i in range(50)]
+
+
+def test_prefetch_sources_stops_producers_on_close():
+    fermata = threading.Event()
+
+    def infinita():
+        try:
+            while True:
+                yield 1
+        finally:
+            fermata.set()
+
+    sorgente = FileHunter.prefetch_sources([infinita(), infinita()], queue_size=2)
+    assert next(sorgente) == 1
+    sorgente.close()
+    assert fermata.wait(2)
+
+
+def test_device_groups_give_the_same_outcome_whatever_disk_answers_first(tmp_path, monkeypatch):
+    src = _tree(tmp_path)
+    monkeypatch.setattr(FileHunter, "read_mountinfo", lambda *args: _mounts(src))
+    walk = FileHunter.ParallelWalker.walk
+    lento = {}
+
+    def walk_rallentato(self, root):
+        for lotto in walk(self, root):
+            if lento.get("disco") == (root == str(src)):
+                time.sleep(0.05)
+            yield lotto
+
+    monkeypatch.setattr(FileHunter.ParallelWalker, "walk", walk_rallentato)
+    esiti = []
+    for i, disco_lento in enumerate((True, False)):
+        lento["disco"] = disco_lento
+        esito, report = run_hunter(str(src), str(tmp_path / f"dest{i}"), walk_workers=2)
+        assert len(report["roots_plan"]["units"]) == 2
+        esiti.append(esito)
+    assert esiti[0] == esiti[1]
+    log = esiti[0][1]
+    # Prima tutto il disco della root, poi il mount; il primo "stesso.jpg" resta l'originale
+    assert [f for f, _, _ in log] == sorted((f for f, _, _ in log), key=lambda f: "/m/" in f)
+    stessi = [(f, s) for f, s, _ in log if f.endswith("stesso.jpg")]
+    assert [s for _, s in stessi] == ["success"] + ["duplicate"] * 3
+    assert "/m/" not in stessi[0][0]
+    assert sorted(n for n in esiti[0][2] if n.startswith("JPG/nome")) == \
+        ["JPG/nome.jpg", "JPG/nome_1.jpg", "JPG/nome_2.jpg", "JPG/nome_3.jpg"]
@@ -0,0 +1,89 @@
+"""Risorse rilasciate dopo un errore, hash degli shard a finestre e ordine I/O."""
+import stat
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import EXTENSIONS, run_hunter, silent
+import FileHunter
+
+
+def _released(hunter):
+    return hunter.hash_cache is None and hunter.io_governor is None and not hunter._cancel_events
+
+
+def test_job_mismatch_opens_no_resource(trees, tmp_path):
+    src, dest = trees("new")
+    job = str(tmp_path / "job.sqlite")
+    run_hunter(src, dest, job_path=job, dry_run=True)
+    hunter = FileHunter.FileHunter()
+    with pytest.raises(FileHunter.JobMismatchError), silent():
+        hunter.scan_and_process(EXTENSIONS, dest, root_dirs=[src], job_path=job, query_nome="fattura",
+                                hash_cache_path=str(tmp_path / "cache.sqlite"), adaptive_io=True)
+    assert _released(hunter)
+
+
+def test_failed_report_stream_opens_no_resource(trees, tmp_path):
+    src, dest = trees("new")
+    hunter = FileHunter.FileHunter()
+    with pytest.raises(OSError), silent():
+        hunter.scan_and_process(EXTENSIONS, dest, root_dirs=[src], report_stream=str(tmp_path),
+                                hash_cache_path=str(tmp_path / "cache.sqlite"))
+    assert _released(hunter)
+
+
+def test_failed_scan_closes_cache_and_catalog(trees, tmp_path, monkeypatch):
+    src, dest = trees("new")
+    hunter = FileHunter.FileHunter()
+
+    def guasto(self, source):
+        raise RuntimeError("pipeline")
+
+    monkeypatch.setattr(FileHunter.ScanPipeline, "run", guasto)
+    with pytest.raises(RuntimeError), silent():
+        hunter.scan_and_process(EXTENSIONS, dest, root_dirs=[src],
+                                hash_cache_path=str(tmp_path / "cache.sqlite"),
+                                catalog_path=str(tmp_path / "catalog.sqlite"))
+    assert _released(hunter)
+
+
+def test_shard_precompute_reads_the_source_in_windows(tmp_path):
+    letti = []
+
+    def lotti():
+        for i in range(50):
+            letti.append(i)
+            path = str(tmp_path / f"{i}.jpg")
+            yield path, [("file", SimpleNamespace(path=path), SimpleNamespace(st_size=i))]
+
+    sharder = FileHunter.ShardedScan.__new__(FileHunter.ShardedScan)
+    sharder.sample_size, sharder.samples, sharder.digests, sharder.hash_seconds = 1024, {}, {}, 0.0
+    sharder.pool = SimpleNamespace(map=lambda *args, **kwargs: iter(()))  # Dimensioni tutte diverse
+    dedup = FileHunter.DuplicateFinder(None, None)
+    uscita = sharder.precompute(lotti(), dedup, FileHunter.FileHasher(), window=5)
+    next(uscita)
+    assert len(letti) == 5
+    assert len(list(uscita)) == 49
+
+
+def test_locality_distance_compares_the_same_files(monkeypatch):
+    extent = {"a": 300, "b": None, "c": 100, "d": 200}
+    monkeypatch.setattr(FileHunter, "first_extent", extent.get)
+    items = [(name, SimpleNamespace(st_dev=1, st_ino=i, st_mode=stat.S_IFREG))
+             for i, name in enumerate(extent)]
+    order = FileHunter.LocalityOrder("extent")
+    assert [item[0] for item in order.order(items)] == ["c", "d", "a", "b"]
+    assert order.stats["seek_bytes_before"] == 300
+    assert order.stats["seek_bytes_after"] == 200
+    assert order.stats["backward_jumps_after"] == 0
+
+
+def test_dry_run_and_duplicates_read_no_extent(trees, monkeypatch):
+    letti = []
+    monkeypatch.setattr(FileHunter, "first_extent", lambda path: letti.append(path))
+    src, dest = trees("new")
+    run_hunter(src, dest, dry_run=True, io_order="extent")
+    assert letti == []
+    (_, log, _), _ = run_hunter(src, dest, io_order="extent")
+    copiati = {r[0].replace("SRC", src) for r in log if r[1] == "success"}
+    assert letti and set(letti) <= copiati
@@ -0,0 +1,113 @@
+"""Caccia continua con inotify: eventi persi, limite dei watch e cartelle rinominate."""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from conftest import silent
+import FileHunter
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify solo su Linux")
+
+
+def _watch(tmp_path, src, **kwargs):
+    with silent():
+        return FileHunter.FileHunter().watch([".jpg"], str(tmp_path / "dest"), root_dirs=[str(src)], **kwargs)
+
+
+def _dopo_la_scansione(monkeypatch, azione, eventi=None):
+    """Esegue azione() alla prima lettura degli eventi, cioè appena finita la scansione iniziale."""
+    read = FileHunter.InotifyWatcher.read
+    fatto = []
+
+    def read_con_azione(self, timeout):
+        if fatto:
+            return read(self, timeout)
+        fatto.append(True)
+        azione()
+        letti = read(self, timeout)
+        return eventi(letti) if eventi else letti
+
+    monkeypatch.setattr(FileHunter.InotifyWatcher, "read", read_con_azione)
+
+
+def _copiati(tmp_path):
+    return sorted(os.listdir(tmp_path / "dest" / "JPG"))
+
+
+def test_queue_overflow_rescans_only_changed_files(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    (src / "sub").mkdir(parents=True)
+    (src / "a.jpg").write_bytes(b"a")
+    # Gli eventi reali vanno persi: al loro posto il kernel segnala la coda piena
+    _dopo_la_scansione(monkeypatch, lambda: (src / "sub" / "nuovo.jpg").write_bytes(b"nuovo"),
+                       eventi=lambda letti: [(-1, FileHunter.IN_Q_OVERFLOW, 0, "")])
+    report = _watch(tmp_path, src, duration=0.5)
+    assert _copiati(tmp_path) == ["a.jpg", "nuovo.jpg"]
+    assert report["watch"]["overflows"] == 1
+    assert report["watch"]["rescans"] == 1
+    assert report["summary"]["files_trovati"] == 2  # a.jpg non viene rielaborato
+
+
+def test_folders_beyond_the_watch_limit_are_polled(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    (src / "sub").mkdir(parents=True)
+    add = FileHunter.InotifyWatcher.add
+
+    def add_limitato(self, path, *args):
+        if path != str(src):
+            self.limit_reached = True  # Come ENOSPC
+            return None
+        return add(self, path, *args)
+
+    monkeypatch.setattr(FileHunter.InotifyWatcher, "add", add_limitato)
+    _dopo_la_scansione(monkeypatch, lambda: (src / "sub" / "nuovo.jpg").write_bytes(b"nuovo"))
+    report = _watch(tmp_path, src, duration=0.6, poll_interval=0.1)
+    assert _copiati(tmp_path) == ["nuovo.jpg"]
+    assert report["watch"]["dirs_watched"] == 1
+    assert report["watch"]["unwatched_dirs"] == 1
+    assert report["watch"]["polls"] >= 1
+
+
+def test_renamed_folder_keeps_its_watch_and_known_files(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    (src / "vecchia").mkdir(parents=True)
+    (src / "vecchia" / "x.jpg").write_bytes(b"x")
+    os.utime(src / "vecchia" / "x.jpg", (1000, 1000))
+    copia = tmp_path / "dest" / "JPG" / "x.jpg"
+
+    def rinomina():
+        # Le copie della scansione iniziale sono asincrone: si rinomina dopo copystat, ultimo passo
+        limite = time.monotonic() + 2
+        while time.monotonic() < limite and not (copia.exists() and copia.stat().st_mtime == 1000):
+            time.sleep(0.01)
+        os.rename(src / "vecchia", src / "nuova")
+        (src / "nuova" / "y.jpg").write_bytes(b"y")
+
+    _dopo_la_scansione(monkeypatch, rinomina)
+    report = _watch(tmp_path, src, duration=0.5)
+    # x.jpg è già stato elaborato con il vecchio percorso: non diventa x_1.jpg
+    assert _copiati(tmp_path) == ["x.jpg", "y.jpg"]
+    assert report["watch"]["dir_moves"] == 1
+    assert report["summary"]["files_trovati"] == 2
+
+
+def test_watch_sees_files_created_during_the_initial_listing(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    (src / "sub").mkdir(parents=True)
+    (src / "a.jpg").write_bytes(b"a")
+    originale = FileHunter.ParallelWalker.list_dir
+    creato = threading.Event()
+
+    def lista(self, path):
+        out = originale(self, path)
+        if path == str(src) and not creato.is_set():
+            creato.set()
+            (src / "gap.jpg").write_bytes(b"gap")  # dopo il listing della cartella
+        return out
+
+    monkeypatch.setattr(FileHunter.ParallelWalker, "list_dir", lista)
+    _watch(tmp_path, src, duration=1.0)
+    assert _copiati(tmp_path) == ["a.jpg", "gap.jpg"]